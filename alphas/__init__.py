@@ -0,0 +1 @@
+# Shared building blocks for the main_*.py strategy scripts
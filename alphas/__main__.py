@@ -0,0 +1,5 @@
+# python -m alphas: same as the `alphas` command
+
+from alphas.cli import main
+
+main()
@@ -0,0 +1,313 @@
+# Position and portfolio accounting kernels shared by the strategy scripts
+
+import numpy as np
+import pandas as pd
+
+from alphas.jit import jit, use_numba
+from alphas.timeframe import latch_signals
+
+
+# Codes used in the trade type arrays returned by the kernels
+TRADE_TYPES = ("hold", "long", "short", "square_off", "long_reversal", "short_reversal")
+HOLD, LONG, SHORT, SQUARE_OFF, LONG_REVERSAL, SHORT_REVERSAL = range(len(TRADE_TYPES))
+
+
+def trade_type_labels(codes):
+    """
+    Convert trade type codes back into the strings written to the 'trade_type' column.
+    """
+    return np.asarray(TRADE_TYPES, dtype=object)[codes]
+
+
+def trade_type_categorical(codes):
+    """
+    Trade type codes as a Categorical of the same strings: one byte per row instead of a Python
+    string object, and written to CSV exactly like trade_type_labels().
+    """
+    return pd.Categorical.from_codes(np.asarray(codes, dtype=np.int8), categories=TRADE_TYPES)
+
+
+# -------LONG ONLY PORTFOLIO--------#
+def _long_only_loop(close, signal, initial_capital):
+    n = len(close)
+    signals = np.zeros(n, dtype=np.int64)
+    trade_type = np.zeros(n, dtype=np.int8)
+    capital_out = np.empty(n)
+    shares_out = np.empty(n)
+    portfolio_out = np.empty(n)
+
+    capital = float(initial_capital)
+    shares = 0.0
+    holding = False
+    for i in range(n):
+        price = close[i]
+        # When a buy signal occurs and not holding any shares
+        if signal[i] == 1 and not holding:
+            signals[i] = 1
+            trade_type[i] = LONG
+            shares = capital / price
+            capital -= shares * price
+            holding = True
+        # When a sell signal occurs and holding shares
+        elif signal[i] == -1 and holding:
+            signals[i] = -1
+            trade_type[i] = SQUARE_OFF
+            capital += shares * price
+            shares = 0.0
+            holding = False
+
+        capital_out[i] = capital
+        shares_out[i] = shares
+        portfolio_out[i] = capital + shares * price
+
+    return signals, trade_type, capital_out, shares_out, portfolio_out
+
+
+_long_only_loop_jit = jit(_long_only_loop)
+
+
+def _long_only_numpy(close, signal, initial_capital):
+    n = len(close)
+    signals = latch_signals(signal == 1, signal == -1)
+    trade_type = np.zeros(n, dtype=np.int8)
+    trade_type[signals == 1] = LONG
+    trade_type[signals == -1] = SQUARE_OFF
+
+    # Only the (few) trade events are walked in Python, every row is filled from them afterwards
+    events = np.flatnonzero(signals)
+    event_capital = np.empty(len(events))
+    event_shares = np.empty(len(events))
+    capital = float(initial_capital)
+    shares = 0.0
+    for k, (price, side) in enumerate(zip(close[events].tolist(), signals[events].tolist())):
+        if side == 1:
+            shares = capital / price
+            capital -= shares * price
+        else:
+            capital += shares * price
+            shares = 0.0
+        event_capital[k] = capital
+        event_shares[k] = shares
+
+    last_event = np.searchsorted(events, np.arange(n), side='right') - 1
+    seen = last_event >= 0
+    capital_out = np.full(n, float(initial_capital))
+    shares_out = np.zeros(n)
+    capital_out[seen] = event_capital[last_event[seen]]
+    shares_out[seen] = event_shares[last_event[seen]]
+    portfolio_out = capital_out + shares_out * close
+
+    return signals, trade_type, capital_out, shares_out, portfolio_out
+
+
+def long_only_portfolio(close, signal, initial_capital=100, backend="auto"):
+    """
+    Long only accounting used by the Double Timeframe Strategy.
+
+    A buy signal while flat puts all capital into the asset, a sell signal while long squares off.
+
+    Parameters:
+    - close: array of float
+    - signal: array of int
+        Raw strategy signal, 1 for buy, -1 for sell, 0 otherwise.
+    - initial_capital: float
+    - backend: str
+        'numba' for the compiled kernel, 'numpy' for the array fallback, 'auto' picks numba if installed.
+
+    Returns:
+    - tuple of ndarray
+        (signals, trade_type codes, capital, shares, portfolio_value), one value per row.
+    """
+    close = np.ascontiguousarray(close, dtype=np.float64)
+    signal = np.ascontiguousarray(signal, dtype=np.int64)
+    if use_numba(backend):
+        return _long_only_loop_jit(close, signal, float(initial_capital))
+    return _long_only_numpy(close, signal, initial_capital)
+
+
+# -------ENSEMBLE POSITIONS WITH ROLLING STOP--------#
+def _ensemble_loop(close, high, low, signal, span_a, span_b, stop_loss_pct, take_profit_pct,
+                   sideways_filter_threshold):
+    n = len(close)
+    signals = np.zeros(n, dtype=np.int64)
+    trade_type = np.zeros(n, dtype=np.int8)
+
+    holding = False
+    buying_price = 0.0
+    highest_price = 0.0  # Highest price for long positions
+    for i in range(n):
+        price = close[i]
+        price_in_cloud = price > span_a[i] and price < span_b[i]
+        is_cloud_flat = abs(span_a[i] - span_b[i]) < sideways_filter_threshold
+
+        # Sideways Market: buy near support (Senkou Span B), short near resistance (Senkou Span A)
+        if price_in_cloud and is_cloud_flat:
+            if price <= span_b[i]:
+                signals[i] = 1
+                trade_type[i] = LONG
+                holding = True
+                buying_price = price
+                highest_price = price
+            elif price >= span_a[i]:
+                signals[i] = -1
+                trade_type[i] = SHORT
+                holding = True
+                buying_price = price
+                highest_price = price
+
+        # Trend Following (regular Supertrend-based strategy)
+        elif not holding and signal[i] == 1:
+            signals[i] = 1
+            trade_type[i] = LONG
+            holding = True
+            buying_price = price
+            highest_price = price
+
+        # Sell condition or rolling stop-loss conditions
+        elif holding:
+            # The old second rolling-stop check after the highest price update could only fire
+            # together with this one, so it is folded in here. The stop trails the highest price
+            # up to the previous bar and is checked against the low, the take profit against the
+            # high (both the close unless intrabar prices are given)
+            stopped = low[i] <= highest_price * (1 - stop_loss_pct)
+            if signal[i] == -1 or stopped or high[i] >= buying_price * (1 + take_profit_pct):
+                signals[i] = -1
+                trade_type[i] = SQUARE_OFF
+                holding = False
+
+            # Update the rolling stop-loss for long positions (price increases)
+            if high[i] > highest_price:
+                highest_price = high[i]
+
+    return signals, trade_type
+
+
+_ensemble_loop_jit = jit(_ensemble_loop)
+
+
+def _ensemble_panel(close, high, low, signal, span_a, span_b, stop_loss_pct, take_profit_pct,
+                    sideways_filter_threshold):
+    # _ensemble_loop() for 2-D (time x symbol) arrays: one step per bar, every symbol at once
+    n, k = close.shape
+    signals = np.zeros((n, k), dtype=np.int64)
+    trade_type = np.zeros((n, k), dtype=np.int8)
+
+    holding = np.zeros(k, dtype=bool)
+    buying_price = np.zeros(k)
+    highest_price = np.zeros(k)
+    for i in range(n):
+        price = close[i]
+        price_in_cloud = (price > span_a[i]) & (price < span_b[i])
+        sideways = price_in_cloud & (np.abs(span_a[i] - span_b[i]) < sideways_filter_threshold)
+        sideways_long = sideways & (price <= span_b[i])
+        sideways_short = sideways & ~sideways_long & (price >= span_a[i])
+
+        trend_long = ~sideways & ~holding & (signal[i] == 1)
+        managed = ~sideways & holding
+        stopped = low[i] <= highest_price * (1 - stop_loss_pct)
+        square_off = managed & ((signal[i] == -1) | stopped | (high[i] >= buying_price * (1 + take_profit_pct)))
+
+        longs = sideways_long | trend_long
+        entered = longs | sideways_short
+        signals[i] = longs.astype(np.int64) - (sideways_short | square_off)
+        trade_type[i, longs] = LONG
+        trade_type[i, sideways_short] = SHORT
+        trade_type[i, square_off] = SQUARE_OFF
+
+        holding = (holding | entered) & ~square_off
+        buying_price = np.where(entered, price, buying_price)
+        highest_price = np.where(entered, price,
+                                 np.where(managed & (high[i] > highest_price), high[i], highest_price))
+
+    return signals, trade_type
+
+
+def ensemble_positions(close, signal, span_a, span_b, stop_loss_pct=0.05, take_profit_pct=0.1,
+                       sideways_filter_threshold=0.005, high=None, low=None, backend="auto"):
+    """
+    Position state machine of the Ensemble Strategy with rolling stop loss and take profit.
+
+    Parameters:
+    - close, span_a, span_b: array of float
+        Close price and the Ichimoku Senkou Span A / B.
+    - signal: array of int
+        Combined ensemble signal, 1 for buy, -1 for sell, 0 otherwise.
+    - stop_loss_pct: float
+        Rolling stop measured from the highest close since entry.
+    - take_profit_pct: float
+        Take profit measured from the entry price.
+    - sideways_filter_threshold: float
+        Maximum |Span A - Span B| for the cloud to count as flat.
+    - high, low: array of float
+        Check the stop against the low and the take profit against the high of each bar, and
+        trail the stop from the highest high, instead of using the close for all three. See
+        exits.trade_exits() for the same rules on given entries.
+    - backend: str
+        'numba' for the compiled kernel, 'numpy' to run the same kernel uncompiled over the arrays.
+
+    The arrays can also be 2-D (time x symbol), one independent state machine per column: the
+    compiled kernel then runs once per column, and without numba every symbol advances together
+    in one vectorized step per bar.
+
+    Returns:
+    - tuple of ndarray
+        (signals, trade_type codes), one value per row.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    panel = close.ndim == 2
+    numba = use_numba(backend)
+    # The compiled kernel reads one column at a time, which is contiguous in Fortran order
+    contiguous = np.asfortranarray if panel and numba else np.ascontiguousarray
+    close = contiguous(close)
+    args = (
+        close,
+        close if high is None else contiguous(high, dtype=np.float64),
+        close if low is None else contiguous(low, dtype=np.float64),
+        contiguous(signal, dtype=np.int64),
+        contiguous(span_a, dtype=np.float64),
+        contiguous(span_b, dtype=np.float64),
+        float(stop_loss_pct),
+        float(take_profit_pct),
+        float(sideways_filter_threshold),
+    )
+    if not panel:
+        return _ensemble_loop_jit(*args) if numba else _ensemble_loop(*args)
+    if not numba:
+        return _ensemble_panel(*args)
+
+    signals = np.empty(close.shape, dtype=np.int64, order="F")
+    trade_type = np.empty(close.shape, dtype=np.int8, order="F")
+    for j in range(close.shape[1]):
+        signals[:, j], trade_type[:, j] = _ensemble_loop_jit(*(a[:, j] for a in args[:6]), *args[6:])
+    return signals, trade_type
+
+
+# -------REVERSAL POSITIONS--------#
+def reversal_positions(signal):
+    """
+    Reversal position encoder for always-in-market strategies (used by the SuperTrend strategy):
+    the first trade opens a position (+/-1) and every later signal reverses it (+/-2).
+
+    The only state is whether a trade happened yet, so the encoding is one array pass: every
+    signal is a reversal (+/-2) except the first non-zero one, and np.select picks the trade type.
+
+    Parameters:
+    - signal: array
+        1 to go long, -1 to go short, anything else to hold.
+
+    Returns:
+    - tuple of ndarray
+        (signals, trade_type codes), one value per row. A buy is a short_reversal and a sell a
+        long_reversal, the opening trade included.
+    """
+    signal = np.asarray(signal)
+    buy = signal == 1
+    sell = signal == -1
+
+    signals = np.subtract(buy, sell, dtype=np.int64) * 2
+    traded = np.flatnonzero(signals)
+    if len(traded):
+        signals[traded[0]] //= 2  # the opening trade
+
+    trade_type = np.select([buy, sell], [np.int8(SHORT_REVERSAL), np.int8(LONG_REVERSAL)], np.int8(HOLD))
+    return signals, trade_type
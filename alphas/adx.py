@@ -0,0 +1,79 @@
+# Average Directional Index (trend strength) with Wilder smoothing
+
+import numpy as np
+import pandas as pd
+
+from alphas.supertrend import true_range
+
+ADX_COLUMNS = ('+DI', '-DI', 'DX', 'ADX')
+
+
+def wilder_mean(values, period):
+    """
+    Wilder's smoothing: the mean of the first `period` values, then m = m + (value - m) / period
+    for every later value (an exponential mean with alpha = 1 / period seeded with that SMA).
+    NaN before the seed. Leading NaNs are skipped, so the seed is the mean of the first `period`
+    defined values. Works on 1-D series or 2-D (time x symbol) arrays.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    defined = ~np.isnan(values)
+    count = np.cumsum(defined, axis=0)  # defined values seen so far
+    seed = defined & (count == period)
+    later = defined & (count > period)
+
+    # The seed row holds the SMA, later rows their own values; from the seed on the recursion is
+    # an adjust=False exponential mean, which is NaN before its first value
+    seeded = np.full(values.shape, np.nan)
+    seeded[seed] = np.nancumsum(values, axis=0)[seed] / period
+    seeded[later] = values[later]
+    frame = pd.DataFrame(seeded) if values.ndim == 2 else pd.Series(seeded)
+    return frame.ewm(alpha=1 / period, adjust=False).mean().to_numpy()
+
+
+def adx_features(df, period=14):
+    """
+    Directional indicators and the ADX of a whole history.
+
+    +DI / -DI measure the smoothed upward / downward moves (in % of the ATR), and the ADX is the
+    smoothed spread between them (DX): 0 for no trend, above ~25 for a strong trend either way.
+
+    Parameters:
+    - df: DataFrame or dict
+        'high', 'low' and 'close' columns (1-D, or 2-D time x symbol arrays).
+    - period: int
+        Smoothing period of the ATR, the directional moves and the DX.
+
+    Returns:
+    - dict
+        One array per name in ADX_COLUMNS.
+    """
+    high = np.asarray(df['high'], dtype=np.float64)
+    low = np.asarray(df['low'], dtype=np.float64)
+    close = np.asarray(df['close'], dtype=np.float64)
+
+    up = np.full(high.shape, np.nan)
+    down = np.full(low.shape, np.nan)
+    up[1:] = high[1:] - high[:-1]
+    down[1:] = low[:-1] - low[1:]
+    with np.errstate(invalid='ignore'):
+        plus_dm = np.where((up > down) & (up > 0), up, 0.0)
+        minus_dm = np.where((down > up) & (down > 0), down, 0.0)
+    plus_dm[:1] = minus_dm[:1] = np.nan  # no previous bar
+
+    # Like the directional moves, the true range starts on the second bar
+    tr = true_range(high, low, close)
+    tr[:1] = np.nan
+    atr = wilder_mean(tr, period)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        plus_di = 100 * wilder_mean(plus_dm, period) / atr
+        minus_di = 100 * wilder_mean(minus_dm, period) / atr
+        total = plus_di + minus_di
+        dx = np.where(total > 0, 100 * np.abs(plus_di - minus_di) / total, 0.0)
+    dx[np.isnan(total)] = np.nan
+
+    return {
+        '+DI': plus_di,
+        '-DI': minus_di,
+        'DX': dx,
+        'ADX': wilder_mean(dx, period),
+    }
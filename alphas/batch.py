@@ -0,0 +1,184 @@
+# Run one strategy over a universe of symbols in a process pool
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from alphas.accounting import trade_type_labels
+from alphas.data import load_ohlcv
+from alphas.evaluate import summary_metrics
+from alphas.export import BACKTEST_COLUMNS, export_result
+from alphas.strategies import STRATEGIES, price_frame, run_strategy
+from alphas.timeframe import resample_ohlcv
+
+
+def load_data(strategy, data_path):
+    """
+    Load the input of a strategy: one OHLCV CSV, or (fast CSV, slow CSV) for 'double_timeframe',
+    whose daily bars are built from the fast CSV when only that one is given.
+    """
+    if strategy == 'double_timeframe':
+        if isinstance(data_path, str):
+            data_fast = load_ohlcv(data_path)
+            return data_fast, resample_ohlcv(data_fast, "1D")[0]
+        fast_path, slow_path = data_path
+        return load_ohlcv(fast_path), load_ohlcv(slow_path)
+    if not isinstance(data_path, str):
+        (data_path,) = data_path
+    return load_ohlcv(data_path)
+
+
+def result_frame(strategy, data, result):
+    """
+    The rows the strategy kept with their 'signals' and 'trade_type', i.e. what the strat()
+    function of the matching main_*.py script exports.
+    """
+    prices = price_frame(strategy, data)
+    columns = [column for column in BACKTEST_COLUMNS if column in prices.columns]
+    frame = prices[columns].iloc[result['rows']].reset_index(drop=True)
+    frame['signals'] = result['signals']
+    frame['trade_type'] = trade_type_labels(result['trade_type'])
+    return frame
+
+
+def normalize_configs(configs):
+    """
+    Turn {symbol: data path} or a list of {'symbol', 'data', 'params', 'output'} dicts into the
+    list form. 'data' is a CSV path, or optionally [fast CSV, slow CSV] for 'double_timeframe'.
+    """
+    if isinstance(configs, dict):
+        configs = [{'symbol': symbol, 'data': data} for symbol, data in configs.items()]
+    normalized = []
+    for config in configs:
+        if 'symbol' not in config or 'data' not in config:
+            raise ValueError(f"config needs 'symbol' and 'data': {config!r}")
+        data = config['data']
+        normalized.append({
+            'symbol': config['symbol'],
+            'data': data if isinstance(data, str) else tuple(data),
+            'params': dict(config.get('params') or {}),
+            'output': config.get('output'),
+        })
+    return normalized
+
+
+# -------WORKER--------#
+def run_symbol(strategy, config, output_dir=None, fee=0.0, params=None):
+    """
+    load -> indicators -> strategy -> export -> metrics for one symbol.
+
+    Parameters:
+    - strategy: str
+        Key of strategies.STRATEGIES.
+    - config: dict
+        One entry of normalize_configs().
+    - output_dir: str
+        Where the result CSV goes when the config has no 'output'; None skips the export.
+    - fee: float
+    - params: dict
+        Parameters shared by the universe, overridden by the config's own 'params'.
+
+    Returns:
+    - dict
+        symbol, bars, output, seconds, error and the summary_metrics() of the result.
+    """
+    start = time.perf_counter()
+    row = {'symbol': config['symbol'], 'bars': 0, 'output': None, 'seconds': np.nan, 'error': None}
+    try:
+        data = load_data(strategy, config['data'])
+        result = run_strategy(strategy, data, {**(params or {}), **config['params']})
+        frame = result_frame(strategy, data, result)
+
+        output = config['output']
+        if output is None and output_dir is not None:
+            output = os.path.join(output_dir, f"{config['symbol'].lower()}_{strategy}_result.csv")
+        if output is not None:
+            row['output'] = export_result(frame, output)
+
+        row['bars'] = len(frame)
+        row.update(summary_metrics(frame['close'], result['trade_type'], frame['datetime'], fee=fee))
+    except Exception as error:
+        # One broken symbol should not throw away the rest of the universe
+        row['error'] = f"{type(error).__name__}: {error}"
+    row['seconds'] = time.perf_counter() - start
+    return row
+
+
+# -------BATCH--------#
+def run_universe(configs, strategy, processes=None, output_dir=None, fee=0.0, params=None):
+    """
+    Run a strategy for every symbol of a universe, one symbol per task in a process pool.
+
+    Parameters:
+    - configs: dict or list of dict
+        See normalize_configs().
+    - strategy: str
+        Key of strategies.STRATEGIES.
+    - processes: int
+        Worker processes, 1 runs in this process. Defaults to the CPU count.
+    - output_dir: str
+        Directory for the result CSVs, see run_symbol().
+    - fee: float
+        Cost per unit of position change passed to the metrics.
+    - params: dict
+        Strategy parameters for every symbol.
+
+    Returns:
+    - DataFrame
+        One row per symbol in config order, see run_symbol(); failed symbols have 'error' set.
+    """
+    if strategy not in STRATEGIES:
+        raise KeyError(f"unknown strategy {strategy!r}, expected one of {sorted(STRATEGIES)}")
+    configs = normalize_configs(configs)
+    if output_dir is not None:
+        os.makedirs(output_dir, exist_ok=True)
+
+    processes = min(processes or os.cpu_count() or 1, max(len(configs), 1))
+    if processes == 1:
+        rows = [run_symbol(strategy, config, output_dir, fee, params) for config in configs]
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(run_symbol, strategy, config, output_dir, fee, params) for config in configs]
+            rows = [future.result() for future in futures]
+    return pd.DataFrame(rows)
+
+
+# -------MAIN FUNCTION--------#
+def _parse_symbol(text):
+    symbol, _, paths = text.partition("=")
+    if not paths:
+        raise argparse.ArgumentTypeError(f"expected SYMBOL=PATH[,SLOW_PATH], got {text!r}")
+    paths = paths.split(",")
+    return {'symbol': symbol, 'data': paths[0] if len(paths) == 1 else paths}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a strategy for many symbols in parallel.")
+    parser.add_argument("strategy", choices=sorted(STRATEGIES))
+    parser.add_argument("symbols", nargs="*", type=_parse_symbol,
+                        help="SYMBOL=PATH, or SYMBOL=FAST_PATH,SLOW_PATH to read the daily bars of double_timeframe")
+    parser.add_argument("--config", help="JSON file with a list of {symbol, data, params, output}")
+    parser.add_argument("--output-dir", default=None)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--fee", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    configs = list(args.symbols)
+    if args.config:
+        with open(args.config) as f:
+            configs += normalize_configs(json.load(f))
+    if not configs:
+        parser.error("no symbols given")
+
+    summary = run_universe(configs, args.strategy, processes=args.processes, output_dir=args.output_dir,
+                           fee=args.fee)
+    print(summary.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
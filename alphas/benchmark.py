@@ -0,0 +1,261 @@
+# Benchmarks of every stage of the main_*.py scripts on synthetic OHLCV data
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from alphas import features
+from alphas.data import load_ohlcv
+from alphas.export import export_result
+from alphas.timeframe import resample_ohlcv
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(REPO_DIR, "benchmarks", "baseline.json")
+DEFAULT_SIZES = (1_000, 100_000, 2_000_000)
+SCRIPTS = ('main_1_btc', 'main_1_eth', 'main_2_btc', 'main_2_eth')
+
+# Stage timings below this many seconds, and peaks below this many MB, are noise: they never
+# count as a regression
+MIN_SECONDS = 0.005
+MIN_PEAK_MB = 1.0
+
+
+# -------SYNTHETIC DATA--------#
+def synthetic_ohlcv(n, freq="15min", seed=0, start="2019-01-01"):
+    """
+    n bars of a geometric random walk in the layout of the data CSVs ('datetime' as text).
+    """
+    rng = np.random.default_rng(seed)
+    close = 10000 * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    open_ = np.concatenate((close[:1], close[:-1]))
+    high = np.maximum(open_, close) * (1 + rng.uniform(0, 0.003, n))
+    low = np.minimum(open_, close) * (1 - rng.uniform(0, 0.003, n))
+    datetime = pd.date_range(start, periods=n, freq=freq)
+    return pd.DataFrame({
+        'datetime': datetime.strftime("%Y-%m-%d %H:%M:%S"),
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': rng.uniform(1, 100, n),
+    })
+
+
+# -------PIPELINES--------#
+def load_script(name):
+    """
+    Import one of the main_*.py scripts as a module (its main() is not run).
+    """
+    spec = importlib.util.spec_from_file_location(name, os.path.join(REPO_DIR, f"{name}.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def pipeline_stages(name, script):
+    """
+    The stages of a script's main() in order, each a function of a state dict holding 'csv',
+    'output' and 'float_dtype' that adds its own outputs to the state.
+    """
+    def load(state):
+        state['data'] = load_ohlcv(state['csv'], use_cache=False, float_dtype=state['float_dtype'])
+
+    def export(state):
+        export_result(state['result'], state['output'])
+
+    if name.startswith('main_1'):
+        def resample(state):
+            state['data_slow'], _ = resample_ohlcv(state['data'], "1D")
+
+        def process_data(state):
+            state['data_slow'], state['data'] = script.process_data(state['data'], state['data_slow'])
+
+        def strat(state):
+            state['result'] = script.strat(state['data'], state['data_slow'])
+
+        return [('load', load), ('resample', resample), ('process_data', process_data), ('strat', strat),
+                ('export', export)]
+
+    def process_data(state):
+        state['data'] = script.process_data(state['data'])
+
+    def strat(state):
+        state['result'] = script.strat(state['data'])
+
+    return [('load', load), ('process_data', process_data), ('strat', strat), ('export', export)]
+
+
+def fresh_state(state):
+    """
+    Copy of a stage state: the stages modify their input frames in place, so every run gets its
+    own copies.
+    """
+    return {key: value.copy() if isinstance(value, pd.DataFrame) else value for key, value in state.items()}
+
+
+def stage_inputs(name, script, state):
+    """
+    Every stage of a script with the state it starts from, by running the pipeline once.
+
+    Returns:
+    - list of tuple
+        (stage name, stage, input state); pass a fresh_state() copy of the state to the stage.
+    """
+    inputs = []
+    for stage_name, stage in pipeline_stages(name, script):
+        inputs.append((stage_name, stage, state))
+        state = fresh_state(state)
+        stage(state)
+    return inputs
+
+
+def measure(stage, state, repeat=3):
+    """
+    Best wall time of `repeat` runs of a stage on copies of `state`, then the peak memory it
+    allocates (tracemalloc, numpy buffers included) in one more run.
+
+    Returns:
+    - tuple
+        (seconds, peak MB, state after the stage).
+    """
+    seconds = np.inf
+    for _ in range(repeat):
+        run_state = fresh_state(state)
+        start = time.perf_counter()
+        stage(run_state)
+        seconds = min(seconds, time.perf_counter() - start)
+
+    run_state = fresh_state(state)
+    tracemalloc.start()
+    try:
+        stage(run_state)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return seconds, peak / (1024 * 1024), run_state
+
+
+# -------BENCHMARK--------#
+def run_benchmarks(scripts=SCRIPTS, sizes=DEFAULT_SIZES, repeat=3, low_memory=False, seed=0):
+    """
+    Time and memory-profile every stage of the scripts on synthetic 15m bars.
+
+    Indicators go through an empty, memory-only feature store for every run, so process_data()
+    and strat() are measured computing them rather than reading them from the cache.
+
+    Parameters:
+    - scripts: tuple of str
+        Script names, see SCRIPTS.
+    - sizes: tuple of int
+        Bars of synthetic data per run.
+    - repeat: int
+        Timed runs per stage, the fastest counts.
+    - low_memory: bool
+        Run the scripts with LOW_MEMORY set.
+    - seed: int
+
+    Returns:
+    - DataFrame
+        One row per script, size and stage: script, bars, stage, seconds, peak_mb.
+    """
+    float_dtype = np.float32 if low_memory else np.float64
+    modules = {name: load_script(name) for name in scripts}
+    shared_store = features.STORE
+    rows = []
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            for bars in sizes:
+                csv_path = os.path.join(directory, f"ohlcv_{bars}.csv")
+                synthetic_ohlcv(bars, seed=seed).to_csv(csv_path, index=False)
+                for name, script in modules.items():
+                    script.LOW_MEMORY = low_memory
+                    state = {'csv': csv_path, 'output': os.path.join(directory, f"{name}_result.csv"),
+                             'float_dtype': float_dtype}
+                    for stage_name, stage in pipeline_stages(name, script):
+                        features.STORE = features.FeatureStore(max_items=0)
+                        seconds, peak_mb, state = measure(stage, state, repeat)
+                        rows.append({'script': name, 'bars': bars, 'stage': stage_name, 'seconds': seconds,
+                                     'peak_mb': peak_mb})
+    finally:
+        features.STORE = shared_store
+    return pd.DataFrame(rows, columns=['script', 'bars', 'stage', 'seconds', 'peak_mb'])
+
+
+# -------BASELINES--------#
+def save_baseline(results, path=DEFAULT_BASELINE):
+    """
+    Store benchmark results as JSON, with the machine and library versions they were taken on.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    payload = {
+        'machine': {'platform': platform.platform(), 'processor': platform.processor(),
+                    'python': platform.python_version(), 'numpy': np.__version__, 'pandas': pd.__version__},
+        'results': results.to_dict(orient='records'),
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=1)
+    return path
+
+
+def load_baseline(path=DEFAULT_BASELINE):
+    with open(path) as f:
+        return pd.DataFrame(json.load(f)['results'])
+
+
+def compare_to_baseline(results, baseline, tolerance=1.5):
+    """
+    Join results with a baseline on (script, bars, stage).
+
+    Returns:
+    - DataFrame
+        The results with baseline_seconds, baseline_peak_mb, their ratios and a 'regression'
+        flag: slower or bigger than tolerance times the baseline (timings under MIN_SECONDS and
+        peaks under MIN_PEAK_MB excepted). Stages missing from the baseline are never flagged.
+    """
+    baseline = baseline[['script', 'bars', 'stage', 'seconds', 'peak_mb']].rename(
+        columns={'seconds': 'baseline_seconds', 'peak_mb': 'baseline_peak_mb'})
+    table = results.merge(baseline, on=['script', 'bars', 'stage'], how='left')
+    table['time_ratio'] = table['seconds'] / table['baseline_seconds']
+    table['memory_ratio'] = table['peak_mb'] / table['baseline_peak_mb']
+    slower = (table['time_ratio'] > tolerance) & (table['seconds'] > MIN_SECONDS)
+    bigger = (table['memory_ratio'] > tolerance) & (table['peak_mb'] > MIN_PEAK_MB)
+    table['regression'] = (slower | bigger).fillna(False)
+    return table
+
+
+# -------MAIN FUNCTION--------#
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark every stage of the strategy scripts.")
+    parser.add_argument("--scripts", nargs="+", choices=SCRIPTS, default=list(SCRIPTS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--low-memory", action="store_true")
+    parser.add_argument("--save", nargs="?", const=DEFAULT_BASELINE, default=None,
+                        help="store the results as the baseline")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, default=None,
+                        help="compare with a stored baseline, exit status 1 on a regression")
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.scripts, args.sizes, repeat=args.repeat, low_memory=args.low_memory)
+    if args.compare:
+        table = compare_to_baseline(results, load_baseline(args.compare), args.tolerance)
+        print(table.to_string(index=False, float_format="%.4g"))
+    else:
+        print(results.to_string(index=False, float_format="%.4g"))
+    if args.save:
+        print(f"baseline saved to {save_baseline(results, args.save)}")
+    if args.compare and table['regression'].any():
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
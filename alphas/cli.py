@@ -0,0 +1,40 @@
+# `alphas` command line entry point: one subcommand per tool module, imported only when it runs
+
+import argparse
+import importlib
+import sys
+
+# command -> (module with a main(argv), summary)
+COMMANDS = {
+    'run': ('alphas.run', "Run a strategy on an OHLCV CSV and export the result."),
+    'batch': ('alphas.batch', "Run a strategy for many symbols in parallel."),
+    'scan': ('alphas.panel', "Scan a universe with the Ensemble Strategy in one pass."),
+    'sweep': ('alphas.sweep', "Rank strategy parameter sets by local backtest metrics."),
+    'walkforward': ('alphas.walkforward', "Walk-forward validation of a strategy."),
+    'montecarlo': ('alphas.montecarlo', "Rank a strategy result against random signals."),
+    'evaluate': ('alphas.evaluate', "Backtest a strategy result CSV locally."),
+    'stream': ('alphas.streaming', "Replay or follow a bar CSV through a streaming strategy."),
+    'benchmark': ('alphas.benchmark', "Benchmark every stage of the strategy scripts."),
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+    parser = argparse.ArgumentParser(
+        prog="alphas", description="Crypto strategy research tools.",
+        epilog="commands:\n" + "\n".join(f"  {name:<12} {summary}" for name, (_, summary) in COMMANDS.items()) +
+               "\n\nRun `alphas <command> --help` for the options of a command.",
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=list(COMMANDS), metavar="command")
+    if not argv or argv[0] in ("-h", "--help"):
+        parser.print_help()
+        return
+    command = parser.parse_args(argv[:1]).command
+
+    # The command's own parser names itself after argv[0]
+    sys.argv[0] = f"alphas {command}"
+    return importlib.import_module(COMMANDS[command][0]).main(argv[1:])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+# Weighted ensemble combinator: registered signal sources stacked into one signal matrix
+
+import json
+
+import numpy as np
+
+from alphas.accounting import ensemble_positions
+from alphas.features import compute
+
+
+# -------COMBINING--------#
+def combine_signals(matrix, weights=None, threshold=0.0):
+    """
+    Weighted vote of signal columns with one matrix-vector product.
+
+    The weights are scaled to a total absolute weight of 1, so the score of a row lies in [-1, 1]
+    and the threshold is the share of the weight the winning side must exceed. Equal weights
+    with threshold 0 are a majority vote, and threshold 0 reproduces np.sign() of the weighted
+    sum used by the Ensemble Strategy.
+
+    Parameters:
+    - matrix: array of float
+        (..., sources) signals of -1, 0 or 1, e.g. (time x source) or (time x symbol x source).
+    - weights: array of float
+        One weight per source, or (sources x sets) to combine several weight sets at once.
+        None weights every source equally.
+    - threshold: float
+        A row signals 1 when its score is above threshold and -1 when it is below -threshold.
+
+    Returns:
+    - ndarray of int8
+        The signal of every row (with a trailing axis per weight set for 2-D weights).
+    """
+    matrix = np.asarray(matrix)
+    weights = np.ones(matrix.shape[-1]) if weights is None else np.asarray(weights, dtype=np.float64)
+    total = np.abs(weights).sum(axis=0)
+    weights = np.divide(weights, total, out=np.zeros_like(weights), where=total != 0)
+
+    score = matrix @ weights
+    signal = np.zeros(score.shape, dtype=np.int8)
+    signal[score > threshold] = 1
+    signal[score < -threshold] = -1
+    return signal
+
+
+# -------SIGNAL SOURCES--------#
+# name -> {'params': defaults, 'function': fn(data, **params) -> float array of -1 / 0 / 1, NaN in the warm-up}
+SIGNAL_SOURCES = {}
+
+
+def signal_source(name, params=None):
+    """
+    Register a signal generator under `name`. Its indicators should come from features.compute()
+    so they are shared with the strategies and cached.
+    """
+    def register(function):
+        SIGNAL_SOURCES[name] = {'params': dict(params or {}), 'function': function}
+        return function
+    return register
+
+
+def _warm(signal, *arrays):
+    # Signal as float with NaN wherever one of the arrays is still warming up
+    signal = np.asarray(signal, dtype=np.float64).copy()
+    for values in arrays:
+        signal[np.isnan(values)] = np.nan
+    return signal
+
+
+def cloud_trend_signal(close, line, span_a, span_b):
+    """
+    1 when the close is above both the Supertrend line and Span A, -1 when it is below the line
+    and Span B, 0 otherwise (signal_2 of the Ensemble Strategy).
+    """
+    signal = np.zeros(np.shape(close), dtype=np.int64)
+    signal[(close > line) & (close > span_a)] = 1
+    signal[(close < line) & (close < span_b)] = -1
+    return signal
+
+
+@signal_source('marubozu', params={'window': 15, 'std_mult': 1.8, 'band': 0.005})
+def _marubozu_source(data, window, std_mult, band):
+    marubozu = compute('marubozu', data, window=window, std_mult=std_mult, band=band)
+    return _warm(marubozu['signal_1'], marubozu['avg_abs_diff_15d'])
+
+
+@signal_source('cloud_trend', params={'atr_period': 5, 'multiplier': 3})
+def _cloud_trend_source(data, atr_period, multiplier):
+    supertrend = compute('supertrend', data, atr_period=atr_period, multiplier=multiplier)
+    ichimoku = compute('ichimoku', data)
+    close = np.asarray(data['close'], dtype=np.float64)
+    signal = cloud_trend_signal(close, supertrend['Supertrend'], ichimoku['Senkou Span A'],
+                                ichimoku['Senkou Span B'])
+    return _warm(signal, supertrend['ATR'], supertrend['Supertrend'], *ichimoku.values())
+
+
+@signal_source('sma_cross', params={'fast_window': 14, 'slow_window': 26})
+def _sma_cross_source(data, fast_window, slow_window):
+    fast = compute('sma', data, window=fast_window)['SMA']
+    slow = compute('sma', data, window=slow_window)['SMA']
+    return _warm(np.sign(np.nan_to_num(fast - slow)), fast, slow)
+
+
+@signal_source('adx', params={'period': 14, 'threshold': 25})
+def _adx_source(data, period, threshold):
+    adx = compute('adx', data, period=period)
+    with np.errstate(invalid='ignore'):
+        trending = adx['ADX'] > threshold
+    signal = np.where(trending, np.sign(np.nan_to_num(adx['+DI'] - adx['-DI'])), 0.0)
+    return _warm(signal, adx['ADX'], adx['+DI'], adx['-DI'])
+
+
+# -------COMBINATOR--------#
+# The two components of the Ensemble Strategy (main_2_btc), weighted 0.6 / 0.4 there
+DEFAULT_SOURCES = {'marubozu': {}, 'cloud_trend': {}}
+
+
+class SignalCombinator:
+    """
+    Signal sources of one dataset stacked as the columns of a (time x source) matrix, so any
+    weighting, vote or threshold of them is one combine_signals() product.
+
+    Every component is computed once per parameter set and kept (its indicators also go through
+    the feature store), so reweighting an ensemble does not touch the indicators again.
+
+    Parameters:
+    - data: DataFrame or dict
+        OHLCV columns.
+    - sources: iterable of str or dict
+        Source names, or {label: params}; a params dict may name its source under 'source' to add
+        the same generator twice, e.g. {'fast_cross': {'source': 'sma_cross', 'fast_window': 5}}.
+    """
+
+    def __init__(self, data, sources=None):
+        self.data = data
+        self.labels = []
+        self._components = {}  # (source, params) -> column
+        self._columns = []
+        self._matrix = None
+        self._valid = None
+        sources = DEFAULT_SOURCES if sources is None else sources
+        if not isinstance(sources, dict):
+            sources = {name: {} for name in sources}
+        for label, params in sources.items():
+            params = dict(params)
+            self.add(params.pop('source', label), label=label, **params)
+
+    def add(self, source, label=None, **params):
+        """
+        Add a registered source as the next column, computing it only for new parameters.
+
+        Returns:
+        - str
+            The column label (defaults to the source name).
+        """
+        label = source if label is None else label
+        if label in self.labels:
+            raise ValueError(f"column {label!r} already exists")
+        spec = SIGNAL_SOURCES[source]
+        unknown = set(params) - set(spec['params'])
+        if unknown:
+            raise TypeError(f"{source} has no parameters {sorted(unknown)}")
+        params = {**spec['params'], **params}
+
+        key = (source, json.dumps(params, sort_keys=True))
+        if key not in self._components:
+            self._components[key] = spec['function'](self.data, **params)
+        self.labels.append(label)
+        self._columns.append(self._components[key])
+        self._matrix = self._valid = None
+        return label
+
+    def _stack(self):
+        stacked = np.column_stack(self._columns) if self._columns else np.zeros((len(self.data['close']), 0))
+        self._valid = ~np.isnan(stacked).any(axis=1)
+        self._matrix = np.nan_to_num(stacked)
+
+    @property
+    def matrix(self):
+        """
+        (time x source) signals, 0 where a component is still warming up.
+        """
+        if self._matrix is None:
+            self._stack()
+        return self._matrix
+
+    @property
+    def valid(self):
+        """
+        Rows where every component is defined.
+        """
+        if self._valid is None:
+            self._stack()
+        return self._valid
+
+    def weight_vector(self, weights):
+        """
+        Weights as an array in column order; a dict maps labels to weights (missing ones are 0).
+        """
+        if weights is None or not isinstance(weights, dict):
+            return weights
+        unknown = set(weights) - set(self.labels)
+        if unknown:
+            raise KeyError(f"no columns {sorted(unknown)}")
+        return np.array([weights.get(label, 0.0) for label in self.labels])
+
+    def combine(self, weights=None, threshold=0.0):
+        """
+        Combined signal of every row, see combine_signals(); 0 outside valid.
+        """
+        signal = combine_signals(self.matrix, self.weight_vector(weights), threshold)
+        signal[~self.valid] = 0
+        return signal
+
+    def strategy(self, weights=None, threshold=0.0, stop_loss_pct=0.05, take_profit_pct=0.1,
+                 sideways_filter_threshold=0.005):
+        """
+        The Ensemble Strategy's positions (rolling stop, take profit and Ichimoku sideways filter)
+        on the combined signal.
+
+        Returns:
+        - dict
+            'rows' (valid rows with the Ichimoku spans defined), 'signal', 'signals' and
+            'trade_type', see strategies.ensemble_strategy().
+        """
+        ichimoku = compute('ichimoku', self.data)
+        span_a, span_b = ichimoku['Senkou Span A'], ichimoku['Senkou Span B']
+        rows = np.flatnonzero(self.valid & ~np.isnan(span_a) & ~np.isnan(span_b))
+
+        signal = self.combine(weights, threshold)[rows].astype(np.int64)
+        signals, trade_type = ensemble_positions(
+            np.asarray(self.data['close'], dtype=np.float64)[rows], signal, span_a[rows], span_b[rows],
+            stop_loss_pct=stop_loss_pct,
+            take_profit_pct=take_profit_pct,
+            sideways_filter_threshold=sideways_filter_threshold,
+        )
+        return {'rows': rows, 'signal': signal, 'signals': signals, 'trade_type': trade_type}
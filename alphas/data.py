@@ -0,0 +1,156 @@
+# OHLCV loading with a columnar .npy cache in front of the CSV files
+
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+CACHE_VERSION = 2
+FLOAT_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def _file_hash(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_path(csv_file_path, cache_dir=None):
+    """
+    Directory holding the cached columns of a CSV: <cache_dir>/<file name>.cols, where cache_dir
+    defaults to a .cache directory next to the CSV.
+    """
+    csv_file_path = os.path.abspath(csv_file_path)
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(csv_file_path), ".cache")
+    return os.path.join(cache_dir, os.path.basename(csv_file_path) + ".cols")
+
+
+def _read_meta(directory):
+    try:
+        with open(os.path.join(directory, "meta.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(directory, meta):
+    tmp_path = os.path.join(directory, "meta.json.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(directory, "meta.json"))
+
+
+def _parse_csv(csv_file_path, float_dtype):
+    # Parsed straight into float_dtype, without a float64 copy of every column first
+    df = pd.read_csv(csv_file_path, dtype={column: float_dtype for column in FLOAT_COLUMNS})
+    if 'datetime' in df.columns:
+        df['datetime'] = pd.to_datetime(df['datetime'])
+    return df
+
+
+def _columns_to_store(df):
+    # Plain arrays of every column with tz-aware datetimes as UTC (their dtypes to restore them),
+    # or None when a column is only available as Python objects (e.g. mixed UTC offsets)
+    arrays = {}
+    timezones = {}
+    for column in df.columns:
+        values = df[column]
+        if isinstance(values.dtype, pd.DatetimeTZDtype):
+            timezones[column] = str(values.dtype)
+            values = values.dt.tz_convert(None)
+        values = values.to_numpy()
+        if values.dtype == object:
+            return None
+        arrays[column] = values
+    return arrays, timezones
+
+
+def _store(arrays, directory):
+    os.makedirs(directory, exist_ok=True)
+    for i, values in enumerate(arrays.values()):
+        np.save(os.path.join(directory, f"{i}.npy"), values, allow_pickle=False)
+    return list(arrays)
+
+
+def _is_fresh(meta, csv_file_path, stat, check_hash):
+    if meta is None or meta.get('version') != CACHE_VERSION:
+        return False
+    if meta['size'] != stat.st_size:
+        return False
+    if meta['mtime_ns'] == stat.st_mtime_ns:
+        return True
+    # Touched but possibly unchanged (copied, checked out again): compare contents
+    return check_hash and meta.get('sha256') == _file_hash(csv_file_path)
+
+
+def load_ohlcv(csv_file_path, cache_dir=None, check_hash=True, mmap=True, float_dtype=np.float64,
+               use_cache=True):
+    """
+    Load an OHLCV CSV, parsing it only the first time.
+
+    The parsed columns ('datetime' as datetime64, prices and volume as float_dtype) are stored as
+    one .npy file per column, tz-aware datetimes as UTC with their time zone in the metadata. A
+    CSV with a column that only parses to Python objects is not cached. Later loads memory-map those files, so they cost close to nothing
+    and pages are only read when a column is used. The cache is rebuilt when the CSV's size or
+    modification time changes, unless check_hash finds the contents are still identical.
+
+    Parameters:
+    - csv_file_path: str
+    - cache_dir: str
+        Where to keep the cache, see cache_path().
+    - check_hash: bool
+        Compare a SHA-256 of the CSV when only its modification time changed.
+    - mmap: bool
+        Memory-map the cached columns (copy-on-write, the cache files are never modified).
+    - float_dtype: dtype
+        dtype of the open/high/low/close/volume columns (np.float32 halves their size).
+    - use_cache: bool
+        False always parses the CSV and leaves the cache alone.
+
+    Returns:
+    - DataFrame
+    """
+    if not use_cache:
+        return _parse_csv(csv_file_path, float_dtype)
+
+    directory = cache_path(csv_file_path, cache_dir)
+    stat = os.stat(csv_file_path)
+    meta = _read_meta(directory)
+    dtype_name = np.dtype(float_dtype).name
+
+    if not (_is_fresh(meta, csv_file_path, stat, check_hash) and meta.get('float_dtype') == dtype_name):
+        df = _parse_csv(csv_file_path, float_dtype)
+        storable = _columns_to_store(df)
+        if storable is None:
+            return df
+        arrays, timezones = storable
+        columns = _store(arrays, directory)
+        _write_meta(directory, {
+            'version': CACHE_VERSION,
+            'source': os.path.abspath(csv_file_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': _file_hash(csv_file_path) if check_hash else None,
+            'float_dtype': dtype_name,
+            'columns': columns,
+            'timezones': timezones,
+        })
+        return df
+
+    if meta['mtime_ns'] != stat.st_mtime_ns:
+        meta['mtime_ns'] = stat.st_mtime_ns  # same contents, skip hashing next time
+        _write_meta(directory, meta)
+
+    mmap_mode = "c" if mmap else None
+    data = {
+        column: np.load(os.path.join(directory, f"{i}.npy"), mmap_mode=mmap_mode, allow_pickle=False)
+        for i, column in enumerate(meta['columns'])
+    }
+    for column, dtype in meta['timezones'].items():
+        data[column] = pd.Series(data[column]).dt.tz_localize('UTC').astype(dtype)
+    return pd.DataFrame(data, copy=False)
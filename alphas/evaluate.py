@@ -0,0 +1,222 @@
+# Local backtest metrics computed from the 'signals' / 'trade_type' columns
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from alphas.accounting import TRADE_TYPES, LONG, SHORT, SQUARE_OFF, LONG_REVERSAL, SHORT_REVERSAL
+
+SECONDS_PER_YEAR = 365 * 24 * 60 * 60  # crypto trades around the clock
+
+
+def trade_type_codes(trade_type):
+    """
+    Convert a 'trade_type' column of strings (or codes) to the accounting.TRADE_TYPES codes.
+    """
+    trade_type = np.asarray(trade_type)
+    if trade_type.dtype.kind in "iu":
+        return trade_type.astype(np.int8)
+    lookup = {name: code for code, name in enumerate(TRADE_TYPES)}
+    return np.array([lookup[t] for t in trade_type.tolist()], dtype=np.int8)
+
+
+def positions_from_trades(trade_type):
+    """
+    Position held after each bar: 1 long, -1 short, 0 flat.
+
+    'long' and 'short_reversal' go long, 'short' and 'long_reversal' go short, 'square_off'
+    goes flat and 'hold' keeps the previous position.
+    """
+    codes = trade_type_codes(trade_type)
+    target = np.zeros(len(codes))
+    target[(codes == LONG) | (codes == SHORT_REVERSAL)] = 1
+    target[(codes == SHORT) | (codes == LONG_REVERSAL)] = -1
+
+    # Carry the last position change forward over the 'hold' bars
+    changed = (target != 0) | (codes == SQUARE_OFF)
+    last = np.where(changed, np.arange(len(codes)), 0)
+    np.maximum.accumulate(last, out=last)
+    return np.where(changed[last], target[last], 0.0)
+
+
+def _as_times(datetime):
+    times = np.asarray(datetime)
+    if times.dtype.kind != 'M':
+        times = pd.to_datetime(pd.Series(times)).to_numpy()
+    return times.astype('datetime64[ns]')
+
+
+def periods_per_year(datetime):
+    """
+    Number of bars per year implied by the median spacing of the timestamps.
+    """
+    times = _as_times(datetime)
+    if len(times) < 2:
+        return np.nan
+    step = np.median(np.diff(times).astype(np.int64)) / 1e9
+    return SECONDS_PER_YEAR / step if step > 0 else np.nan
+
+
+def bar_returns(close, position, fee=0.0):
+    """
+    Strategy return of every bar: the position held after the previous bar times the close to
+    close return, minus `fee` per unit of position change.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    position = np.asarray(position, dtype=np.float64)
+    returns = np.zeros(len(close))
+    if len(close) > 1:
+        returns[1:] = position[:-1] * (close[1:] / close[:-1] - 1)
+    if fee:
+        changes = np.abs(np.diff(position, prepend=0.0))
+        returns -= fee * changes
+    return returns
+
+
+def sharpe_ratio(returns, periods):
+    """
+    Annualised Sharpe ratio of per-bar returns, NaN without variance.
+    """
+    std = returns.std(ddof=1) if len(returns) > 1 else np.nan
+    return returns.mean() / std * np.sqrt(periods) if std > 0 else np.nan
+
+
+def trade_returns(close, position):
+    """
+    Gross return of every trade, a trade being a run of bars holding the same non-zero position.
+
+    Returns:
+    - tuple of ndarray
+        (entry positions, exit positions, returns); the exit is the bar the position changes
+        again, or the last bar for a trade still open.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    position = np.asarray(position, dtype=np.float64)
+    n = len(close)
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0)
+
+    previous = np.concatenate(([0.0], position[:-1]))
+    changes = np.flatnonzero(position != previous)
+    entries = changes[position[changes] != 0]
+    exits = np.append(changes, n)[np.searchsorted(changes, entries, side='right')]
+    exits = np.minimum(exits, n - 1)
+
+    # Cumulative log growth of the position held so far, differenced between entry and exit
+    growth = np.zeros(n)
+    growth[1:] = np.cumsum(np.log1p(position[:-1] * (close[1:] / close[:-1] - 1)))
+    return entries, exits, np.expm1(growth[exits] - growth[entries])
+
+
+def quarterly_comparison(close, returns, datetime):
+    """
+    Strategy against buy-and-hold for every calendar quarter.
+
+    Returns:
+    - DataFrame
+        quarter, strategy_return, benchmark_return, outperformed.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    times = _as_times(datetime)
+    if len(close) == 0:
+        return pd.DataFrame(columns=['quarter', 'strategy_return', 'benchmark_return', 'outperformed'])
+
+    # Quarter of every bar as year * 4 + quarter index, relabelled 0..k-1
+    months = times.astype('datetime64[M]').astype(np.int64)
+    quarter_ids = months // 3
+    labels, quarter = np.unique(quarter_ids, return_inverse=True)
+
+    benchmark = np.zeros(len(close))
+    benchmark[1:] = close[1:] / close[:-1] - 1
+    strategy_growth = np.bincount(quarter, weights=np.log1p(returns), minlength=len(labels))
+    benchmark_growth = np.bincount(quarter, weights=np.log1p(benchmark), minlength=len(labels))
+
+    table = pd.DataFrame({
+        'quarter': [f"{1970 + q // 4}Q{q % 4 + 1}" for q in labels.tolist()],
+        'strategy_return': np.expm1(strategy_growth),
+        'benchmark_return': np.expm1(benchmark_growth),
+    })
+    table['outperformed'] = table['strategy_return'] > table['benchmark_return']
+    return table
+
+
+def summary_metrics(close, trade_type, datetime, fee=0.0):
+    """
+    Headline metrics of one backtest.
+
+    Returns:
+    - dict
+        total_return, sharpe, max_drawdown, win_rate, trades.
+    """
+    position = positions_from_trades(trade_type)
+    returns = bar_returns(close, position, fee=fee)
+    equity = np.cumprod(1 + returns)
+
+    sharpe = sharpe_ratio(returns, periods_per_year(datetime))
+    drawdown = equity / np.maximum.accumulate(equity) - 1 if len(equity) else np.zeros(0)
+    _, _, per_trade = trade_returns(close, position)
+
+    return {
+        'total_return': equity[-1] - 1 if len(equity) else 0.0,
+        'sharpe': sharpe,
+        'max_drawdown': drawdown.min() if len(drawdown) else 0.0,
+        'win_rate': np.mean(per_trade > 0) if len(per_trade) else np.nan,
+        'trades': len(per_trade),
+    }
+
+
+def evaluate(df, fee=0.0, initial_capital=1000):
+    """
+    Offline replacement for the untrade backtest of a result frame.
+
+    Parameters:
+    - df: DataFrame
+        Output of a strategy with 'datetime', 'close' and 'trade_type' columns.
+    - fee: float
+        Cost per unit of position change.
+    - initial_capital: float
+        Starting value of the equity curve.
+
+    Returns:
+    - dict
+        'metrics' (see summary_metrics(), plus quarters_outperformed / quarters),
+        'equity' (DataFrame with datetime, position, returns, equity, benchmark per bar) and
+        'quarters' (see quarterly_comparison()).
+    """
+    close = df['close'].to_numpy(dtype=np.float64)
+    times = _as_times(df['datetime'])
+    position = positions_from_trades(df['trade_type'])
+    returns = bar_returns(close, position, fee=fee)
+
+    equity = pd.DataFrame({
+        'datetime': times,
+        'position': position,
+        'returns': returns,
+        'equity': initial_capital * np.cumprod(1 + returns),
+        'benchmark': initial_capital * close / close[0] if len(close) else close,
+    })
+    quarters = quarterly_comparison(close, returns, times)
+
+    metrics = summary_metrics(close, df['trade_type'], times, fee=fee)
+    metrics['quarters_outperformed'] = int(quarters['outperformed'].sum())
+    metrics['quarters'] = len(quarters)
+    return {'metrics': metrics, 'equity': equity, 'quarters': quarters}
+
+
+# -------MAIN FUNCTION--------#
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest a strategy result CSV locally.")
+    parser.add_argument("csv_file_path")
+    parser.add_argument("--fee", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    report = evaluate(pd.read_csv(args.csv_file_path), fee=args.fee)
+    for name, value in report['metrics'].items():
+        print(f"{name}: {value}")
+    print(report['quarters'].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
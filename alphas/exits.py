@@ -0,0 +1,220 @@
+# Exit engine: stop loss, take profit and trailing stops for known entries, checked intrabar
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+# Codes of the 'reason' array returned by trade_exits()
+EXIT_REASONS = ("end", "stop_loss", "take_profit", "trailing_stop", "signal")
+END, STOP_LOSS, TAKE_PROFIT, TRAILING_STOP, SIGNAL = range(len(EXIT_REASONS))
+
+# Upper bound on the (trades x bars) block scanned at once
+_MAX_BLOCK_CELLS = 1 << 22
+
+
+def _oriented(values_long, values_short, long):
+    # Prices turned so that every trade profits when they rise: shorts use the negated other side
+    return np.where(long, values_long, -values_short)
+
+
+def trade_exits(high, low, close, entries, direction=1, stop_loss_pct=None, take_profit_pct=None,
+                trailing_stop_pct=None, atr=None, atr_multiplier=None, exit_signal=None, until=None,
+                open_=None, block=64):
+    """
+    Exit bar, price and reason of every trade entered at the close of an entry bar.
+
+    From the bar after the entry on, a long trade exits on the first bar whose low reaches its
+    stop or whose high reaches its take profit, or at the close of a bar with an opposite exit
+    signal; shorts mirror this. The trailing stops follow the best price since entry (highest
+    high for longs, lowest low for shorts) up to the previous bar, since the order of the high
+    and the low inside a bar is unknown. When a bar reaches both the stop and the take profit,
+    the stop is assumed to come first.
+
+    The bars after each entry are scanned in blocks for all open trades at once, with a
+    cumulative max along the block carrying the best price; the blocks double in width while
+    trades stay open, so a trade costs about twice its holding time.
+
+    Parameters:
+    - high, low, close: array of float
+    - entries: array of int
+        Entry bar of every trade.
+    - direction: int or array of int
+        1 for long, -1 for short, per trade or for all.
+    - stop_loss_pct: float
+        Fixed stop from the entry price.
+    - take_profit_pct: float
+        Take profit from the entry price.
+    - trailing_stop_pct: float
+        Stop trailing the best price since entry by this fraction.
+    - atr, atr_multiplier: array of float, float
+        Stop trailing the best price by atr_multiplier times the previous bar's ATR.
+    - exit_signal: array of int
+        -1 closes longs and 1 closes shorts at that bar's close.
+    - until: int or array of int
+        Bar (exclusive) by which a trade is closed at the latest, e.g. the next entry; its last
+        bar's close is used with reason 'end'. Defaults to the end of the data.
+    - open_: array of float
+        Opening prices: a bar gapping through a level fills at the open instead of the level.
+    - block: int
+        Bars scanned per trade in the first block.
+
+    Returns:
+    - dict
+        'entry', 'exit' (bar index), 'entry_price', 'exit_price', 'reason' (codes of
+        EXIT_REASONS), 'direction' and 'returns' (fraction, signed by direction), one per trade.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    entries = np.asarray(entries, dtype=np.int64)
+    m = len(entries)
+    d = np.broadcast_to(np.asarray(direction, dtype=np.float64), (m,)).copy()
+    until = np.full(m, n, dtype=np.int64) if until is None else \
+        np.minimum(np.broadcast_to(np.asarray(until, dtype=np.int64), (m,)), n)
+    if m and (entries.min() < 0 or entries.max() >= n):
+        raise IndexError("entries must be bar indices of the data")
+    if np.any(np.abs(d) != 1):
+        raise ValueError("direction must be 1 or -1")
+
+    entry_price = close[entries]
+    start = entries + 1
+    last = np.maximum(until - 1, entries)  # a trade with no bar left closes on its entry bar
+
+    exit_bar = last.copy()
+    exit_price = close[last]
+    reason = np.full(m, END, dtype=np.int8)
+
+    # Levels in oriented prices (see _oriented()), so one rule covers both directions: the stop is
+    # hit when the oriented low falls to it, the take profit when the oriented high rises to it
+    entry_oriented = d * entry_price
+    fixed_stop = entry_oriented * (1 - d * stop_loss_pct) if stop_loss_pct is not None else None
+    target = entry_oriented * (1 + d * take_profit_pct) if take_profit_pct is not None else None
+    use_atr = atr is not None and atr_multiplier is not None
+    if use_atr:
+        atr = np.asarray(atr, dtype=np.float64)
+    if exit_signal is not None:
+        exit_signal = np.asarray(exit_signal)
+    if open_ is not None:
+        open_ = np.asarray(open_, dtype=np.float64)
+
+    best = entry_oriented.copy()
+    active = np.flatnonzero(start < until)
+    width = max(int(block), 1)
+    while len(active):
+        width = min(width, max(_MAX_BLOCK_CELLS // len(active), block))
+        s, u = start[active], until[active]
+        dd = d[active][:, None]
+        long = dd > 0
+        cols = s[:, None] + np.arange(width)
+        inside = cols < u[:, None]
+        bars = np.minimum(cols, n - 1)
+
+        hi = _oriented(high[bars], low[bars], long)
+        lo = _oriented(low[bars], high[bars], long)
+        running = np.maximum(np.maximum.accumulate(hi, axis=1), best[active][:, None])
+        before = np.concatenate((best[active][:, None], running[:, :-1]), axis=1)  # best up to the previous bar
+
+        stop = np.full(hi.shape, -np.inf)
+        if fixed_stop is not None:
+            stop = np.broadcast_to(fixed_stop[active][:, None], hi.shape)
+        trailing = np.full(hi.shape, -np.inf)
+        if trailing_stop_pct is not None:
+            trailing = before * (1 - dd * trailing_stop_pct)
+        if use_atr:
+            trailing = np.fmax(trailing, before - atr_multiplier * atr[bars - 1])
+        level = np.fmax(stop, trailing)
+
+        stop_hit = lo <= level
+        target_hit = hi >= target[active][:, None] if target is not None else np.zeros(hi.shape, dtype=bool)
+        signal_hit = exit_signal[bars] == -dd if exit_signal is not None else np.zeros(hi.shape, dtype=bool)
+        at_end = cols == (u - 1)[:, None]
+        hit = (stop_hit | target_hit | signal_hit | at_end) & inside
+
+        done = hit.any(axis=1)
+        rows = np.flatnonzero(done)
+        j = hit[rows].argmax(axis=1)
+        trades = active[rows]
+        bar = cols[rows, j]
+        exit_bar[trades] = bar
+
+        # Reasons and fills by priority: stop, take profit, signal, end
+        row_stop, row_target, row_signal = stop_hit[rows, j], target_hit[rows, j], signal_hit[rows, j]
+        fill = close[bar] * d[trades]
+        why = np.full(len(rows), END, dtype=np.int8)
+        why[row_signal] = SIGNAL
+        if target is not None:
+            target_fill = target[trades]
+            if open_ is not None:
+                target_fill = np.maximum(target_fill, _oriented(open_[bar], open_[bar], d[trades] > 0))
+            fill = np.where(row_target, target_fill, fill)
+            why[row_target] = TAKE_PROFIT
+        stop_fill = level[rows, j]
+        if open_ is not None:
+            stop_fill = np.minimum(stop_fill, _oriented(open_[bar], open_[bar], d[trades] > 0))
+        fill = np.where(row_stop, stop_fill, fill)
+        why[row_stop] = np.where(stop[rows, j] >= trailing[rows, j], STOP_LOSS, TRAILING_STOP)[row_stop]
+        exit_price[trades] = fill * d[trades]
+        reason[trades] = why
+
+        still = ~done
+        carried = active[still]
+        best[carried] = running[still, -1]
+        start[carried] += width
+        active = carried
+        width *= 2
+
+    return {
+        'entry': entries,
+        'exit': exit_bar,
+        'entry_price': entry_price,
+        'exit_price': exit_price,
+        'reason': reason,
+        'direction': d.astype(np.int8),
+        'returns': d * (exit_price / entry_price - 1),
+    }
+
+
+def evaluate_exits(high, low, close, entries, direction=1, configs=(), fee=0.0, **fixed):
+    """
+    Score many exit configurations on the same entries, e.g. a stop / take profit grid.
+
+    Parameters:
+    - configs: iterable of dict
+        trade_exits() keyword arguments (stop_loss_pct, take_profit_pct, trailing_stop_pct,
+        atr_multiplier, ...), each evaluated with the `fixed` keyword arguments.
+    - fee: float
+        Cost per side as a fraction of the price.
+
+    Returns:
+    - DataFrame
+        One row per config: its parameters, mean_return, total_return (compounded), win_rate,
+        mean_holding (bars) and the share of each exit reason.
+    """
+    rows = []
+    for config in configs:
+        exits = trade_exits(high, low, close, entries, direction, **{**fixed, **config})
+        returns = exits['returns'] - 2 * fee
+        holding = exits['exit'] - exits['entry']
+        counts = np.bincount(exits['reason'], minlength=len(EXIT_REASONS))
+        row = dict(config)
+        row.update({
+            'trades': len(returns),
+            'mean_return': returns.mean() if len(returns) else np.nan,
+            'total_return': np.prod(1 + returns) - 1,
+            'win_rate': (returns > 0).mean() if len(returns) else np.nan,
+            'mean_holding': holding.mean() if len(holding) else np.nan,
+        })
+        row.update({f"exit_{name}": count / max(len(returns), 1) for name, count in zip(EXIT_REASONS, counts)})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def exit_grid(**spaces):
+    """
+    Every combination of the given exit parameter values, e.g.
+    exit_grid(stop_loss_pct=[0.02, 0.05], take_profit_pct=[0.05, 0.1, None]).
+    """
+    names = list(spaces)
+    return [dict(zip(names, values)) for values in itertools.product(*(spaces[name] for name in names))]
@@ -0,0 +1,85 @@
+# Slim result export: only the columns the backtester reads, in a compact format
+
+import numpy as np
+import pandas as pd
+
+# Everything the untrade backtester needs from a result file
+BACKTEST_COLUMNS = ('datetime', 'open', 'high', 'low', 'close', 'volume', 'signals', 'trade_type')
+
+
+def project_columns(df, columns=BACKTEST_COLUMNS):
+    """
+    Keep only `columns` (in that order) with compact dtypes: int8 signals and a categorical
+    trade_type. Requested columns the frame does not have are skipped, except 'signals'.
+    """
+    if 'signals' in columns and 'signals' not in df.columns:
+        raise KeyError("result frame has no 'signals' column")
+    slim = df[[column for column in columns if column in df.columns]]
+    dtypes = {}
+    if 'signals' in slim.columns:
+        dtypes['signals'] = np.int8
+    if 'trade_type' in slim.columns:
+        dtypes['trade_type'] = 'category'
+    return slim.astype(dtypes)
+
+
+def export_result(df, path, columns=BACKTEST_COLUMNS, float_format=None, fmt=None, compression=None):
+    """
+    Write a strategy result for the backtester.
+
+    Parameters:
+    - df: DataFrame
+        Output of strat().
+    - path: str
+    - columns: tuple of str
+        Column projection, None keeps every column.
+    - float_format: str
+        printf style format for floats in CSV output, e.g. '%.10g'. The default writes the shortest
+        text that reads back to the same float, which is already compact for exchange prices.
+    - fmt: str
+        'csv' or 'npz' (one typed array per column, readable with read_result()). Inferred from
+        the file name when None.
+    - compression: str
+        'gzip' for CSV output; also inferred from a '.gz' file name.
+
+    Returns:
+    - str
+        The path written.
+    """
+    slim = df if columns is None else project_columns(df, columns)
+    if fmt is None:
+        fmt = 'npz' if path.endswith('.npz') else 'csv'
+    if compression is None and path.endswith('.gz'):
+        compression = 'gzip'
+
+    if fmt == 'csv':
+        slim.to_csv(path, index=False, float_format=float_format, compression=compression)
+    elif fmt == 'npz':
+        arrays = {}
+        for column in slim.columns:
+            values = slim[column]
+            if column == 'datetime' and values.dtype == object:
+                values = pd.to_datetime(values)
+            if isinstance(values.dtype, pd.CategoricalDtype) or values.dtype == object:
+                arrays[column] = values.to_numpy().astype(str)  # fixed width unicode, no pickle
+            else:
+                arrays[column] = values.to_numpy()
+        save = np.savez_compressed if compression else np.savez
+        with open(path, 'wb') as f:
+            save(f, **arrays)
+    else:
+        raise ValueError(f"fmt must be 'csv' or 'npz', got {fmt!r}")
+    return path
+
+
+def read_result(path):
+    """
+    Read a result written by export_result() back into a DataFrame.
+    """
+    if path.endswith('.npz'):
+        with np.load(path, allow_pickle=False) as arrays:
+            df = pd.DataFrame({column: arrays[column] for column in arrays.files})
+        if 'trade_type' in df.columns:
+            df['trade_type'] = df['trade_type'].astype('category')
+        return df
+    return pd.read_csv(path)
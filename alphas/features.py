@@ -0,0 +1,241 @@
+# Indicator registry with a memoizing feature store (in memory and on disk)
+#
+# The shared STORE keeps results in memory only; set the ALPHAS_FEATURE_CACHE environment
+# variable to a directory to also cache them on disk there.
+
+import contextlib
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from alphas.adx import adx_features
+from alphas.ichimoku import Ichimoku
+from alphas.marubozu import marubozu_features
+from alphas.memory import downcast
+from alphas.profiling import stage
+from alphas.rolling import rolling_max
+from alphas.supertrend import Supertrend
+
+STORE_VERSION = 1
+
+
+# -------REGISTRY--------#
+# name -> {'inputs': columns read, 'params': defaults, 'version': int, 'function': fn(data, **params)}
+INDICATORS = {}
+
+
+def indicator(name, inputs, params=None, version=1):
+    """
+    Register an indicator function under `name`.
+
+    Parameters:
+    - inputs: tuple of str
+        Columns the function reads; only these are hashed for the cache key.
+    - params: dict
+        Parameter names and their defaults.
+    - version: int
+        Bump when the function's output changes, so stored results are not reused.
+    """
+    def register(function):
+        INDICATORS[name] = {'inputs': tuple(inputs), 'params': dict(params or {}), 'version': version,
+                            'function': function}
+        return function
+    return register
+
+
+@indicator('sma', inputs=('close',), params={'window': 14})
+def _sma(data, window):
+    close = pd.Series(np.asarray(data['close'], dtype=np.float64))
+    return {'SMA': close.rolling(window=window).mean().to_numpy()}
+
+
+@indicator('low_max', inputs=('low',), params={'window': 14})
+def _low_max(data, window):
+    return {'Low_Max': rolling_max(data['low'], window)}
+
+
+# Version 2: the ATR is Series.rolling().mean() to the last bit
+@indicator('supertrend', inputs=('high', 'low', 'close'), params={'atr_period': 5, 'multiplier': 3},
+           version=2)
+def _supertrend(data, atr_period, multiplier):
+    return Supertrend(atr_period=atr_period, multiplier=multiplier).batch(data)
+
+
+@indicator('ichimoku', inputs=('high', 'low', 'close'),
+           params={'tenkan': 9, 'kijun': 26, 'senkou': 52, 'chikou': 26})
+def _ichimoku(data, tenkan, kijun, senkou, chikou):
+    return Ichimoku(tenkan=tenkan, kijun=kijun, senkou=senkou, chikou=chikou).batch(data)
+
+
+# Version 2: Wilder smoothing seeded with the mean of the first `period` values
+@indicator('adx', inputs=('high', 'low', 'close'), params={'period': 14}, version=2)
+def _adx(data, period):
+    return adx_features(data, period=period)
+
+
+@indicator('marubozu', inputs=('open', 'high', 'low', 'close'),
+           params={'window': 15, 'std_mult': 1.8, 'band': 0.005})
+def _marubozu(data, window, std_mult, band):
+    return marubozu_features(data, window=window, std_mult=std_mult, band=band)
+
+
+# -------STORE--------#
+def dataset_hash(data, columns):
+    """
+    Hash of the values (and shapes) of `columns` of a DataFrame or dict of arrays.
+    """
+    digest = hashlib.sha256()
+    for column in columns:
+        values = np.ascontiguousarray(np.asarray(data[column], dtype=np.float64))
+        digest.update(f"{column}:{values.shape}".encode())
+        digest.update(values.view(np.uint8))
+    return digest.hexdigest()[:32]
+
+
+class FeatureStore:
+    """
+    Memoized indicator results keyed by (dataset hash, indicator, params).
+
+    Results live in an in-memory LRU of max_items entries and, when cache_dir is set, as one
+    .npz file per result on disk, evicted least recently used first beyond max_disk_bytes. The
+    returned arrays are shared between callers and read-only.
+
+    Parameters:
+    - max_items: int
+    - cache_dir: str
+        None keeps results in memory only.
+    - max_disk_bytes: int
+    """
+
+    def __init__(self, max_items=128, cache_dir=None, max_disk_bytes=1 << 30):
+        self.max_items = max_items
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self.hits = self.disk_hits = self.misses = 0
+
+    @classmethod
+    def from_env(cls, environ=None):
+        environ = os.environ if environ is None else environ
+        return cls(cache_dir=environ.get("ALPHAS_FEATURE_CACHE") or None)
+
+    def key(self, name, data, float_dtype=None, **params):
+        """
+        Cache key of an indicator on a dataset, the dtype of its floating outputs and its
+        parameters with the registered defaults filled in.
+        """
+        spec = INDICATORS[name]
+        unknown = set(params) - set(spec['params'])
+        if unknown:
+            raise TypeError(f"{name} has no parameters {sorted(unknown)}")
+        params = {**spec['params'], **params}
+        dtype_name = np.dtype(float_dtype or np.float64).name
+        blob = json.dumps([STORE_VERSION, name, spec['version'], dataset_hash(data, spec['inputs']), dtype_name,
+                           params], sort_keys=True, default=str)
+        return f"{name}-{hashlib.sha256(blob.encode()).hexdigest()[:32]}", params
+
+    def compute(self, name, data, float_dtype=None, **params):
+        """
+        Indicator `name` on `data` (DataFrame or dict with the indicator's input columns).
+
+        Parameters:
+        - float_dtype: dtype
+            Cast the floating outputs to this dtype before they are stored (np.float32 in the
+            scripts' LOW_MEMORY mode), so the store never holds a float64 copy of them.
+
+        Returns:
+        - dict
+            The indicator's arrays, computed only if this store has not seen the key before.
+        """
+        key, params = self.key(name, data, float_dtype, **params)
+        if key in self._memory:
+            self.hits += 1
+            self._memory.move_to_end(key)
+            return self._memory[key]
+
+        result = self._load(key)
+        if result is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            with stage(f"indicator.{name}", rows=len(data[INDICATORS[name]['inputs'][0]])):
+                result = {column: np.asarray(values) for column, values in
+                          INDICATORS[name]['function'](data, **params).items()}
+            if float_dtype is not None:
+                result = {column: downcast(values, float_dtype) for column, values in result.items()}
+            self._save(key, result)
+
+        for values in result.values():
+            values.flags.writeable = False
+        self._memory[key] = result
+        while len(self._memory) > self.max_items:
+            self._memory.popitem(last=False)
+        return result
+
+    def clear(self, disk=False):
+        """
+        Forget the in-memory results, and the stored files too when disk is True.
+        """
+        self._memory.clear()
+        if disk and self.cache_dir and os.path.isdir(self.cache_dir):
+            for entry in os.listdir(self.cache_dir):
+                if entry.endswith(".npz"):
+                    with contextlib.suppress(FileNotFoundError):
+                        os.remove(os.path.join(self.cache_dir, entry))
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def _load(self, key):
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with np.load(path, allow_pickle=False) as arrays:
+                result = {column: arrays[column] for column in arrays.files}
+        except (OSError, ValueError):
+            return None
+        with contextlib.suppress(OSError):
+            os.utime(path)  # mark as recently used for the disk eviction
+        return result
+
+    def _save(self, key, result):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **result)
+        os.replace(tmp_path, path)  # atomic, concurrent workers may store the same key
+        self._evict()
+
+    def _evict(self):
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".npz"):
+                with contextlib.suppress(FileNotFoundError):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_disk_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            total -= size
+
+
+# Shared store used by the scripts and strategy pipelines, configured from the environment
+STORE = FeatureStore.from_env()
+
+
+def compute(name, data, **params):
+    """
+    Indicator `name` on `data` through the shared STORE, see FeatureStore.compute().
+    """
+    return STORE.compute(name, data, **params)
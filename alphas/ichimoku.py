@@ -0,0 +1,118 @@
+# Ichimoku Cloud indicator with batch backfill and O(1) live updates
+
+import math
+from collections import deque
+
+import numpy as np
+
+from alphas.rolling import RollingExtremum, rolling_extrema
+
+ICHIMOKU_COLUMNS = ('Tenkan-sen', 'Kijun-sen', 'Senkou Span A', 'Senkou Span B', 'Chikou Span')
+
+
+def ichimoku_lines(high, low, close, tenkan=9, kijun=26, senkou=52, chikou=26, backend="auto"):
+    """
+    Ichimoku lines of a whole history, for 1-D series or 2-D (time x symbol) arrays. Every window
+    of high and low comes out of a single rolling_extrema() pass per series.
+
+    Returns:
+    - dict
+        One array per name in ICHIMOKU_COLUMNS.
+    """
+    windows = (tenkan, kijun, senkou)
+    close = np.asarray(close, dtype=np.float64)
+    highs = rolling_extrema(high, windows, "max", backend=backend)
+    lows = rolling_extrema(low, windows, "min", backend=backend)
+
+    tenkan_sen = (highs[tenkan] + lows[tenkan]) / 2  # Conversion Line
+    kijun_sen = (highs[kijun] + lows[kijun]) / 2  # Base Line
+    chikou_span = np.full(close.shape, np.nan)  # Lagging Span
+    chikou_span[chikou:] = close[:len(close) - chikou]
+
+    return {
+        'Tenkan-sen': tenkan_sen,
+        'Kijun-sen': kijun_sen,
+        'Senkou Span A': (tenkan_sen + kijun_sen) / 2,  # Leading Span A
+        'Senkou Span B': (highs[senkou] + lows[senkou]) / 2,  # Leading Span B
+        'Chikou Span': chikou_span,
+    }
+
+
+class Ichimoku:
+    """
+    Ichimoku Cloud lines as used by the Ensemble Strategy (spans are not shifted forward).
+
+    Parameters:
+    - tenkan, kijun, senkou: int
+        High-low windows of the Conversion Line, Base Line and Leading Span B.
+    - chikou: int
+        Lag of the Lagging Span.
+    """
+
+    def __init__(self, tenkan=9, kijun=26, senkou=52, chikou=26, backend="auto"):
+        self.tenkan = tenkan
+        self.kijun = kijun
+        self.senkou = senkou
+        self.chikou = chikou
+        self.backend = backend
+        self.reset()
+
+    def reset(self):
+        windows = (self.tenkan, self.kijun, self.senkou)
+        self._highs = [RollingExtremum(window, "max") for window in windows]
+        self._lows = [RollingExtremum(window, "min") for window in windows]
+        self._closes = deque(maxlen=self.chikou + 1)
+
+    def batch(self, arrays):
+        """
+        Compute the indicator over a full history, see ichimoku_lines().
+
+        Parameters:
+        - arrays: DataFrame or dict
+            'high', 'low' and 'close' columns.
+
+        Returns:
+        - dict
+            One array per name in ICHIMOKU_COLUMNS.
+        """
+        windows = (self.tenkan, self.kijun, self.senkou)
+        close = np.asarray(arrays['close'], dtype=np.float64)
+        lines = ichimoku_lines(arrays['high'], arrays['low'], close, self.tenkan, self.kijun, self.senkou,
+                               self.chikou, backend=self.backend)
+
+        # Carry the state forward for live updates
+        self.reset()
+        start = max(len(close) - max(windows + (self.chikou + 1,)), 0)
+        for high, low, value in zip(np.asarray(arrays['high'], dtype=np.float64)[start:].tolist(),
+                                    np.asarray(arrays['low'], dtype=np.float64)[start:].tolist(),
+                                    close[start:].tolist()):
+            self._push(high, low, value)
+
+        return lines
+
+    def _push(self, high, low, close):
+        mids = [(highest.update(high) + lowest.update(low)) / 2 for highest, lowest in zip(self._highs, self._lows)]
+        self._closes.append(close)
+        return mids
+
+    def update(self, bar):
+        """
+        Advance the indicator by one bar.
+
+        Parameters:
+        - bar: dict or Series
+            Must provide 'high', 'low' and 'close'.
+
+        Returns:
+        - dict
+            The ICHIMOKU_COLUMNS values for this bar.
+        """
+        tenkan, kijun, senkou = self._push(float(bar['high']), float(bar['low']), float(bar['close']))
+        full = len(self._closes) == self._closes.maxlen
+        return {
+            'Tenkan-sen': tenkan,
+            'Kijun-sen': kijun,
+            'Senkou Span A': (tenkan + kijun) / 2,
+            'Senkou Span B': senkou,
+            'Chikou Span': self._closes[0] if full else math.nan,
+        }
@@ -0,0 +1,43 @@
+# Optional numba support shared by the array kernels
+
+import functools
+import importlib.util
+
+# Whether numba is installed, without importing it: the import alone costs about half a second,
+# which scripts, --help and pool workers that never run a compiled kernel should not pay
+HAVE_NUMBA = importlib.util.find_spec("numba") is not None
+
+
+def jit(func):
+    """
+    Compile a kernel with numba when it is installed, otherwise return it unchanged.
+
+    numba is imported and the kernel compiled (or loaded from numba's cache) on the first call.
+    """
+    if not HAVE_NUMBA:
+        return func
+    compiled = None
+
+    @functools.wraps(func)
+    def dispatch(*args, **kwargs):
+        nonlocal compiled
+        if compiled is None:
+            import numba
+            compiled = numba.njit(cache=True, nogil=True)(func)
+        return compiled(*args, **kwargs)
+    return dispatch
+
+
+def use_numba(backend):
+    """
+    Resolve a backend argument ('auto', 'numba' or 'numpy') to whether numba should be used.
+    """
+    if backend == "auto":
+        return HAVE_NUMBA
+    if backend == "numba":
+        if not HAVE_NUMBA:
+            raise ImportError("backend='numba' requires the numba package")
+        return True
+    if backend == "numpy":
+        return False
+    raise ValueError(f"backend must be 'auto', 'numba' or 'numpy', got {backend!r}")
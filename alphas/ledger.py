@@ -0,0 +1,231 @@
+# Columnar trade ledger: one growable NumPy array per field, with export and trade statistics
+
+import numpy as np
+import pandas as pd
+
+from alphas.evaluate import positions_from_trades, trade_returns
+
+# Field -> dtype of the ledger columns
+LEDGER_FIELDS = {
+    'entry': np.int64,         # bar index of the entry (at its close)
+    'exit': np.int64,          # bar index of the exit, the last bar for a trade still open
+    'direction': np.int8,      # 1 long, -1 short
+    'entry_price': np.float64,
+    'exit_price': np.float64,
+    'size': np.float64,        # units held
+    'still_open': np.bool_,    # not closed by the last bar
+}
+
+
+class TradeLedger:
+    """
+    Trades stored column-wise in preallocated arrays that double when full, so appending is
+    amortized O(1) and no per-trade object is created.
+
+    Parameters:
+    - capacity: int
+        Trades to allocate room for up front.
+    - datetime: array
+        Timestamps of the bars the entry / exit indices refer to, used by to_frame().
+    """
+
+    def __init__(self, capacity=1024, datetime=None):
+        self._columns = {name: np.empty(max(capacity, 1), dtype=dtype) for name, dtype in LEDGER_FIELDS.items()}
+        self._size = 0
+        self.datetime = None if datetime is None else np.asarray(datetime)
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, name):
+        """
+        The filled part of a column (a view, valid until the next append).
+        """
+        return self._columns[name][:self._size]
+
+    def _reserve(self, extra):
+        needed = self._size + extra
+        capacity = len(self._columns['entry'])
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity)
+        for name, values in self._columns.items():
+            grown = np.empty(capacity, dtype=values.dtype)
+            grown[:self._size] = values[:self._size]
+            self._columns[name] = grown
+
+    def append(self, entry, exit, entry_price, exit_price, direction=1, size=1.0, still_open=False):
+        """
+        Record one trade.
+        """
+        self._reserve(1)
+        i = self._size
+        row = {'entry': entry, 'exit': exit, 'direction': direction, 'entry_price': entry_price,
+               'exit_price': exit_price, 'size': size, 'still_open': still_open}
+        for name, value in row.items():
+            self._columns[name][i] = value
+        self._size += 1
+
+    def extend(self, entry, exit, entry_price, exit_price, direction=1, size=1.0, still_open=False):
+        """
+        Record many trades at once from arrays (scalars apply to all of them).
+        """
+        entry = np.asarray(entry)
+        count = len(entry)
+        self._reserve(count)
+        row = {'entry': entry, 'exit': exit, 'direction': direction, 'entry_price': entry_price,
+               'exit_price': exit_price, 'size': size, 'still_open': still_open}
+        for name, value in row.items():
+            self._columns[name][self._size:self._size + count] = value
+        self._size += count
+
+    # -------BUILDERS--------#
+    @classmethod
+    def from_positions(cls, position, close, datetime=None, initial_capital=None):
+        """
+        Ledger of the trades of a position vector (1 long, -1 short, 0 flat after each bar), a
+        trade being a run of bars holding the same position, entered and exited at the close.
+
+        Parameters:
+        - initial_capital: float
+            Reinvest the whole capital in every trade, starting from this amount: sizes compound
+            with the trade returns. None trades one unit each time.
+        """
+        close = np.asarray(close, dtype=np.float64)
+        position = np.asarray(position, dtype=np.float64)
+        entries, exits, returns = trade_returns(close, position)
+        ledger = cls(capacity=len(entries), datetime=datetime)
+
+        direction = np.sign(position[entries]).astype(np.int8)
+        entry_price = close[entries]
+        still_open = np.zeros(len(entries), dtype=bool)
+        if len(entries) and position[-1] != 0:
+            still_open[-1] = True  # the last run reaches the end of the data
+
+        size = 1.0
+        if initial_capital is not None:
+            # Capital before every trade: the starting capital grown by the earlier trades
+            growth = 1 + direction * (close[exits] / entry_price - 1)
+            capital = initial_capital * np.concatenate(([1.0], np.cumprod(growth)[:-1]))
+            size = capital / entry_price
+        ledger.extend(entries, exits, entry_price, close[exits], direction, size, still_open)
+        return ledger
+
+    @classmethod
+    def from_trade_types(cls, trade_type, close, datetime=None, initial_capital=None):
+        """
+        from_positions() of a strategy's 'trade_type' column (strings or accounting codes).
+        """
+        return cls.from_positions(positions_from_trades(trade_type), close, datetime, initial_capital)
+
+    # -------DERIVED COLUMNS--------#
+    @property
+    def holding(self):
+        """
+        Bars between entry and exit.
+        """
+        return self['exit'] - self['entry']
+
+    @property
+    def returns(self):
+        """
+        Return of every trade as a fraction, signed by direction.
+        """
+        return self['direction'] * (self['exit_price'] / self['entry_price'] - 1)
+
+    @property
+    def profit_loss(self):
+        return self['direction'] * self['size'] * (self['exit_price'] - self['entry_price'])
+
+    def to_frame(self):
+        """
+        One row per trade: entry / exit bars and times, direction, prices, size, the capital
+        before and after, profit_loss, return, holding (bars) and still_open.
+        """
+        frame = pd.DataFrame({name: self[name] for name in LEDGER_FIELDS if name != 'still_open'})
+        if self.datetime is not None:
+            frame.insert(1, 'entry_time', self.datetime[self['entry']])
+            frame.insert(3, 'exit_time', self.datetime[self['exit']])
+        frame['initial_capital'] = self['size'] * self['entry_price']
+        frame['final_capital'] = frame['initial_capital'] + self.profit_loss
+        frame['profit_loss'] = self.profit_loss
+        frame['return'] = self.returns
+        frame['holding'] = self.holding
+        frame['still_open'] = self['still_open']
+        return frame
+
+    # -------EXPORT--------#
+    def to_csv(self, path, **kwargs):
+        self.to_frame().to_csv(path, index=False, **kwargs)
+        return path
+
+    def to_parquet(self, path, **kwargs):
+        """
+        Write the trades as Parquet (needs pyarrow or fastparquet, see DataFrame.to_parquet()).
+        """
+        self.to_frame().to_parquet(path, index=False, **kwargs)
+        return path
+
+    # -------STATISTICS--------#
+    def holding_histogram(self, bins=20):
+        """
+        Histogram of the holding times in bars, as (counts, bin edges) from np.histogram().
+        """
+        return np.histogram(self.holding, bins=bins)
+
+    def pnl_distribution(self, quantiles=(0.05, 0.25, 0.5, 0.75, 0.95)):
+        """
+        Distribution of the trade returns: trades, mean, std, quantiles, win rate, mean win and
+        loss, and profit factor (gross gains over gross losses).
+        """
+        returns = self.returns
+        gains = returns[returns > 0]
+        losses = returns[returns < 0]
+        stats = {
+            'trades': len(returns),
+            'mean': returns.mean() if len(returns) else np.nan,
+            'std': returns.std(ddof=1) if len(returns) > 1 else np.nan,
+        }
+        values = np.quantile(returns, quantiles) if len(returns) else np.full(len(quantiles), np.nan)
+        stats.update({f"q{round(q * 100):02d}": value for q, value in zip(quantiles, values)})
+        stats.update({
+            'win_rate': len(gains) / len(returns) if len(returns) else np.nan,
+            'mean_win': gains.mean() if len(gains) else np.nan,
+            'mean_loss': losses.mean() if len(losses) else np.nan,
+            'profit_factor': gains.sum() / -losses.sum() if len(losses) else np.nan,
+        })
+        return pd.Series(stats)
+
+    def excursions(self, high, low):
+        """
+        Maximum adverse and favourable excursion of every trade over the bars after its entry up
+        to its exit, as fractions of the entry price (MAE <= 0 <= MFE).
+
+        All trades are reduced at once: their bar ranges are laid end to end and reduced with
+        np.minimum / np.maximum.reduceat.
+
+        Returns:
+        - tuple of ndarray
+            (mae, mfe); 0 for trades exiting on their entry bar.
+        """
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        entry, lengths = self['entry'], self.holding
+        mae = np.zeros(len(self))
+        mfe = np.zeros(len(self))
+        spans = np.flatnonzero(lengths > 0)
+        if len(spans) == 0:
+            return mae, mfe
+
+        # Bars entry + 1 .. exit of every trade, concatenated
+        counts = lengths[spans]
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        bars = np.arange(counts.sum()) - np.repeat(starts, counts) + np.repeat(entry[spans] + 1, counts)
+        highest = np.maximum.reduceat(high[bars], starts)
+        lowest = np.minimum.reduceat(low[bars], starts)
+
+        price = self['entry_price'][spans]
+        long = self['direction'][spans] > 0
+        mfe[spans] = np.where(long, highest / price - 1, 1 - lowest / price)
+        mae[spans] = np.where(long, lowest / price - 1, 1 - highest / price)
+        return np.minimum(mae, 0.0), np.maximum(mfe, 0.0)
@@ -0,0 +1,96 @@
+# Marubozu / candle shadow features for the Ensemble Strategy
+
+import numpy as np
+import pandas as pd
+
+MARUBOZU_COLUMNS = ('shadow', 'abs_diff', 'avg_abs_diff_15d', 'new_column', 'signal_1')
+
+
+def candle_shadow(open_, high, low, close):
+    """
+    Closing shadow relative to the candle body.
+
+    For a bullish candle this is (close - high) / |close - open|, otherwise (close - low) / |close - open|.
+    Doji candles (open == close) have no body to divide by and get a shadow of 0, which means
+    "no Marubozu reading" downstream. Works on 1-D series or 2-D (time x symbol) arrays.
+    """
+    open_ = np.asarray(open_, dtype=np.float64)
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+
+    shadow = np.where(close > open_, close - high, close - low)
+    body = np.abs(close - open_)
+    return np.divide(shadow, body, out=np.zeros_like(shadow), where=body != 0)
+
+
+def body_threshold(abs_diff, window=15, std_mult=1.8):
+    """
+    Rolling mean of the candle body plus std_mult rolling standard deviations.
+    The first bar has no standard deviation yet and comes back NaN.
+    """
+    abs_diff = np.asarray(abs_diff, dtype=np.float64)
+    frame = pd.DataFrame(abs_diff) if abs_diff.ndim == 2 else pd.Series(abs_diff)
+    rolling = frame.rolling(window=window, min_periods=1)
+    return (rolling.mean() + std_mult * rolling.std()).to_numpy()
+
+
+def marubozu_score(shadow, abs_diff, threshold):
+    """
+    -shadow / body for candles whose body is larger than the threshold, 0 elsewhere.
+    """
+    shadow = np.asarray(shadow, dtype=np.float64)
+    abs_diff = np.asarray(abs_diff, dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        selected = (shadow != 0) & (abs_diff > threshold)
+    score = np.zeros_like(shadow)
+    # A selected candle always has a body (abs_diff > threshold >= 0), so this never divides by zero
+    score[selected] = -1 / abs_diff[selected] * shadow[selected]
+    return score
+
+
+def marubozu_signal(score, band=0.005):
+    """
+    1 for small negative scores (-band, 0), -1 for small positive scores (0, band), 0 otherwise.
+    """
+    score = np.asarray(score, dtype=np.float64)
+    return np.select(
+        [(score > -band) & (score < 0), (score > 0) & (score < band)],
+        [1, -1],
+        default=0,
+    )
+
+
+def marubozu_features(df, window=15, std_mult=1.8, band=0.005):
+    """
+    All Marubozu columns of the Ensemble Strategy in one pass.
+
+    Parameters:
+    - df: DataFrame or dict
+        'open', 'high', 'low' and 'close' columns (1-D, or 2-D time x symbol arrays).
+    - window: int
+        Rolling window for the body threshold.
+    - std_mult: float
+        Standard deviations added to the rolling mean body.
+    - band: float
+        Width of the score band that produces a signal.
+
+    Returns:
+    - dict
+        One array per name in MARUBOZU_COLUMNS.
+    """
+    open_ = np.asarray(df['open'], dtype=np.float64)
+    close = np.asarray(df['close'], dtype=np.float64)
+
+    shadow = candle_shadow(open_, df['high'], df['low'], close)
+    abs_diff = np.abs(open_ - close)
+    threshold = body_threshold(abs_diff, window=window, std_mult=std_mult)
+    score = marubozu_score(shadow, abs_diff, threshold)
+
+    return {
+        'shadow': shadow,
+        'abs_diff': abs_diff,
+        'avg_abs_diff_15d': threshold,
+        'new_column': score,
+        'signal_1': marubozu_signal(score, band=band),
+    }
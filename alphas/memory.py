@@ -0,0 +1,58 @@
+# Memory accounting and compact column helpers for the process_data / strat pipelines
+
+import sys
+
+import numpy as np
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """
+    Peak resident set size of this process so far, in MB (NaN where it cannot be measured).
+    """
+    if resource is None:
+        return np.nan
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KB elsewhere
+
+
+def frame_mb(df):
+    """
+    Memory held by a DataFrame's columns (strings and categories included), in MB.
+    """
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+
+def downcast(values, float_dtype=np.float32):
+    """
+    Cast a floating array to float_dtype without copying when it already is; other dtypes
+    (bool flags, integer signals) are returned unchanged.
+    """
+    values = np.asarray(values)
+    return values.astype(float_dtype, copy=False) if values.dtype.kind == 'f' else values
+
+
+def select_rows(df, mask):
+    """
+    Rows of df where mask is True as a new frame, copying every column once and nothing else;
+    the frame can take new columns without pandas' chained assignment warning.
+    """
+    mask = np.asarray(mask, dtype=bool)
+    return pd.DataFrame({column: df[column].to_numpy()[mask] for column in df.columns}, index=df.index[mask])
+
+
+def valid_rows(*columns):
+    """
+    True where none of the floating columns is NaN (the rows dropna() keeps).
+    """
+    mask = np.ones(len(columns[0]), dtype=bool)
+    for values in columns:
+        values = np.asarray(values)
+        if values.dtype.kind == 'f':
+            mask &= ~np.isnan(values)
+    return mask
@@ -0,0 +1,161 @@
+# Monte Carlo baseline: the strategy against random signals with the same trading pattern
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from alphas.evaluate import bar_returns, periods_per_year, positions_from_trades, sharpe_ratio
+
+
+def trade_profile(position):
+    """
+    Trades of a position vector, a trade being a run of bars holding the same non-zero position.
+
+    Returns:
+    - tuple of ndarray
+        (entries, holding times in bars, directions); a trade still open at the end holds up to
+        the last bar.
+    """
+    position = np.asarray(position, dtype=np.float64)
+    n = len(position)
+    previous = np.concatenate(([0.0], position[:-1]))
+    changes = np.flatnonzero(position != previous)
+    entries = changes[position[changes] != 0]
+    exits = np.append(changes, n)[np.searchsorted(changes, entries, side='right')]
+    return entries, exits - entries, np.sign(position[entries]).astype(np.int8)
+
+
+def random_trades(n, holding, direction, n_sims, rng):
+    """
+    n_sims random trade sequences over n bars, each a shuffle of the same trades placed at random.
+
+    Every simulation has exactly the real number of trades, the real holding times and the real
+    long / short mix; only their order and the flat gaps between them are random.
+
+    Returns:
+    - tuple of ndarray
+        (entries, holding, direction), each of shape (n_sims, trades).
+    """
+    holding = np.asarray(holding, dtype=np.int64)
+    trades = len(holding)
+    free = n - holding.sum()
+    if free < 0:
+        raise ValueError("the trades hold more bars than there are")
+
+    holding = rng.permuted(np.broadcast_to(holding, (n_sims, trades)), axis=1)
+    direction = rng.permuted(np.broadcast_to(direction, (n_sims, trades)), axis=1)
+
+    # Flat bars before every trade: sorted uniform cut points split the free bars at random
+    gaps_before = np.sort(rng.integers(0, free + 1, size=(n_sims, trades)), axis=1)
+    entries = gaps_before + np.cumsum(holding, axis=1) - holding
+    return entries, holding, direction
+
+
+def simulate_sharpes(close, entries, holding, direction, periods, fee=0.0):
+    """
+    Sharpe ratio of every row of 2-D trade arrays (see random_trades()), with the accounting of
+    evaluate.bar_returns(): the position held after the previous bar earns the close to close
+    return and every unit of position change costs `fee`.
+
+    Only the sum and the sum of squares of the per-bar returns are needed, and a trade adds a
+    difference of prefix sums to each, so a simulation costs O(trades) instead of O(bars).
+    """
+    close = np.asarray(close, dtype=np.float64)
+    n = len(close)
+    returns = np.zeros(n)
+    returns[1:] = close[1:] / close[:-1] - 1
+    total_to = np.cumsum(returns)
+    squares_to = np.cumsum(returns * returns)
+
+    exits = entries + holding
+    last = np.minimum(exits, n - 1)  # a trade earns from the bar after its entry to its exit
+    d = direction.astype(np.float64)
+    total = (d * (total_to[last] - total_to[entries])).sum(axis=1)
+    squares = (squares_to[last] - squares_to[entries]).sum(axis=1)
+
+    if fee:
+        # A trade entered on the bar the previous one exits changes the position by |d - d_prev|
+        # there, otherwise entries and exits change it by 1
+        adjacent = np.zeros(entries.shape, dtype=bool)
+        adjacent[:, 1:] = exits[:, :-1] == entries[:, 1:]
+        before = np.zeros(d.shape)
+        before[:, 1:] = np.where(adjacent[:, 1:], d[:, :-1], 0.0)
+        entry_change = np.abs(d - before)
+        exit_change = np.ones(d.shape)
+        exit_change[:, :-1] = ~adjacent[:, 1:]
+        exit_change[exits >= n] = 0.0
+
+        # The changing bar's return is held_position * return - fee * change
+        cross = (entry_change * before * returns[entries]).sum(axis=1) + \
+            (exit_change * d * returns[last]).sum(axis=1)
+        total -= fee * (entry_change.sum(axis=1) + exit_change.sum(axis=1))
+        squares += fee * fee * ((entry_change ** 2).sum(axis=1) + exit_change.sum(axis=1)) - 2 * fee * cross
+
+    mean = total / n
+    variance = (squares - total * mean) / (n - 1) if n > 1 else np.full(len(total), np.nan)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpes = mean / np.sqrt(variance) * np.sqrt(periods)
+    return np.where(variance > 0, sharpes, np.nan)
+
+
+def random_signal_baseline(close, trade_type, datetime, n_sims=10000, seed=None, fee=0.0):
+    """
+    Compare a strategy with n_sims random signal vectors of the same trade count, holding-time
+    distribution and long / short mix.
+
+    Parameters:
+    - close: array
+    - trade_type: array
+        'trade_type' column (strings or accounting codes) of the strategy.
+    - datetime: array
+    - n_sims: int
+    - seed: int
+    - fee: float
+        Cost per unit of position change, applied to the strategy and the simulations alike.
+
+    Returns:
+    - dict
+        'sharpe' of the strategy, 'random_sharpes' (n_sims,), 'percentile' of the strategy among
+        them (0-100, NaN simulations count as below) and 'p_value' (share of simulations at least
+        as good).
+    """
+    close = np.asarray(close, dtype=np.float64)
+    periods = periods_per_year(datetime)
+    position = positions_from_trades(trade_type)
+    sharpe = sharpe_ratio(bar_returns(close, position, fee=fee), periods)
+
+    _, holding, direction = trade_profile(position)
+    rng = np.random.default_rng(seed)
+    entries, holding, direction = random_trades(len(close), holding, direction, n_sims, rng)
+    random_sharpes = simulate_sharpes(close, entries, holding, direction, periods, fee=fee)
+
+    at_least = np.count_nonzero(random_sharpes >= sharpe)
+    return {
+        'sharpe': sharpe,
+        'random_sharpes': random_sharpes,
+        'percentile': 100.0 * np.count_nonzero(random_sharpes < sharpe) / n_sims if n_sims else np.nan,
+        'p_value': (at_least + 1) / (n_sims + 1),
+    }
+
+
+# -------MAIN FUNCTION--------#
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank a strategy result against random signals.")
+    parser.add_argument("csv_file_path", help="result CSV with datetime, close and trade_type")
+    parser.add_argument("--sims", type=int, default=10000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--fee", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    df = pd.read_csv(args.csv_file_path)
+    report = random_signal_baseline(df['close'], df['trade_type'], df['datetime'], n_sims=args.sims,
+                                    seed=args.seed, fee=args.fee)
+    sharpes = report['random_sharpes']
+    print(f"strategy sharpe: {report['sharpe']:.4f}")
+    print(f"random sharpe: mean {np.nanmean(sharpes):.4f}, 95th percentile {np.nanpercentile(sharpes, 95):.4f}")
+    print(f"percentile: {report['percentile']:.2f}, p-value: {report['p_value']:.4f}")
+
+
+if __name__ == "__main__":
+    main()
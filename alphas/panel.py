@@ -0,0 +1,263 @@
+# Multi-symbol panels: OHLCV of a whole universe as aligned (time x symbol) arrays
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from alphas.accounting import ensemble_positions, trade_type_labels
+from alphas.batch import _parse_symbol
+from alphas.data import load_ohlcv
+from alphas.evaluate import positions_from_trades, summary_metrics
+from alphas.export import BACKTEST_COLUMNS, export_result
+from alphas.ichimoku import ichimoku_lines
+from alphas.marubozu import marubozu_features
+from alphas.profiling import stage
+from alphas.run import _parse_param
+from alphas.strategies import ensemble_signal, full_params
+from alphas.supertrend import supertrend_bands
+
+PANEL_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class Panel:
+    """
+    OHLCV of several symbols on one shared, sorted time axis. Every field is a (time x symbol)
+    array holding NaN where a symbol has no bar (before its first bar or in a gap of its data).
+
+    Indexing a panel by field name returns that array, so true_range(), rolling_mean(),
+    supertrend_bands(), ichimoku_lines() and marubozu_features() compute a whole universe in one
+    call along axis 0.
+
+    Parameters:
+    - datetime: array of datetime64
+        Shared time axis.
+    - symbols: list of str
+        Column names.
+    - fields: dict
+        field -> (time x symbol) array.
+    """
+
+    def __init__(self, datetime, symbols, fields):
+        self.datetime = np.asarray(datetime)
+        self.symbols = list(symbols)
+        self.fields = dict(fields)
+        shape = (len(self.datetime), len(self.symbols))
+        for name, values in self.fields.items():
+            if values.shape != shape:
+                raise ValueError(f"field {name!r} has shape {values.shape}, expected {shape}")
+
+    def __getitem__(self, field):
+        return self.fields[field]
+
+    def __len__(self):
+        return len(self.datetime)
+
+    @property
+    def shape(self):
+        return len(self.datetime), len(self.symbols)
+
+    @classmethod
+    def from_frames(cls, frames, fields=PANEL_FIELDS, dtype=np.float64):
+        """
+        Align per-symbol OHLCV frames on the union of their timestamps.
+
+        Parameters:
+        - frames: dict
+            symbol -> DataFrame with a 'datetime' column and the fields.
+        - fields: tuple of str
+            Fields to keep; those missing from any frame are skipped.
+        - dtype: dtype
+            dtype of the panel arrays (np.float32 halves their size, indicators still compute
+            in float64).
+        """
+        symbols = list(frames)
+        times = [pd.to_datetime(frames[symbol]['datetime']).to_numpy(dtype='datetime64[ns]') for symbol in symbols]
+        datetime = np.unique(np.concatenate(times)) if times else np.empty(0, dtype='datetime64[ns]')
+        fields = [field for field in fields if all(field in frames[symbol] for symbol in symbols)]
+
+        arrays = {field: np.full((len(datetime), len(symbols)), np.nan, dtype=dtype, order="F") for field in fields}
+        for j, (symbol, own) in enumerate(zip(symbols, times)):
+            rows = np.searchsorted(datetime, own)
+            for field in fields:
+                arrays[field][rows, j] = np.asarray(frames[symbol][field])
+        return cls(datetime, symbols, arrays)
+
+    def frame(self, symbol, rows=None):
+        """
+        One symbol as an OHLCV DataFrame: its own bars, or the given rows of the time axis.
+        """
+        j = self.symbols.index(symbol)
+        if rows is None:
+            rows = np.flatnonzero(~np.isnan(self.fields['close'][:, j]))
+        frame = pd.DataFrame({'datetime': self.datetime[rows]})
+        for field, values in self.fields.items():
+            frame[field] = values[rows, j]
+        return frame
+
+
+def load_panel(paths, dtype=np.float64, **kwargs):
+    """
+    Panel of {symbol: OHLCV CSV path}, loaded through data.load_ohlcv() (kwargs are passed on).
+    """
+    return Panel.from_frames({symbol: load_ohlcv(path, **kwargs) for symbol, path in paths.items()}, dtype=dtype)
+
+
+# -------ENSEMBLE--------#
+def ensemble_panel_indicators(panel, atr_period, multiplier, body_std_mult, backend="auto", **_):
+    """
+    Marubozu, Supertrend and Ichimoku of every symbol, keyed like strategies.strategy_indicators().
+    """
+    with stage("panel.marubozu", rows=panel['close'].size):
+        marubozu = marubozu_features(panel, window=15, std_mult=body_std_mult, band=0.005)
+    with stage("panel.supertrend", rows=panel['close'].size):
+        supertrend = supertrend_bands(panel['high'], panel['low'], panel['close'], atr_period, multiplier,
+                                      backend=backend)
+    with stage("panel.ichimoku", rows=panel['close'].size):
+        ichimoku = ichimoku_lines(panel['high'], panel['low'], panel['close'], backend=backend)
+    return {'marubozu': marubozu, 'supertrend': supertrend, 'ichimoku': ichimoku}
+
+
+def ensemble_panel(panel, params=None, backend="auto"):
+    """
+    The Ensemble Strategy (main_2_btc) for every symbol of a panel at once.
+
+    Each symbol column gives the same result as strategies.ensemble_strategy() on that symbol's
+    own frame, as long as its bars have no gaps on the panel's time axis.
+
+    Parameters:
+    - panel: Panel
+    - params: dict
+        Overrides of strategies.ENSEMBLE_DEFAULTS, see strategies.full_params().
+    - backend: str
+        See accounting.ensemble_positions().
+
+    Returns:
+    - dict
+        (time x symbol) arrays: 'valid' (rows kept after the warm-up, see ensemble_strategy()),
+        'signal' and 'signals' (int8) and 'trade_type' codes, 0 outside 'valid'.
+    """
+    params = full_params('ensemble', params)
+    indicators = ensemble_panel_indicators(panel, backend=backend, **params)
+    marubozu, supertrend, ichimoku = indicators['marubozu'], indicators['supertrend'], indicators['ichimoku']
+
+    valid = ~np.isnan(marubozu['avg_abs_diff_15d']) & ~np.isnan(supertrend['ATR'])
+    for values in [supertrend['Supertrend']] + [ichimoku[column] for column in ichimoku]:
+        valid &= ~np.isnan(values)
+
+    with stage("panel.strategy", rows=valid.size):
+        close = np.asarray(panel['close'], dtype=np.float64)
+        span_a, span_b = ichimoku['Senkou Span A'], ichimoku['Senkou Span B']
+        signal = ensemble_signal(close, marubozu['signal_1'], supertrend['Supertrend'], span_a, span_b,
+                                 params['signal_1_weight'], params['signal_2_weight'])
+        signal[~valid] = 0
+
+        # A NaN price with no signal leaves the position state machine untouched, so the rows
+        # outside 'valid' are skipped exactly as ensemble_strategy() drops them
+        signals, trade_type = ensemble_positions(
+            np.where(valid, close, np.nan), signal, span_a, span_b,
+            stop_loss_pct=params['stop_loss_pct'],
+            take_profit_pct=params['take_profit_pct'],
+            sideways_filter_threshold=params['sideways_filter_threshold'],
+            backend=backend,
+        )
+    return {'valid': valid, 'signal': signal.astype(np.int8), 'signals': signals.astype(np.int8),
+            'trade_type': trade_type}
+
+
+def symbol_result(result, j):
+    """
+    Column j of ensemble_panel() in the form of ensemble_strategy(), with 'rows' indexing the
+    panel's time axis.
+    """
+    rows = np.flatnonzero(result['valid'][:, j])
+    return {
+        'rows': rows,
+        'signal': result['signal'][rows, j],
+        'signals': result['signals'][rows, j],
+        'trade_type': result['trade_type'][rows, j],
+    }
+
+
+def result_frame(panel, result, symbol):
+    """
+    One symbol's rows of ensemble_panel() with their 'signals' and 'trade_type', as exported by
+    the main_2_btc.py script.
+    """
+    column = symbol_result(result, panel.symbols.index(symbol))
+    frame = panel.frame(symbol, column['rows'])
+    frame = frame[[name for name in BACKTEST_COLUMNS if name in frame.columns]]
+    frame['signals'] = column['signals']
+    frame['trade_type'] = trade_type_labels(column['trade_type'])
+    return frame
+
+
+# -------SCAN--------#
+def scan(panel, params=None, fee=0.0, backend="auto", result=None):
+    """
+    Run the Ensemble Strategy over the whole panel and report every symbol's latest state.
+
+    Parameters:
+    - result: dict
+        An ensemble_panel() result of the panel to report on instead of running it again.
+
+    Returns:
+    - DataFrame
+        One row per symbol: bars, the time, close, signal, trade_type and position of its last
+        row, and the summary_metrics() of its backtest.
+    """
+    if result is None:
+        result = ensemble_panel(panel, params, backend=backend)
+    rows = []
+    for j, symbol in enumerate(panel.symbols):
+        column = symbol_result(result, j)
+        keep = column['rows']
+        row = {'symbol': symbol, 'bars': len(keep)}
+        if len(keep):
+            close = panel['close'][keep, j].astype(np.float64)
+            row.update({
+                'datetime': panel.datetime[keep[-1]],
+                'close': close[-1],
+                'signal': int(column['signal'][-1]),
+                'trade_type': trade_type_labels(column['trade_type'][-1:])[0],
+                'position': positions_from_trades(column['trade_type'])[-1],
+            })
+            row.update(summary_metrics(close, column['trade_type'], panel.datetime[keep], fee=fee))
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+# -------MAIN FUNCTION--------#
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scan a universe with the Ensemble Strategy in one pass.")
+    parser.add_argument("symbols", nargs="*", type=_parse_symbol, help="SYMBOL=PATH")
+    parser.add_argument("--config", help="JSON file with {symbol: data path}")
+    parser.add_argument("--param", action="append", type=_parse_param, default=[], metavar="NAME=VALUE",
+                        help="override a strategy parameter, repeatable")
+    parser.add_argument("--output-dir", default=None, help="also write one result CSV per symbol here")
+    parser.add_argument("--fee", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    paths = {config['symbol']: config['data'] for config in args.symbols}
+    if args.config:
+        with open(args.config) as f:
+            paths.update(json.load(f))
+    if not paths:
+        parser.error("no symbols given")
+
+    with stage("load"):
+        panel = load_panel(paths)
+    result = ensemble_panel(panel, dict(args.param))
+    print(scan(panel, fee=args.fee, result=result).to_string(index=False))
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+        for symbol in panel.symbols:
+            output = os.path.join(args.output_dir, f"{symbol.lower()}_ensemble_result.csv")
+            export_result(result_frame(panel, result, symbol), output)
+
+
+if __name__ == "__main__":
+    main()
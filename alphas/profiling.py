@@ -0,0 +1,267 @@
+# Stage timing for the pipelines: wall / CPU time, rows and peak RSS per stage, off by default
+#
+# Enabled by the ALPHAS_PROFILE environment variable (the report path: .json or .prom) or by
+# PROFILER.enable(). ALPHAS_PROFILE_STAGES lists stages (comma separated) to capture with
+# cProfile, or with pyinstrument when ALPHAS_PROFILER=pyinstrument.
+
+import functools
+import json
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from alphas.memory import peak_rss_mb
+
+
+class StageRecord:
+    """
+    Measurements of one run of a stage; set .rows inside the stage when it is not known up front.
+    """
+
+    __slots__ = ('stage', 'rows', 'wall_seconds', 'cpu_seconds', 'peak_rss_mb', 'profile')
+
+    def __init__(self, stage, rows=None):
+        self.stage = stage
+        self.rows = rows
+        self.wall_seconds = self.cpu_seconds = self.peak_rss_mb = np.nan
+        self.profile = None
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class _NullRecord:
+    # Yielded by disabled stages: assignments are accepted and dropped
+    __slots__ = ()
+
+    rows = property(lambda self: None, lambda self, value: None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_RECORD = _NullRecord()
+
+
+class _Stage:
+    __slots__ = ('profiler', 'record', '_wall', '_cpu', '_capture')
+
+    def __init__(self, profiler, record):
+        self.profiler = profiler
+        self.record = record
+        self._capture = None
+
+    def __enter__(self):
+        self._capture = self.profiler._start_capture(self.record.stage)
+        self._cpu = time.process_time()
+        self._wall = time.perf_counter()
+        return self.record
+
+    def __exit__(self, *exc_info):
+        record = self.record
+        record.wall_seconds = time.perf_counter() - self._wall
+        record.cpu_seconds = time.process_time() - self._cpu
+        if self._capture is not None:
+            record.profile = self.profiler._stop_capture(record.stage, self._capture)
+        record.peak_rss_mb = peak_rss_mb()  # of the process so far; rises when this stage set a new peak
+        self.profiler.records.append(record)
+        return False
+
+
+class StageProfiler:
+    """
+    Collects a StageRecord per stage run while enabled; stage() and timed() cost one attribute
+    check when it is not.
+
+    Parameters:
+    - enabled: bool
+    - report_path: str
+        Where write_report() puts the report, '.prom' for Prometheus text, JSON otherwise.
+    - capture: set of str
+        Stages to run under a profiler, whose output goes to capture_dir/<stage>.prof (cProfile
+        stats, see pstats) or <stage>.html (pyinstrument).
+    - capture_dir: str
+    - backend: str
+        'cprofile' or 'pyinstrument'.
+    """
+
+    def __init__(self, enabled=False, report_path=None, capture=(), capture_dir=".", backend="cprofile"):
+        if backend not in ("cprofile", "pyinstrument"):
+            raise ValueError(f"backend must be 'cprofile' or 'pyinstrument', got {backend!r}")
+        self.enabled = enabled
+        self.report_path = report_path
+        self.capture = set(capture)
+        self.capture_dir = capture_dir
+        self.backend = backend
+        self.records = []
+
+    @classmethod
+    def from_env(cls, environ=None):
+        environ = os.environ if environ is None else environ
+        report_path = environ.get("ALPHAS_PROFILE") or None
+        capture = [name.strip() for name in environ.get("ALPHAS_PROFILE_STAGES", "").split(",") if name.strip()]
+        return cls(enabled=report_path is not None, report_path=report_path, capture=capture,
+                   capture_dir=os.path.dirname(os.path.abspath(report_path)) if report_path else ".",
+                   backend=environ.get("ALPHAS_PROFILER", "cprofile"))
+
+    def enable(self, report_path=None, capture=None):
+        self.enabled = True
+        if report_path is not None:
+            self.report_path = report_path
+        if capture is not None:
+            self.capture = set(capture)
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        self.records = []
+
+    def stage(self, name, rows=None):
+        """
+        Context manager timing the block as stage `name`, yielding its StageRecord.
+        """
+        if not self.enabled:
+            return _NULL_RECORD
+        return _Stage(self, StageRecord(name, rows))
+
+    # -------CAPTURE--------#
+    def _start_capture(self, name):
+        if name not in self.capture:
+            return None
+        if self.backend == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                raise ImportError("ALPHAS_PROFILER=pyinstrument requires the pyinstrument package") from None
+            capture = Profiler()
+            capture.start()
+        else:
+            import cProfile
+            capture = cProfile.Profile()
+            capture.enable()
+        return capture
+
+    def _stop_capture(self, name, capture):
+        os.makedirs(self.capture_dir, exist_ok=True)
+        base = os.path.join(self.capture_dir, re.sub(r"[^\w.-]", "_", name))
+        if self.backend == "pyinstrument":
+            capture.stop()
+            path = base + ".html"
+            with open(path, "w") as f:
+                f.write(capture.output_html())
+        else:
+            capture.disable()
+            path = base + ".prof"
+            capture.dump_stats(path)
+        return path
+
+    # -------REPORTS--------#
+    def summary(self):
+        """
+        Totals per stage in first-run order: calls, wall / CPU seconds, rows and the highest peak
+        RSS. Nested stages are included in their parents' times.
+        """
+        columns = ['stage', 'calls', 'wall_seconds', 'cpu_seconds', 'rows', 'peak_rss_mb']
+        if not self.records:
+            return pd.DataFrame(columns=columns)
+        runs = pd.DataFrame([record.to_dict() for record in self.records])
+        runs['calls'] = 1
+        summary = runs.groupby('stage', sort=False).agg(
+            calls=('calls', 'sum'), wall_seconds=('wall_seconds', 'sum'), cpu_seconds=('cpu_seconds', 'sum'),
+            rows=('rows', lambda rows: rows.sum(min_count=1)), peak_rss_mb=('peak_rss_mb', 'max'))
+        summary['rows'] = summary['rows'].astype('Int64')
+        return summary.reset_index()[columns]
+
+    def to_json(self):
+        summary = self.summary().astype(object).where(lambda frame: frame.notna(), None)
+        return json.dumps({
+            'stages': summary.to_dict(orient='records'),
+            'runs': [record.to_dict() for record in self.records],
+        }, indent=1, default=float)
+
+    def to_prometheus(self, prefix="alphas_stage"):
+        """
+        The summary() in the Prometheus text exposition format, one series per stage.
+        """
+        metrics = [
+            ('calls', 'calls_total', 'counter', 'Runs of the pipeline stage.', 1),
+            ('wall_seconds', 'wall_seconds_total', 'counter', 'Wall time spent in the pipeline stage.', 1),
+            ('cpu_seconds', 'cpu_seconds_total', 'counter', 'CPU time spent in the pipeline stage.', 1),
+            ('rows', 'rows_total', 'counter', 'Rows processed by the pipeline stage.', 1),
+            ('peak_rss_mb', 'peak_rss_bytes', 'gauge', 'Process peak RSS at the end of the stage.', 1024 * 1024),
+        ]
+        summary = self.summary()
+        lines = []
+        for column, name, kind, description, scale in metrics:
+            lines.append(f"# HELP {prefix}_{name} {description}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for stage, value in zip(summary['stage'], summary[column]):
+                if pd.notna(value):
+                    label = str(stage).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+                    lines.append(f"{prefix}_{name}{{stage=\"{label}\"}} {float(value) * scale:.6g}")
+        return "\n".join(lines) + "\n"
+
+    def write_report(self, path=None):
+        """
+        Write the report to path (default report_path) when enabled; returns the path or None.
+        """
+        path = path or self.report_path
+        if not self.enabled or path is None:
+            return None
+        text = self.to_prometheus() if path.endswith(".prom") else self.to_json()
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+
+# Shared profiler of the scripts and pipelines, configured from the environment
+PROFILER = StageProfiler.from_env()
+
+
+def stage(name, rows=None):
+    """
+    PROFILER.stage(): `with stage("load") as record: ...; record.rows = len(df)`.
+    """
+    return PROFILER.stage(name, rows)
+
+
+def _rows(result, args):
+    # Rows of the returned frame, else of the first frame argument
+    for value in (result, *args[:1]):
+        if isinstance(value, (pd.DataFrame, np.ndarray)):
+            return len(value)
+    return None
+
+
+def timed(name=None):
+    """
+    Decorator timing every call of a function as a stage (named after the function by default),
+    with the rows of the DataFrame it returns or else of its first argument.
+    """
+    def decorate(function):
+        stage_name = name or function.__name__
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not PROFILER.enabled:
+                return function(*args, **kwargs)
+            with PROFILER.stage(stage_name) as record:
+                result = function(*args, **kwargs)
+                record.rows = _rows(result, args)
+            return result
+        return wrapper
+    return decorate
+
+
+def write_report(path=None):
+    """
+    PROFILER.write_report(): a no-op unless profiling is enabled.
+    """
+    return PROFILER.write_report(path)
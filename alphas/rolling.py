@@ -0,0 +1,175 @@
+# Rolling max/min primitives built on monotonic deques
+
+import math
+from collections import deque
+
+import numpy as np
+
+from alphas.jit import jit, use_numba
+
+
+# -------BATCH--------#
+def _rolling_extrema_kernel(values, windows, sign):
+    # One pass over the series with a single monotonic deque covering the largest window.
+    # The deque holds the positions of the candidates for the extremum, oldest first, and the
+    # candidates of every smaller window are a suffix of it, found by binary search.
+    # `sign` is 1 for max and -1 for min.
+    n = len(values)
+    k = len(windows)
+    out = np.full((k, n), np.nan)
+    largest = 0
+    for j in range(k):
+        largest = max(largest, windows[j])
+
+    queue = np.empty(n, dtype=np.int64)  # positions, live between head and tail
+    head = 0
+    tail = 0
+    last_nan = -1
+    for i in range(n):
+        value = values[i]
+        if value != value:
+            last_nan = i
+        else:
+            # Drop candidates dominated by the new value
+            while tail > head and sign * values[queue[tail - 1]] <= sign * value:
+                tail -= 1
+            queue[tail] = i
+            tail += 1
+        # Drop candidates that left the largest window
+        while tail > head and queue[head] <= i - largest:
+            head += 1
+
+        for j in range(k):
+            start = i - windows[j] + 1
+            if start < 0 or last_nan >= start:
+                continue  # window not full yet, or it holds a NaN (like rolling(w).max())
+            lo = head
+            hi = tail
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if queue[mid] < start:
+                    lo = mid + 1
+                else:
+                    hi = mid
+            out[j, i] = values[queue[lo]]
+
+    return out
+
+
+_rolling_extrema_kernel_jit = jit(_rolling_extrema_kernel)
+
+
+def _rolling_extrema_numpy(values, windows, sign):
+    # Doubling table: level p holds the extremum of the 2**p values ending at each position, and
+    # any window w is covered by two overlapping blocks of the largest power of two <= w.
+    # All windows share the same table, so the series is only scanned O(log max(windows)) times.
+    # 2-D (time x symbol) values go through the same steps along axis 0.
+    pick = np.maximum if sign > 0 else np.minimum
+    n = len(values)
+    out = np.full((len(windows),) + values.shape, np.nan)
+    levels = [values]
+    while 2 ** len(levels) <= max(windows, default=0):
+        half = 2 ** (len(levels) - 1)
+        prev = levels[-1]
+        level = np.full(values.shape, np.nan)
+        level[half:] = pick(prev[half:], prev[:-half])
+        levels.append(level)
+
+    for j, window in enumerate(windows):
+        if window > n:
+            continue
+        p = int(math.log2(window))
+        block = levels[p]
+        span = 2 ** p
+        # The block ending at i, and the block ending at i - window + span (start of the window)
+        out[j, window - 1:] = pick(block[window - 1:], block[span - 1:n - window + span])
+    return out
+
+
+def rolling_extrema(values, windows, mode="max", backend="auto"):
+    """
+    Trailing max or min of a series for several window lengths at once.
+
+    Matches Series.rolling(window).max() / .min(): NaN until the window is full and NaN for any
+    window that contains a NaN.
+
+    Parameters:
+    - values: array of float
+        1-D series, or 2-D (time x symbol) array rolled along axis 0 (always with the doubling table).
+    - windows: iterable of int
+    - mode: str
+        'max' or 'min'.
+    - backend: str
+        'numba' runs the one-pass monotonic deque kernel, 'numpy' a shared doubling table.
+
+    Returns:
+    - dict
+        window -> ndarray
+    """
+    if mode not in ("max", "min"):
+        raise ValueError(f"mode must be 'max' or 'min', got {mode!r}")
+    values = np.asarray(values, dtype=np.float64)
+    if values.ndim == 1:
+        values = np.ascontiguousarray(values)
+    windows = tuple(int(w) for w in windows)
+    if any(w < 1 for w in windows):
+        raise ValueError("windows must be positive")
+    sign = 1.0 if mode == "max" else -1.0
+
+    # The doubling table steps every symbol of a 2-D array at once and beats one kernel call per column
+    if use_numba(backend) and values.ndim == 1:
+        out = _rolling_extrema_kernel_jit(values, np.asarray(windows, dtype=np.int64), sign)
+    else:
+        out = _rolling_extrema_numpy(values, windows, sign)
+    return dict(zip(windows, out))
+
+
+def rolling_max(values, window, backend="auto"):
+    """
+    Trailing max over one window, see rolling_extrema().
+    """
+    return rolling_extrema(values, (window,), "max", backend=backend)[window]
+
+
+def rolling_min(values, window, backend="auto"):
+    """
+    Trailing min over one window, see rolling_extrema().
+    """
+    return rolling_extrema(values, (window,), "min", backend=backend)[window]
+
+
+# -------STREAMING--------#
+class RollingExtremum:
+    """
+    Trailing max (or min) over a fixed window with O(1) amortized updates, NaN until the window
+    is full or while a NaN is inside the window.
+    """
+
+    def __init__(self, window, mode="max"):
+        if mode not in ("max", "min"):
+            raise ValueError(f"mode must be 'max' or 'min', got {mode!r}")
+        self.window = window
+        self._sign = 1.0 if mode == "max" else -1.0
+        self._queue = deque()  # (position, value), values monotonic from oldest to newest
+        self._count = 0
+        self._last_nan = -1
+
+    def update(self, value):
+        i = self._count
+        self._count += 1
+        if math.isnan(value):
+            self._last_nan = i
+        else:
+            while self._queue and self._sign * self._queue[-1][1] <= self._sign * value:
+                self._queue.pop()
+            self._queue.append((i, value))
+        while self._queue and self._queue[0][0] <= i - self.window:
+            self._queue.popleft()
+        return self.value
+
+    @property
+    def value(self):
+        start = self._count - self.window
+        if start < 0 or self._last_nan >= start or not self._queue:
+            return math.nan
+        return self._queue[0][1]
@@ -0,0 +1,56 @@
+# Run one strategy on one symbol: load -> indicators -> strategy -> export -> optional backtest
+
+import argparse
+
+from alphas.batch import load_data, result_frame
+from alphas.export import export_result
+from alphas.ledger import TradeLedger
+from alphas.strategies import STRATEGIES, run_strategy
+
+
+def _parse_param(text):
+    name, _, value = text.partition("=")
+    if not value:
+        raise argparse.ArgumentTypeError(f"expected NAME=VALUE, got {text!r}")
+    for cast in (int, float):
+        try:
+            return name, cast(value)
+        except ValueError:
+            pass
+    return name, value
+
+
+# -------MAIN FUNCTION--------#
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run a strategy on an OHLCV CSV and export the result.")
+    parser.add_argument("strategy", choices=sorted(STRATEGIES))
+    parser.add_argument("csv_file_paths", nargs="+", help="OHLCV CSV (fast, optionally then slow for double_timeframe)")
+    parser.add_argument("--output", default=None, help="result file, defaults to <strategy>_result.csv")
+    parser.add_argument("--trades", default=None, help="also write the trade ledger (.csv or .parquet)")
+    parser.add_argument("--param", action="append", type=_parse_param, default=[], metavar="NAME=VALUE",
+                        help="override a strategy parameter, repeatable")
+    parser.add_argument("--backtest", choices=("none", "single", "chunked"), default="none",
+                        help="send the result to the untrade backtester in one request or in resumable chunks")
+    args = parser.parse_args(argv)
+
+    paths = args.csv_file_paths
+    data = load_data(args.strategy, paths[0] if len(paths) == 1 else paths[:2])
+    result = run_strategy(args.strategy, data, dict(args.param))
+    frame = result_frame(args.strategy, data, result)
+    output = export_result(frame, args.output or f"{args.strategy}_result.csv")
+    print(f"{len(frame)} rows written to {output}")
+
+    if args.trades:
+        ledger = TradeLedger.from_trade_types(result['trade_type'], frame['close'], frame['datetime'])
+        write = ledger.to_parquet if args.trades.endswith(".parquet") else ledger.to_csv
+        print(f"{len(ledger)} trades written to {write(args.trades)}")
+
+    if args.backtest != "none":
+        from alphas.upload import perform_backtest, perform_backtest_large_csv
+        backtest = perform_backtest if args.backtest == "single" else perform_backtest_large_csv
+        for value in backtest(output):
+            print(value)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+# Parameterised array pipelines of the strategies in the main_*.py scripts
+
+import numpy as np
+import pandas as pd
+
+from alphas.accounting import ensemble_positions, long_only_portfolio, reversal_positions
+from alphas.combinator import cloud_trend_signal, combine_signals
+from alphas.features import compute
+from alphas.timeframe import double_timeframe_signals
+
+
+def _sma(values, window):
+    return pd.Series(np.asarray(values, dtype=np.float64)).rolling(window=window).mean().to_numpy()
+
+
+# -------ENSEMBLE (main_2_btc)--------#
+ENSEMBLE_DEFAULTS = {
+    'atr_period': 5,
+    'multiplier': 3,
+    'body_std_mult': 1.8,
+    'signal_1_weight': 0.6,
+    'signal_2_weight': 0.4,
+    'stop_loss_pct': 0.05,
+    'take_profit_pct': 0.1,
+    'sideways_filter_threshold': 0.005,
+}
+
+
+def ensemble_indicators(df, name, **params):
+    """
+    One indicator of the Ensemble Strategy: 'marubozu' (body_std_mult), 'supertrend'
+    (atr_period, multiplier) or 'ichimoku' (no parameters).
+    """
+    if name == 'marubozu':
+        return compute('marubozu', df, window=15, std_mult=params['body_std_mult'], band=0.005)
+    if name == 'supertrend':
+        return compute('supertrend', df, atr_period=params['atr_period'], multiplier=params['multiplier'])
+    if name == 'ichimoku':
+        return compute('ichimoku', df)
+    raise KeyError(name)
+
+
+def ensemble_signal(close, signal_1, line, span_a, span_b, signal_1_weight, signal_2_weight):
+    """
+    Weighted vote of the Marubozu signal (signal_1) and the Supertrend / Ichimoku trend signal
+    (signal_2, see combinator.cloud_trend_signal()). Element-wise, so 1-D series and 2-D
+    (time x symbol) arrays both work.
+    """
+    signal_2 = cloud_trend_signal(close, line, span_a, span_b)
+    matrix = np.stack([signal_1, signal_2], axis=-1).astype(np.float64)
+    return combine_signals(matrix, [signal_1_weight, signal_2_weight]).astype(np.int64)
+
+
+def ensemble_strategy(df, indicators, signal_1_weight, signal_2_weight, stop_loss_pct, take_profit_pct,
+                      sideways_filter_threshold, **_):
+    """
+    Signals and positions of the Ensemble Strategy from precomputed indicators.
+
+    Returns:
+    - dict
+        'rows' (positions kept after the warm-up dropna of process_data()), 'signal', 'signals'
+        and 'trade_type' codes for those rows.
+    """
+    marubozu, supertrend, ichimoku = indicators['marubozu'], indicators['supertrend'], indicators['ichimoku']
+    warm = [marubozu['avg_abs_diff_15d'], supertrend['ATR'], supertrend['Supertrend']]
+    warm += [ichimoku[column] for column in ichimoku]
+    rows = np.flatnonzero(~np.isnan(np.vstack(warm)).any(axis=0))
+
+    close = np.asarray(df['close'], dtype=np.float64)[rows]
+    line = supertrend['Supertrend'][rows]
+    span_a, span_b = ichimoku['Senkou Span A'][rows], ichimoku['Senkou Span B'][rows]
+
+    signal = ensemble_signal(close, marubozu['signal_1'][rows], line, span_a, span_b, signal_1_weight,
+                             signal_2_weight)
+
+    signals, trade_type = ensemble_positions(
+        close, signal, span_a, span_b,
+        stop_loss_pct=stop_loss_pct,
+        take_profit_pct=take_profit_pct,
+        sideways_filter_threshold=sideways_filter_threshold,
+    )
+    return {'rows': rows, 'signal': signal, 'signals': signals, 'trade_type': trade_type}
+
+
+# -------SUPERTREND (main_2_eth)--------#
+SUPERTREND_DEFAULTS = {
+    'atr_period': 15,
+    'multiplier': 3,
+}
+
+
+def supertrend_indicators(df, name, **params):
+    """
+    One indicator of the SuperTrend strategy: 'supertrend' (atr_period, multiplier).
+    """
+    if name == 'supertrend':
+        return compute('supertrend', df, atr_period=params['atr_period'], multiplier=params['multiplier'])
+    raise KeyError(name)
+
+
+def supertrend_strategy(df, indicators, **_):
+    """
+    Reversal signals of the SuperTrend strategy from precomputed indicators, see ensemble_strategy().
+    """
+    supertrend = indicators['supertrend']
+    close = np.asarray(df['close'], dtype=np.float64)
+    line = supertrend['Supertrend']
+    was_uptrend = np.concatenate(([False], supertrend['In Uptrend'][:-1]))
+
+    signal = np.zeros(len(close), dtype=np.int64)
+    signal[(close > line) & ~was_uptrend] = 1
+    signal[(close < line) & was_uptrend] = -1
+
+    # process_data() drops the warm-up rows (no previous close, ATR or Supertrend yet)
+    rows = np.flatnonzero(~np.isnan(supertrend['ATR']) & ~np.isnan(line))
+    rows = rows[rows > 0]
+    signals, trade_type = reversal_positions(signal[rows])
+    return {'rows': rows, 'signal': signal[rows], 'signals': signals, 'trade_type': trade_type}
+
+
+# -------DOUBLE TIMEFRAME (main_1)--------#
+DOUBLE_TIMEFRAME_DEFAULTS = {
+    'long_window': 26,
+    'short_window': 14,
+    'low_max_window': 14,
+    'loss_window': 7,
+}
+
+
+def double_timeframe_indicators(data, name, **params):
+    """
+    One indicator of the Double Timeframe Strategy: 'fast_sma' / 'slow_sma' (long_window,
+    short_window) or 'slow_trend' (low_max_window, loss_window). `data` is (data_fast, data_slow).
+    """
+    data_fast, data_slow = data
+    if name in ('fast_sma', 'slow_sma'):
+        frame = data_fast if name == 'fast_sma' else data_slow
+        return {
+            'long': compute('sma', frame, window=params['long_window'])['SMA'],
+            'short': compute('sma', frame, window=params['short_window'])['SMA'],
+        }
+    if name == 'slow_trend':
+        close = np.asarray(data_slow['close'], dtype=np.float64)
+        change = np.concatenate(([np.nan], np.diff(close)))
+        return {
+            'Low_14D_Max': compute('low_max', data_slow, window=params['low_max_window'])['Low_Max'],
+            'loss': _sma(change, params['loss_window']),
+        }
+    raise KeyError(name)
+
+
+def double_timeframe_strategy(data, indicators, initial_capital=100, **_):
+    """
+    Signals and long only positions of the Double Timeframe Strategy, see ensemble_strategy().
+    """
+    data_fast, data_slow = data
+    fast = {'datetime': data_fast['datetime'], 'long': indicators['fast_sma']['long'],
+            'short': indicators['fast_sma']['short']}
+    slow = {'datetime': data_slow['datetime'], 'close': data_slow['close'],
+            'long': indicators['slow_sma']['long'], 'short': indicators['slow_sma']['short']}
+    slow.update(indicators['slow_trend'])
+
+    signal = double_timeframe_signals(fast, slow, long_sma='long', short_sma='short')
+    signals, trade_type, _, _, _ = long_only_portfolio(data_fast['close'], signal, initial_capital)
+    return {'rows': np.arange(len(signal)), 'signal': signal, 'signals': signals, 'trade_type': trade_type}
+
+
+def _signal_2_weight(params):
+    # The two votes of the ensemble sum to 1, as 0.6 / 0.4 do in the script
+    return round(1 - params['signal_1_weight'], 12)
+
+
+# -------REGISTRY--------#
+# For every strategy: the default parameters, parameters derived from the others unless given,
+# which parameters each indicator depends on, and the functions computing one indicator and the
+# strategy on top of the indicators
+STRATEGIES = {
+    'ensemble': {
+        'defaults': ENSEMBLE_DEFAULTS,
+        'derived': {'signal_2_weight': _signal_2_weight},
+        'indicators': {
+            'marubozu': ('body_std_mult',),
+            'supertrend': ('atr_period', 'multiplier'),
+            'ichimoku': (),
+        },
+        'indicator': ensemble_indicators,
+        'strategy': ensemble_strategy,
+    },
+    'supertrend': {
+        'defaults': SUPERTREND_DEFAULTS,
+        'indicators': {
+            'supertrend': ('atr_period', 'multiplier'),
+        },
+        'indicator': supertrend_indicators,
+        'strategy': supertrend_strategy,
+    },
+    'double_timeframe': {
+        'defaults': DOUBLE_TIMEFRAME_DEFAULTS,
+        'indicators': {
+            'fast_sma': ('long_window', 'short_window'),
+            'slow_sma': ('long_window', 'short_window'),
+            'slow_trend': ('low_max_window', 'loss_window'),
+        },
+        'indicator': double_timeframe_indicators,
+        'strategy': double_timeframe_strategy,
+    },
+}
+
+
+def full_params(strategy, params=None):
+    """
+    Complete parameter set of a registered strategy: the given parameters, the derived ones that
+    are not given (the ensemble's signal_2_weight = 1 - signal_1_weight) and the defaults.
+    """
+    spec = STRATEGIES[strategy]
+    params = params or {}
+    full = {**spec['defaults'], **params}
+    for name, derive in spec.get('derived', {}).items():
+        if name not in params:
+            full[name] = derive(full)
+    return full
+
+
+def price_frame(strategy, data):
+    """
+    The frame whose rows the strategy trades on ('datetime' and 'close'), i.e. the fast frame for
+    the Double Timeframe Strategy.
+    """
+    return data[0] if strategy == 'double_timeframe' else data
+
+
+def strategy_indicators(strategy, data, params, cache=None):
+    """
+    The indicators a registered strategy needs for a full parameter set.
+
+    Parameters:
+    - strategy: str
+        Key of STRATEGIES.
+    - data: DataFrame, or (data_fast, data_slow) for 'double_timeframe'
+    - params: dict
+        Complete parameter set (defaults already applied).
+    - cache: dict
+        Optional memo of computed indicators keyed by (name, parameter values), shared between calls.
+
+    Returns:
+    - dict
+        indicator name -> dict of arrays.
+    """
+    spec = STRATEGIES[strategy]
+    cache = {} if cache is None else cache
+
+    indicators = {}
+    for name, depends_on in spec['indicators'].items():
+        key = (name,) + tuple(params[p] for p in depends_on)
+        if key not in cache:
+            cache[key] = spec['indicator'](data, name, **{p: params[p] for p in depends_on})
+        indicators[name] = cache[key]
+    return indicators
+
+
+def run_strategy(strategy, data, params=None, cache=None):
+    """
+    Run a registered strategy end to end on arrays.
+
+    Parameters:
+    - strategy: str
+        Key of STRATEGIES.
+    - data: DataFrame, or (data_fast, data_slow) for 'double_timeframe'
+    - params: dict
+        Overrides of the strategy defaults, see full_params().
+    - cache: dict
+        See strategy_indicators().
+
+    Returns:
+    - dict
+        See ensemble_strategy().
+    """
+    spec = STRATEGIES[strategy]
+    params = full_params(strategy, params)
+    indicators = strategy_indicators(strategy, data, params, cache)
+    return spec['strategy'](data, indicators, **params)
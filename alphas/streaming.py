@@ -0,0 +1,355 @@
+# Streaming live-signal mode: consume bars one at a time with constant-time rolling state
+
+import argparse
+import csv
+import math
+import time
+from collections import deque
+
+import pandas as pd
+
+from alphas.accounting import TRADE_TYPES, HOLD, LONG, SHORT, SQUARE_OFF
+from alphas.ichimoku import Ichimoku
+from alphas.rolling import RollingExtremum
+from alphas.supertrend import Supertrend
+
+
+# -------ROLLING STATE--------#
+class RollingMean:
+    """
+    Trailing mean over a fixed window, NaN until the window is full.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self._values = deque(maxlen=window)
+        self._sum = 0.0
+
+    def update(self, value):
+        if len(self._values) == self.window:
+            self._sum -= self._values[0]
+        self._values.append(value)
+        self._sum += value
+        return self.value
+
+    @property
+    def value(self):
+        if len(self._values) < self.window:
+            return math.nan
+        return self._sum / self.window
+
+
+class RollingMeanStd:
+    """
+    Trailing mean plus std_mult sample standard deviations, available from the first value
+    (like rolling(window, min_periods=1)); the std is NaN until two values have been seen.
+    """
+
+    def __init__(self, window, std_mult):
+        self.window = window
+        self.std_mult = std_mult
+        self._values = deque(maxlen=window)
+
+    def update(self, value):
+        self._values.append(value)
+        n = len(self._values)
+        mean = math.fsum(self._values) / n
+        if n < 2:
+            return math.nan
+        var = math.fsum((v - mean) ** 2 for v in self._values) / (n - 1)
+        return mean + self.std_mult * math.sqrt(var)
+
+
+# -------POSITION STATE--------#
+class EnsemblePosition:
+    """
+    Per-bar version of accounting.ensemble_positions(): rolling stop loss, take profit and the
+    sideways-cloud filter of the Ensemble Strategy.
+    """
+
+    def __init__(self, stop_loss_pct=0.05, take_profit_pct=0.1, sideways_filter_threshold=0.005):
+        self.stop_loss_pct = stop_loss_pct
+        self.take_profit_pct = take_profit_pct
+        self.sideways_filter_threshold = sideways_filter_threshold
+        self.holding = False
+        self.buying_price = 0.0
+        self.highest_price = 0.0
+
+    def step(self, price, signal, span_a, span_b, high=None, low=None):
+        """
+        Returns (signals, trade_type code) for this bar; high and low check the exits intrabar as
+        in ensemble_positions().
+        """
+        high = price if high is None else high
+        low = price if low is None else low
+        price_in_cloud = span_a < price < span_b
+        is_cloud_flat = abs(span_a - span_b) < self.sideways_filter_threshold
+
+        if price_in_cloud and is_cloud_flat:
+            if price <= span_b:
+                self.holding, self.buying_price, self.highest_price = True, price, price
+                return 1, LONG
+            if price >= span_a:
+                self.holding, self.buying_price, self.highest_price = True, price, price
+                return -1, SHORT
+            return 0, HOLD
+
+        if not self.holding and signal == 1:
+            self.holding, self.buying_price, self.highest_price = True, price, price
+            return 1, LONG
+
+        if self.holding:
+            stopped = low <= self.highest_price * (1 - self.stop_loss_pct)
+            exit_now = signal == -1 or stopped or high >= self.buying_price * (1 + self.take_profit_pct)
+            if exit_now:
+                self.holding = False
+            if high > self.highest_price:
+                self.highest_price = high
+            if exit_now:
+                return -1, SQUARE_OFF
+
+        return 0, HOLD
+
+
+class LongOnlyPosition:
+    """
+    Per-bar version of accounting.long_only_portfolio().
+    """
+
+    def __init__(self, initial_capital=100):
+        self.capital = float(initial_capital)
+        self.shares = 0.0
+        self.holding = False
+
+    def step(self, price, signal):
+        """
+        Returns (signals, trade_type code) for this bar.
+        """
+        if signal == 1 and not self.holding:
+            self.shares = self.capital / price
+            self.capital -= self.shares * price
+            self.holding = True
+            return 1, LONG
+        if signal == -1 and self.holding:
+            self.capital += self.shares * price
+            self.shares = 0.0
+            self.holding = False
+            return -1, SQUARE_OFF
+        return 0, HOLD
+
+    @property
+    def state(self):
+        return {'capital': self.capital, 'shares': self.shares}
+
+
+# -------STREAMING STRATEGIES--------#
+class EnsembleStream:
+    """
+    Live version of main_2_btc: Marubozu + Supertrend + Ichimoku ensemble with rolling stop loss.
+
+    Bars before every indicator is warmed up (the rows process_data() drops with dropna) are
+    reported with ready=False and never trade.
+    """
+
+    def __init__(self, atr_period=5, multiplier=3, signal_1_weight=0.6, signal_2_weight=0.4,
+                 body_window=15, body_std_mult=1.8, marubozu_band=0.005,
+                 stop_loss_pct=0.05, take_profit_pct=0.1, sideways_filter_threshold=0.005):
+        self.signal_1_weight = signal_1_weight
+        self.signal_2_weight = signal_2_weight
+        self.marubozu_band = marubozu_band
+        self._body = RollingMeanStd(body_window, body_std_mult)
+        self._supertrend = Supertrend(atr_period=atr_period, multiplier=multiplier)
+        self._ichimoku = Ichimoku()
+        self._position = EnsemblePosition(stop_loss_pct, take_profit_pct, sideways_filter_threshold)
+
+    def _signal_1(self, open_, high, low, close):
+        abs_diff = abs(open_ - close)
+        threshold = self._body.update(abs_diff)
+        if abs_diff == 0:
+            return 0, threshold  # doji, no body to measure the shadow against
+        shadow = ((close - high) if close > open_ else (close - low)) / abs_diff
+        score = -1 / abs_diff * shadow if shadow != 0 and abs_diff > threshold else 0.0
+        if -self.marubozu_band < score < 0:
+            return 1, threshold
+        if 0 < score < self.marubozu_band:
+            return -1, threshold
+        return 0, threshold
+
+    def update(self, bar):
+        open_, high, low, close = (float(bar[k]) for k in ('open', 'high', 'low', 'close'))
+
+        signal_1, threshold = self._signal_1(open_, high, low, close)
+        supertrend = self._supertrend.update(bar)
+        ichimoku = self._ichimoku.update(bar)
+
+        out = {'datetime': bar.get('datetime'), 'close': close, 'signal': 0, 'signals': 0,
+               'trade_type': TRADE_TYPES[HOLD]}
+        warm = (threshold, supertrend['ATR'], supertrend['Supertrend'],
+                ichimoku['Senkou Span B'], ichimoku['Chikou Span'])
+        out['ready'] = not any(math.isnan(value) for value in warm)
+        if not out['ready']:
+            return out
+
+        signal_2 = 0
+        if close > supertrend['Supertrend'] and close > ichimoku['Senkou Span A']:
+            signal_2 = 1
+        if close < supertrend['Supertrend'] and close < ichimoku['Senkou Span B']:
+            signal_2 = -1
+
+        combined = self.signal_1_weight * signal_1 + self.signal_2_weight * signal_2
+        signal = 1 if combined > 0 else (-1 if combined < 0 else 0)
+        signals, trade_type = self._position.step(
+            close, signal, ichimoku['Senkou Span A'], ichimoku['Senkou Span B'])
+
+        out.update(signal=signal, signals=signals, trade_type=TRADE_TYPES[trade_type])
+        return out
+
+
+class DoubleTimeframeStream:
+    """
+    Live version of main_1: fast bars are fed one at a time and aggregated into slow bars
+    (slow_freq, daily by default) as they close.
+
+    Like the batch script (timeframe.align_timeframes(direction='closed')), only closed slow bars
+    are used: the last closed slow bar plays the role of the "current" daily row and the one
+    before it the "previous" row.
+    """
+
+    def __init__(self, slow_freq="1D", warmup=7, initial_capital=100):
+        self.slow_freq = slow_freq
+        self.warmup = warmup
+        self._fast_sma_26 = RollingMean(26)
+        self._fast_sma_14 = RollingMean(14)
+        self._slow_sma_26 = RollingMean(26)
+        self._slow_sma_14 = RollingMean(14)
+        self._slow_loss = RollingMean(7)
+        self._slow_low_max = RollingExtremum(14, "max")
+        self._slow_rows = deque(maxlen=2)  # previous and current closed slow rows
+        self._bucket = None
+        self._bucket_bar = None
+        self._prev_slow_close = math.nan
+        self._fast_bars = 0
+        self._has_bought = False
+        self._position = LongOnlyPosition(initial_capital)
+
+    def _close_slow_bar(self):
+        bar = self._bucket_bar
+        change = bar['close'] - self._prev_slow_close
+        self._prev_slow_close = bar['close']
+        self._slow_rows.append({
+            'close': bar['close'],
+            'SMA_26': self._slow_sma_26.update(bar['close']),
+            'SMA_14': self._slow_sma_14.update(bar['close']),
+            'loss': self._slow_loss.update(change) if not math.isnan(change) else math.nan,
+            'Low_14D_Max': self._slow_low_max.update(bar['low']),
+        })
+
+    def _aggregate(self, timestamp, high, low, close):
+        bucket = timestamp.floor(self.slow_freq)
+        if self._bucket is not None and bucket != self._bucket:
+            self._close_slow_bar()
+        if bucket != self._bucket:
+            self._bucket = bucket
+            self._bucket_bar = {'high': high, 'low': low, 'close': close}
+        else:
+            self._bucket_bar['high'] = max(self._bucket_bar['high'], high)
+            self._bucket_bar['low'] = min(self._bucket_bar['low'], low)
+            self._bucket_bar['close'] = close
+
+    def update(self, bar):
+        timestamp = pd.Timestamp(bar['datetime'])
+        high, low, close = (float(bar[k]) for k in ('high', 'low', 'close'))
+
+        self._aggregate(timestamp, high, low, close)
+        sma_26 = self._fast_sma_26.update(close)
+        sma_14 = self._fast_sma_14.update(close)
+        row_fast = self._fast_bars
+        self._fast_bars += 1
+
+        signal = 0
+        if row_fast > self.warmup and len(self._slow_rows) == 2:
+            prev, cur = self._slow_rows
+            uptrend = sma_26 - cur['SMA_26'] > 0 and cur['loss'] > 0
+            if uptrend:
+                if not self._has_bought and prev['close'] > prev['Low_14D_Max']:
+                    signal, self._has_bought = 1, True
+            elif prev['close'] < prev['Low_14D_Max'] or sma_14 - cur['SMA_14'] < 0:
+                if self._has_bought:
+                    signal, self._has_bought = -1, False
+
+        signals, trade_type = self._position.step(close, signal)
+        out = {'datetime': bar['datetime'], 'close': close, 'signal': signal, 'signals': signals,
+               'trade_type': TRADE_TYPES[trade_type], 'ready': len(self._slow_rows) == 2}
+        out.update(self._position.state)
+        out['portfolio_value'] = self._position.capital + self._position.shares * close
+        return out
+
+
+STREAMS = {
+    'ensemble': EnsembleStream,
+    'double_timeframe': DoubleTimeframeStream,
+}
+
+
+# -------FEEDS--------#
+def tail_csv(csv_file_path, follow=False, poll_interval=1.0):
+    """
+    Yield the rows of an OHLCV CSV as bar dicts, optionally waiting for new rows like `tail -f`.
+
+    Parameters:
+    - csv_file_path: str
+    - follow: bool
+        Keep polling for appended rows after reaching the end of the file.
+    - poll_interval: float
+        Seconds to sleep between polls when following.
+    """
+    with open(csv_file_path, "r", newline="") as f:
+        header = next(csv.reader([f.readline()]))
+        pending = ""
+        while True:
+            line = f.readline()
+            if not line:
+                if not follow:
+                    break
+                time.sleep(poll_interval)
+                continue
+            pending += line
+            if not pending.endswith("\n"):
+                continue  # the writer has not finished this row yet
+            values = next(csv.reader([pending]))
+            pending = ""
+            if not values:
+                continue
+            bar = dict(zip(header, values))
+            for key in ('open', 'high', 'low', 'close', 'volume'):
+                if key in bar:
+                    bar[key] = float(bar[key])
+            yield bar
+
+
+def run_stream(feed, stream):
+    """
+    Push every bar of a feed through a streaming strategy and yield its output for each bar.
+    """
+    for bar in feed:
+        yield stream.update(bar)
+
+
+# -------MAIN FUNCTION--------#
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay or follow a bar CSV through a streaming strategy.")
+    parser.add_argument("strategy", choices=sorted(STREAMS))
+    parser.add_argument("csv_file_path")
+    parser.add_argument("--follow", action="store_true", help="keep waiting for new rows")
+    parser.add_argument("--poll-interval", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    stream = STREAMS[args.strategy]()
+    feed = tail_csv(args.csv_file_path, follow=args.follow, poll_interval=args.poll_interval)
+    for out in run_stream(feed, stream):
+        if out['signals'] != 0:
+            print(out['datetime'], out['trade_type'], out['signals'], out['close'])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+# Supertrend indicator with batch backfill and O(1) live updates
+
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from alphas.jit import jit, use_numba
+
+SUPERTREND_COLUMNS = ('TR', 'ATR', 'Upper Band', 'Lower Band', 'Supertrend', 'In Uptrend')
+
+
+def true_range(high, low, close):
+    """
+    True range: the greatest of high - low, |high - previous close| and |low - previous close|.
+    The first bar has no previous close and uses high - low. Works on 1-D series or 2-D
+    (time x symbol) arrays.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+    prev_close = np.empty_like(close)
+    prev_close[:1] = np.nan
+    prev_close[1:] = close[:-1]
+    # fmax skips the NaN of the first bar the same way DataFrame.max(axis=1) does
+    return np.fmax(high - low, np.fmax(np.abs(high - prev_close), np.abs(low - prev_close)))
+
+
+def rolling_mean(values, window):
+    """
+    Trailing mean over `window` values, NaN until the window is full. Computed by
+    Series.rolling().mean() so the ATR is the same to the last bit as the original DataFrame code.
+    2-D (time x symbol) arrays are averaged along axis 0.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    frame = pd.DataFrame(values) if values.ndim == 2 else pd.Series(values)
+    return frame.rolling(window).mean().to_numpy()
+
+
+def _ratchet_bands(close, upper, lower):
+    # Band ratcheting and trend direction, upper/lower are modified in place
+    n = len(close)
+    in_uptrend = np.ones(n, dtype=np.bool_)
+    supertrend = np.full(n, np.nan)
+    for i in range(1, n):
+        if close[i] > upper[i - 1]:
+            in_uptrend[i] = True
+        elif close[i] < lower[i - 1]:
+            in_uptrend[i] = False
+        else:
+            in_uptrend[i] = in_uptrend[i - 1]
+
+            if in_uptrend[i] and lower[i] < lower[i - 1]:
+                lower[i] = lower[i - 1]
+            if not in_uptrend[i] and upper[i] > upper[i - 1]:
+                upper[i] = upper[i - 1]
+
+        supertrend[i] = lower[i] if in_uptrend[i] else upper[i]
+
+    return in_uptrend, supertrend
+
+
+_ratchet_bands_jit = jit(_ratchet_bands)
+
+
+def _ratchet_bands_panel(close, upper, lower):
+    # _ratchet_bands() for 2-D (time x symbol) arrays: one step per bar, every symbol at once
+    n = len(close)
+    in_uptrend = np.ones(close.shape, dtype=np.bool_)
+    supertrend = np.full(close.shape, np.nan)
+    for i in range(1, n):
+        up = close[i] > upper[i - 1]
+        down = close[i] < lower[i - 1]
+        inside = ~up & ~down
+        trend = up | (inside & in_uptrend[i - 1])
+        in_uptrend[i] = trend
+
+        np.copyto(lower[i], lower[i - 1], where=inside & trend & (lower[i] < lower[i - 1]))
+        np.copyto(upper[i], upper[i - 1], where=inside & ~trend & (upper[i] > upper[i - 1]))
+        supertrend[i] = np.where(trend, lower[i], upper[i])
+
+    return in_uptrend, supertrend
+
+
+def ratchet_bands(close, upper, lower, backend="auto"):
+    """
+    Trend direction and Supertrend line from the raw bands, which are ratcheted in place.
+
+    2-D (time x symbol) arrays run the compiled kernel once per symbol column, or without numba
+    a loop over the bars that updates every symbol in one vectorized step.
+
+    Returns:
+    - tuple of ndarray
+        (in_uptrend, supertrend), shaped like close.
+    """
+    numba = use_numba(backend)
+    if close.ndim == 1:
+        return (_ratchet_bands_jit if numba else _ratchet_bands)(close, upper, lower)
+    if not numba:
+        return _ratchet_bands_panel(close, upper, lower)
+
+    in_uptrend = np.empty(close.shape, dtype=np.bool_, order="F")
+    supertrend = np.empty(close.shape, order="F")
+    for j in range(close.shape[1]):
+        column_upper = np.ascontiguousarray(upper[:, j])
+        column_lower = np.ascontiguousarray(lower[:, j])
+        in_uptrend[:, j], supertrend[:, j] = _ratchet_bands_jit(
+            np.ascontiguousarray(close[:, j]), column_upper, column_lower)
+        upper[:, j], lower[:, j] = column_upper, column_lower
+    return in_uptrend, supertrend
+
+
+def supertrend_bands(high, low, close, atr_period=5, multiplier=3, backend="auto"):
+    """
+    Supertrend columns of a whole history, for 1-D series or 2-D (time x symbol) arrays.
+
+    Returns:
+    - dict
+        One array per name in SUPERTREND_COLUMNS.
+    """
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    close = np.asarray(close, dtype=np.float64)
+
+    tr = true_range(high, low, close)
+    atr = rolling_mean(tr, atr_period)
+    upper = (high + low) / 2 + multiplier * atr
+    lower = (high + low) / 2 - multiplier * atr
+    in_uptrend, supertrend = ratchet_bands(close, upper, lower, backend=backend)
+
+    return {
+        'TR': tr,
+        'ATR': atr,
+        'Upper Band': upper,
+        'Lower Band': lower,
+        'Supertrend': supertrend,
+        'In Uptrend': in_uptrend,
+    }
+
+
+class Supertrend:
+    """
+    Stateful Supertrend indicator.
+
+    batch() backfills a whole history at array speed and leaves the indicator positioned after the
+    last bar, so update() can then be fed one new bar at a time without recomputing the history.
+
+    Parameters:
+    - atr_period: int
+        Window of the ATR (simple moving average of the true range).
+    - multiplier: float
+        Band distance from the bar midpoint in ATRs.
+    """
+
+    def __init__(self, atr_period=5, multiplier=3, backend="auto"):
+        self.atr_period = atr_period
+        self.multiplier = multiplier
+        self.backend = backend
+        self.reset()
+
+    def reset(self):
+        self._tr_window = deque(maxlen=self.atr_period)
+        self._prev_close = np.nan
+        self._upper = np.nan
+        self._lower = np.nan
+        self._in_uptrend = True
+        self._bars = 0
+
+    def batch(self, arrays):
+        """
+        Compute the indicator over a full history.
+
+        Parameters:
+        - arrays: DataFrame or dict
+            'high', 'low' and 'close' columns.
+
+        Returns:
+        - dict
+            One array per name in SUPERTREND_COLUMNS, identical to the old process_data() columns.
+        """
+        self.reset()
+        close = np.asarray(arrays['close'], dtype=np.float64)
+        columns = supertrend_bands(arrays['high'], arrays['low'], close, self.atr_period, self.multiplier,
+                                   backend=self.backend)
+
+        # Carry the state forward for live updates
+        n = len(close)
+        if n:
+            self._tr_window.extend(columns['TR'][-self.atr_period:].tolist())
+            self._prev_close = close[-1]
+            self._upper = columns['Upper Band'][-1]
+            self._lower = columns['Lower Band'][-1]
+            self._in_uptrend = bool(columns['In Uptrend'][-1])
+            self._bars = n
+
+        return columns
+
+    def update(self, bar):
+        """
+        Advance the indicator by one bar.
+
+        Parameters:
+        - bar: dict or Series
+            Must provide 'high', 'low' and 'close'.
+
+        Returns:
+        - dict
+            The SUPERTREND_COLUMNS values for this bar.
+        """
+        high, low, close = float(bar['high']), float(bar['low']), float(bar['close'])
+
+        tr = high - low
+        if self._bars:
+            tr = max(tr, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._tr_window.append(tr)
+        atr = sum(self._tr_window) / self.atr_period if len(self._tr_window) == self.atr_period else np.nan
+
+        upper = (high + low) / 2 + self.multiplier * atr
+        lower = (high + low) / 2 - self.multiplier * atr
+
+        if self._bars == 0:
+            in_uptrend = True
+            supertrend = np.nan
+        else:
+            if close > self._upper:
+                in_uptrend = True
+            elif close < self._lower:
+                in_uptrend = False
+            else:
+                in_uptrend = self._in_uptrend
+
+                if in_uptrend and lower < self._lower:
+                    lower = self._lower
+                if not in_uptrend and upper > self._upper:
+                    upper = self._upper
+
+            supertrend = lower if in_uptrend else upper
+
+        self._prev_close = close
+        self._upper = upper
+        self._lower = lower
+        self._in_uptrend = in_uptrend
+        self._bars += 1
+
+        return {
+            'TR': tr,
+            'ATR': atr,
+            'Upper Band': upper,
+            'Lower Band': lower,
+            'Supertrend': supertrend,
+            'In Uptrend': in_uptrend,
+        }
@@ -0,0 +1,204 @@
+# Parallel grid / random parameter sweeps over the strategy pipelines
+
+import argparse
+import itertools
+import os
+import random
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from alphas.data import load_ohlcv
+from alphas.evaluate import summary_metrics
+from alphas.strategies import STRATEGIES, full_params, price_frame, run_strategy
+from alphas.timeframe import resample_ohlcv
+
+
+# -------PARAMETER SETS--------#
+def grid_params(space):
+    """
+    Every combination of a parameter space.
+
+    Parameters:
+    - space: dict
+        parameter -> list of values.
+
+    Returns:
+    - list of dict
+    """
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_params(space, n, seed=None):
+    """
+    n random draws from a parameter space.
+
+    Parameters:
+    - space: dict
+        parameter -> list of values (sampled uniformly) or a (low, high) tuple (uniform float, or
+        uniform int when both bounds are ints).
+    - n: int
+    - seed: int
+
+    Returns:
+    - list of dict
+    """
+    rng = random.Random(seed)
+    draws = []
+    for _ in range(n):
+        params = {}
+        for name, values in space.items():
+            if isinstance(values, tuple):
+                low, high = values
+                params[name] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) \
+                    else rng.uniform(low, high)
+            else:
+                params[name] = rng.choice(list(values))
+        draws.append(params)
+    return draws
+
+
+# Search spaces around the hard-coded values of the scripts
+DEFAULT_SPACES = {
+    'ensemble': {
+        'atr_period': [5, 7, 10, 14],
+        'multiplier': [2, 2.5, 3, 3.5],
+        'body_std_mult': [1.4, 1.8, 2.2],
+        'signal_1_weight': [0.4, 0.5, 0.6, 0.7],  # signal_2_weight follows as 1 - signal_1_weight
+        'stop_loss_pct': [0.03, 0.05, 0.08],
+        'take_profit_pct': [0.05, 0.1, 0.15, 0.2],
+    },
+    'supertrend': {
+        'atr_period': [5, 7, 10, 12, 15, 20, 25],
+        'multiplier': [1.5, 2, 2.5, 3, 3.5, 4],
+    },
+    'double_timeframe': {
+        'long_window': [20, 26, 30, 40],
+        'short_window': [7, 10, 14, 20],
+        'low_max_window': [7, 14, 21],
+        'loss_window': [5, 7, 10],
+    },
+}
+
+
+# -------WORKERS--------#
+_worker_data = None
+_worker_strategy = None
+
+
+def _init_worker(strategy, data):
+    global _worker_data, _worker_strategy
+    _worker_data = data
+    _worker_strategy = strategy
+
+
+def _evaluate(strategy, data, param_sets, fee):
+    # Every parameter set in a batch shares the same indicator parameters, so the indicators are
+    # computed once for the first set and reused from the cache for the rest
+    cache = {}
+    prices = price_frame(strategy, data)
+    close = np.asarray(prices['close'], dtype=np.float64)
+    datetime = np.asarray(prices['datetime'])
+
+    rows = []
+    for params in param_sets:
+        result = run_strategy(strategy, data, params, cache=cache)
+        metrics = summary_metrics(close[result['rows']], result['trade_type'], datetime[result['rows']], fee=fee)
+        rows.append({**params, **metrics})
+    return rows
+
+
+def _evaluate_in_worker(param_sets, fee):
+    return _evaluate(_worker_strategy, _worker_data, param_sets, fee)
+
+
+def _prepare(strategy, data):
+    # Parse the timestamps once instead of once per parameter set
+    frames = data if strategy == 'double_timeframe' else (data,)
+    frames = tuple(frame.assign(datetime=pd.to_datetime(frame['datetime'])) for frame in frames)
+    return frames if strategy == 'double_timeframe' else frames[0]
+
+
+def _indicator_key(spec, params):
+    depends_on = sorted({p for names in spec['indicators'].values() for p in names})
+    return tuple(params[p] for p in depends_on)
+
+
+# -------SWEEP--------#
+def sweep(strategy, data, param_sets, processes=None, fee=0.0, rank_by='sharpe', ascending=False):
+    """
+    Backtest a strategy locally for many parameter sets.
+
+    Parameter sets are grouped by the parameters their indicators depend on; each group runs in
+    one task, so e.g. a sweep over stop loss levels computes the Supertrend once per ATR setting.
+    The data is sent to every worker process once.
+
+    Parameters:
+    - strategy: str
+        Key of strategies.STRATEGIES.
+    - data: DataFrame, or (data_fast, data_slow) for 'double_timeframe'
+        Raw OHLCV with a 'datetime' column.
+    - param_sets: list of dict
+        From grid_params() / random_params(); missing parameters are derived or use the strategy
+        defaults, see strategies.full_params().
+    - processes: int
+        Worker processes, 1 runs in this process. Defaults to the CPU count.
+    - fee: float
+        Cost per unit of position change passed to the metrics.
+    - rank_by: str
+        Metric column the table is sorted by.
+
+    Returns:
+    - DataFrame
+        One row per parameter set with its parameters and metrics, best first.
+    """
+    spec = STRATEGIES[strategy]
+    data = _prepare(strategy, data)
+    full_sets = [full_params(strategy, params) for params in param_sets]
+
+    groups = defaultdict(list)
+    for params in full_sets:
+        groups[_indicator_key(spec, params)].append(params)
+    batches = list(groups.values())
+
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(batches) == 1:
+        rows = [row for batch in batches for row in _evaluate(strategy, data, batch, fee)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(processes, len(batches)), initializer=_init_worker,
+                                 initargs=(strategy, data)) as pool:
+            results = pool.map(_evaluate_in_worker, batches, itertools.repeat(fee))
+            rows = [row for batch in results for row in batch]
+
+    table = pd.DataFrame(rows)
+    return table.sort_values(rank_by, ascending=ascending, na_position='last').reset_index(drop=True)
+
+
+# -------MAIN FUNCTION--------#
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank strategy parameter sets by local backtest metrics.")
+    parser.add_argument("strategy", choices=sorted(STRATEGIES))
+    parser.add_argument("csv_file_paths", nargs="+", help="OHLCV CSV (fast, optionally then slow for double_timeframe)")
+    parser.add_argument("--random", type=int, default=0, help="draw this many random sets instead of the grid")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--fee", type=float, default=0.0)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    frames = [load_ohlcv(path) for path in args.csv_file_paths]
+    data = frames[0]
+    if args.strategy == 'double_timeframe':
+        data = tuple(frames[:2]) if len(frames) > 1 else (data, resample_ohlcv(data, "1D")[0])
+
+    space = DEFAULT_SPACES[args.strategy]
+    param_sets = random_params(space, args.random, args.seed) if args.random else grid_params(space)
+    table = sweep(args.strategy, data, param_sets, processes=args.processes, fee=args.fee)
+    print(table.head(args.top).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
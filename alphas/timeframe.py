@@ -0,0 +1,212 @@
+# Multi-timeframe alignment and signal engine for the Double Timeframe Strategy
+
+import numpy as np
+import pandas as pd
+
+
+# -------TIMEFRAME ALIGNMENT--------#
+def _bar_period(times):
+    # Median spacing of sorted datetime64[ns] stamps, 0 with fewer than two
+    if len(times) < 2:
+        return np.timedelta64(0, 'ns')
+    return np.median(np.diff(times).astype(np.int64)).astype(np.int64).astype('timedelta64[ns]')
+
+
+def align_timeframes(data_fast, data_slow, direction="forward", slow_period=None):
+    """
+    As-of join of the slow timeframe onto the fast timeframe by 'datetime'.
+
+    Parameters:
+    - data_fast: DataFrame
+        Fast timeframe bars (e.g. 15m) with a 'datetime' column.
+    - data_slow: DataFrame
+        Slow timeframe bars (e.g. 1d) with a 'datetime' column, in any order.
+    - direction: str
+        'forward' pairs each fast bar with the first slow bar stamped at or after it. On gap-free
+        15m/1d data this is exactly the old math.ceil(row_fast/96) lookup.
+        'backward' pairs each fast bar with the last slow bar stamped at or before it.
+        'closed' pairs each fast bar with the last slow bar that ended at or before it, i.e. the
+        last slow bar fully known when the fast bar starts (bars are stamped with their open
+        time). Missing bars in either timeframe do not shift the pairing.
+    - slow_period: str or Timedelta
+        Length of a slow bar for 'closed', inferred from the slow timestamps when None.
+
+    Returns:
+    - ndarray
+        Position of the matched slow row for every fast row, -1 where there is no match.
+    """
+    fast_times = pd.to_datetime(data_fast['datetime']).to_numpy(dtype='datetime64[ns]')
+    slow_times = pd.to_datetime(data_slow['datetime']).to_numpy(dtype='datetime64[ns]')
+
+    # Search the slow stamps in time order, then map the matches back to the rows as given
+    order = np.argsort(slow_times, kind='stable')
+    slow_times = slow_times[order]
+
+    if direction == "forward":
+        pos = np.searchsorted(slow_times, fast_times, side='left')
+        pos[pos >= len(slow_times)] = -1
+    elif direction == "backward":
+        pos = np.searchsorted(slow_times, fast_times, side='right') - 1
+    elif direction == "closed":
+        period = _bar_period(slow_times) if slow_period is None else pd.Timedelta(slow_period).to_timedelta64()
+        pos = np.searchsorted(slow_times + period, fast_times, side='right') - 1
+    else:
+        raise ValueError(f"direction must be 'forward', 'backward' or 'closed', got {direction!r}")
+
+    matched = pos >= 0
+    pos[matched] = order[pos[matched]]
+    return pos
+
+
+def resample_ohlcv(data_fast, freq="1D", offset=None):
+    """
+    Build slow timeframe bars from fast OHLCV bars.
+
+    Fast bars are bucketed by floor((datetime - offset) / freq); open / close are the first and
+    last bar of every bucket and high / low / volume are reduced over contiguous runs, so the
+    whole aggregation is a handful of vectorized passes. Buckets without any fast bar produce no
+    slow bar.
+
+    Parameters:
+    - data_fast: DataFrame or dict
+        Fast bars sorted by 'datetime' with 'open', 'high', 'low', 'close' and optionally 'volume'.
+    - freq: str or Timedelta
+        Slow bar length, e.g. '1h', '4h' or '1D'.
+    - offset: str or Timedelta
+        Shift of the bucket boundaries from midnight, e.g. '5h30min'.
+
+    Returns:
+    - tuple
+        (DataFrame of slow bars stamped with their open time, ndarray mapping every fast bar to
+        its last fully closed slow bar or -1, see align_timeframes(direction='closed')).
+    """
+    times = pd.to_datetime(pd.Series(data_fast['datetime'])).to_numpy(dtype='datetime64[ns]')
+    period = pd.Timedelta(freq).value
+    shift = pd.Timedelta(offset).value if offset is not None else 0
+    if period <= 0:
+        raise ValueError(f"freq must be positive, got {freq!r}")
+
+    bucket = (times.astype(np.int64) - shift) // period
+    if len(bucket) > 1 and np.any(bucket[1:] < bucket[:-1]):
+        raise ValueError("data_fast must be sorted by datetime")
+    starts = np.flatnonzero(np.diff(bucket, prepend=bucket[:1] - 1))
+    ends = np.append(starts[1:], len(bucket)) - 1
+
+    slow_times = (bucket[starts] * period + shift).astype('datetime64[ns]')
+    data_slow = pd.DataFrame({'datetime': slow_times})
+    data_slow['open'] = np.asarray(data_fast['open'])[starts]
+    data_slow['high'] = np.maximum.reduceat(np.asarray(data_fast['high']), starts) if len(starts) else []
+    data_slow['low'] = np.minimum.reduceat(np.asarray(data_fast['low']), starts) if len(starts) else []
+    data_slow['close'] = np.asarray(data_fast['close'])[ends]
+    if 'volume' in data_fast:
+        data_slow['volume'] = np.add.reduceat(np.asarray(data_fast['volume']), starts) if len(starts) else []
+
+    # A slow bar is closed for every fast bar stamped at or after its end
+    pos = np.searchsorted(slow_times + np.timedelta64(period, 'ns'), times, side='right') - 1
+    return data_slow, pos
+
+
+def take_aligned(values, pos):
+    """
+    Gather slow timeframe values at the positions returned by align_timeframes().
+    Unmatched positions (-1) come back as NaN.
+    """
+    values = np.asarray(values, dtype=float)
+    out = np.full(len(pos), np.nan)
+    matched = pos >= 0
+    out[matched] = values[pos[matched]]
+    return out
+
+
+# -------POSITION STATE MACHINE--------#
+def latch_signals(entries, exits):
+    """
+    Turn entry/exit conditions into alternating buy/sell signals.
+
+    This is the has_bought/has_sold state machine of the original strat() loop: an entry only
+    fires while flat and an exit only fires while long. When both conditions are true on the same
+    bar the entry branch wins, as it did in the if/elif chain. Because the state after every bar
+    is simply the last condition that fired, it is resolved with a forward fill instead of a loop.
+
+    Parameters:
+    - entries: array of bool
+    - exits: array of bool
+
+    Returns:
+    - ndarray
+        1 on buy bars, -1 on sell bars, 0 elsewhere.
+    """
+    entries = np.asarray(entries, dtype=bool)
+    exits = np.asarray(exits, dtype=bool) & ~entries
+    n = len(entries)
+
+    # Index of the last bar (so far) on which either condition fired
+    fired = entries | exits
+    last = np.where(fired, np.arange(n), -1)
+    np.maximum.accumulate(last, out=last)
+
+    # Position state after each bar, and the state each bar starts from
+    state_after = np.where(last >= 0, entries[np.maximum(last, 0)], False)
+    state_before = np.empty(n, dtype=bool)
+    state_before[:1] = False
+    state_before[1:] = state_after[:-1]
+
+    signal = np.zeros(n, dtype=np.int64)
+    signal[entries & ~state_before] = 1
+    signal[exits & state_before] = -1
+    return signal
+
+
+# -------DOUBLE TIMEFRAME SIGNALS--------#
+def double_timeframe_signals(data_fast, data_slow, warmup=7, direction="closed",
+                             long_sma='SMA_26', short_sma='SMA_14'):
+    """
+    Column-wise version of the Double Timeframe Strategy signal logic.
+
+    Parameters:
+    - data_fast: DataFrame or dict
+        Fast bars with 'datetime' and the two SMA columns.
+    - data_slow: DataFrame or dict
+        Slow bars, in any order, with 'datetime', 'close', the two SMA columns, 'loss' and 'Low_14D_Max'.
+    - warmup: int
+        Fast rows up to and including this position never trade.
+    - direction: str
+        Passed to align_timeframes(). 'closed' uses the last finished slow bar as the "current"
+        slow row and the one before it as the "previous" row; 'forward' reproduces the old
+        math.ceil(row_fast/96) lookup, which read the slow bar still in progress.
+    - long_sma, short_sma: str
+        Names of the long and short SMA columns in both frames.
+
+    Returns:
+    - ndarray
+        The 'signal' column: 1 for buy, -1 for sell, 0 otherwise.
+    """
+    # The "previous" slow bar is the one before in time, so the slow bars are put in time order
+    slow_times = pd.to_datetime(pd.Series(data_slow['datetime'])).to_numpy(dtype='datetime64[ns]')
+    order = np.argsort(slow_times, kind='stable')
+    data_slow = {column: np.asarray(data_slow[column])[order]
+                 for column in ('datetime', 'close', 'loss', 'Low_14D_Max', long_sma, short_sma)}
+
+    pos = align_timeframes(data_fast, data_slow, direction=direction)
+    prev_pos = np.where(pos >= 1, pos - 1, -1)
+
+    sma_diff_26d = np.asarray(data_fast[long_sma], dtype=float) - take_aligned(data_slow[long_sma], pos)
+    sma_diff_14d = np.asarray(data_fast[short_sma], dtype=float) - take_aligned(data_slow[short_sma], pos)
+    loss = take_aligned(data_slow['loss'], pos)
+
+    # Previous slow bar's close against its 14 bar max of lows
+    prev_close = take_aligned(data_slow['close'], prev_pos)
+    prev_low_max = take_aligned(data_slow['Low_14D_Max'], prev_pos)
+
+    # NaN comparisons are False, matching the scalar checks in the original loop
+    with np.errstate(invalid='ignore'):
+        uptrend = (sma_diff_26d > 0) & (loss > 0)
+        breakout = prev_close > prev_low_max
+        breakdown = prev_close < prev_low_max
+        weakening = sma_diff_14d < 0
+
+    active = (pos >= 0) & (np.arange(len(pos)) > warmup)
+    entries = active & uptrend & breakout
+    exits = active & ~uptrend & (breakdown | weakening)
+
+    return latch_signals(entries, exits)
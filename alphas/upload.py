@@ -0,0 +1,229 @@
+# Concurrent, resumable chunked upload of result files to the untrade backtester
+
+import contextlib
+import json
+import mmap
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from alphas.profiling import timed
+
+CHUNK_SIZE = 90 * 1024 * 1024  # upload limit per request
+JUPYTER_ID = "team97_zelta_hpps"  # the one you use to login to jupyter.untrade.io
+
+
+# -------CHUNKING--------#
+def line_chunks(buffer, chunk_size=CHUNK_SIZE):
+    """
+    Split a buffer into (start, end) byte ranges of at most chunk_size bytes that end on a line
+    boundary. A single line longer than chunk_size becomes its own chunk.
+    """
+    total = len(buffer)
+    ranges = []
+    start = 0
+    while start < total:
+        end = min(start + chunk_size, total)
+        if end < total:
+            cut = buffer.rfind(b"\n", start, end)
+            if cut >= start:
+                end = cut + 1
+            else:
+                found = buffer.find(b"\n", end)
+                end = total if found < 0 else found + 1
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+@contextlib.contextmanager
+def chunk_file(view):
+    """
+    Expose a chunk of bytes as a file path for Client.backtest().
+
+    On Linux the bytes go to an anonymous in-memory file (memfd) and the path is its /proc entry,
+    so nothing is written to disk; elsewhere a temporary file is used.
+    """
+    if hasattr(os, "memfd_create") and os.path.isdir("/proc/self/fd"):
+        fd = os.memfd_create("chunk.csv")
+        try:
+            os.write(fd, view)  # memfd writes are not short for in-memory files
+            os.lseek(fd, 0, os.SEEK_SET)
+            yield f"/proc/self/fd/{fd}"
+        finally:
+            os.close(fd)
+    else:
+        with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as f:
+            f.write(view)
+        try:
+            yield f.name
+        finally:
+            os.remove(f.name)
+
+
+# -------PROGRESS--------#
+class UploadProgress:
+    """
+    Acknowledged chunks of one upload, persisted as JSON next to the CSV so an interrupted
+    upload can resume with the same file_id and skip the chunks the server already has.
+    """
+
+    def __init__(self, csv_file_path, ranges, progress_path=None):
+        self.path = progress_path or csv_file_path + ".upload.json"
+        stat = os.stat(csv_file_path)
+        self._source = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'ranges': ranges}
+        self._lock = threading.Lock()
+
+        state = self._load()
+        if state and state.get('source') == self._source:
+            self.file_id = state['file_id']
+            self.acknowledged = set(state['acknowledged'])
+        else:
+            self.file_id = str(uuid.uuid4())
+            self.acknowledged = set()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if 'source' in state:
+            state['source']['ranges'] = [tuple(r) for r in state['source']['ranges']]
+        return state
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({'file_id': self.file_id, 'source': self._source,
+                       'acknowledged': sorted(self.acknowledged)}, f)
+        os.replace(tmp_path, self.path)
+
+    def acknowledge(self, chunk_number):
+        with self._lock:
+            self.acknowledged.add(chunk_number)
+            self._save()
+
+    def finish(self):
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.path)
+
+
+# -------UPLOAD--------#
+def _send(client, view, retries, backoff, **kwargs):
+    for attempt in range(retries + 1):
+        try:
+            with chunk_file(view) as path:
+                # The client returns a generator, draining it completes the request
+                return list(client.backtest(file_path=path, **kwargs))
+        except Exception:
+            if attempt == retries:
+                raise
+            time.sleep(backoff * 2 ** attempt)
+
+
+def upload_backtest(csv_file_path, client, chunk_size=CHUNK_SIZE, max_workers=4, retries=2, backoff=1.0,
+                    progress_path=None, jupyter_id=JUPYTER_ID, leverage=1, **backtest_kwargs):
+    """
+    Backtest a result CSV of any size with the untrade client.
+
+    Files up to chunk_size go up in a single request. Larger files are split on line boundaries
+    and the chunks are sent from a memory map of the file by a bounded thread pool. Every
+    acknowledged chunk is recorded, so calling this again after a failure resumes the same
+    upload and only sends the missing chunks.
+
+    Parameters:
+    - csv_file_path: str
+    - client: untrade.client.Client (or anything with the same backtest() signature)
+    - chunk_size: int
+    - max_workers: int
+        Chunks in flight at once.
+    - retries, backoff: int, float
+        Attempts per chunk after the first, with exponential backoff in seconds.
+    - progress_path: str
+        Where to keep the resume state, defaults to <csv_file_path>.upload.json.
+
+    Returns:
+    - list
+        The values returned by the backtest for the last (or only) chunk.
+    """
+    kwargs = dict(backtest_kwargs, leverage=leverage, jupyter_id=jupyter_id)
+    if os.path.getsize(csv_file_path) <= chunk_size:
+        # Normal Backtest
+        return list(client.backtest(file_path=csv_file_path, **kwargs))
+
+    with open(csv_file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+        ranges = line_chunks(buffer, chunk_size)
+        progress = UploadProgress(csv_file_path, ranges, progress_path)
+        total_chunks = len(ranges)
+
+        def upload(chunk_number):
+            start, end = ranges[chunk_number]
+            with memoryview(buffer)[start:end] as view:
+                result = _send(client, view, retries, backoff, file_id=progress.file_id,
+                               chunk_number=chunk_number, total_chunks=total_chunks, **kwargs)
+            progress.acknowledge(chunk_number)
+            return result
+
+        # The server assembles the file when the last chunk arrives, so that one goes up only
+        # after every other chunk is acknowledged
+        last = total_chunks - 1
+        pending = [n for n in range(last) if n not in progress.acknowledged]
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(upload, n) for n in pending]
+        errors = [future.exception() for future in futures if future.exception() is not None]
+        if errors:
+            raise errors[0]
+        result = upload(last)
+
+    progress.finish()
+    return result
+
+
+# -------BACK TESTING--------#
+def untrade_client():
+    """
+    A new untrade Client; the SDK is only imported here, by the runs that backtest.
+    """
+    from untrade.client import Client
+    return Client()
+
+
+@timed("backtest")
+def perform_backtest(csv_file_path, jupyter_id=JUPYTER_ID, leverage=1, client=None, **backtest_kwargs):
+    """
+    Perform backtesting using the untrade SDK.
+
+    Parameters:
+    - csv_file_path: str
+        Path to the CSV file containing historical price data and signals.
+    - jupyter_id: str
+    - leverage: float
+    - client: untrade.client.Client
+        Defaults to a new one.
+
+    Returns:
+    - list
+        The backtest results. The client's generator is drained here, so the request runs (and
+        is timed) inside this call.
+    """
+    client = client or untrade_client()
+    return list(client.backtest(file_path=csv_file_path, leverage=leverage, jupyter_id=jupyter_id,
+                                **backtest_kwargs))
+
+
+@timed("backtest")
+def perform_backtest_large_csv(csv_file_path, jupyter_id=JUPYTER_ID, leverage=1, client=None, **upload_kwargs):
+    """
+    Backtest a result file of any size, see upload_backtest(): split on line boundaries,
+    uploaded concurrently and resumed after an interruption.
+
+    Returns:
+    - list
+        The backtest results.
+    """
+    client = client or untrade_client()
+    return upload_backtest(csv_file_path, client, jupyter_id=jupyter_id, leverage=leverage, **upload_kwargs)
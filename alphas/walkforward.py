@@ -0,0 +1,238 @@
+# Walk-forward (rolling out-of-sample) validation of the strategy pipelines
+
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from alphas.data import load_ohlcv
+from alphas.evaluate import summary_metrics
+from alphas.strategies import STRATEGIES, full_params, price_frame, strategy_indicators
+from alphas.sweep import DEFAULT_SPACES, _prepare, grid_params
+from alphas.timeframe import resample_ohlcv
+
+# Indicators on the daily frame of the Double Timeframe Strategy: they are joined by datetime, so
+# they stay whole while the fast frame is cut into windows
+_SLOW_INDICATORS = {'double_timeframe': ('slow_sma', 'slow_trend')}
+
+
+# -------FOLDS--------#
+def warmup_bars(strategy, params):
+    """
+    Longest indicator lookback of a parameter set, in bars of the traded frame: the history a
+    window needs before its first bar so that every indicator value in it is fully formed.
+    """
+    if strategy == 'ensemble':
+        return max(52, 15, params['atr_period'])  # Senkou Span B, Marubozu body average, ATR
+    if strategy == 'supertrend':
+        return params['atr_period'] + 1  # ATR plus the previous trend flag
+    if strategy == 'double_timeframe':
+        return max(params['long_window'], params['short_window'])
+    raise KeyError(strategy)
+
+
+def walk_forward_folds(n, train, test, step=None, warmup=0, anchored=False):
+    """
+    Train / test windows over n bars.
+
+    Parameters:
+    - n: int
+    - train, test: int
+        Window lengths in bars.
+    - step: int
+        Bars between the starts of consecutive folds, defaults to test (back to back test windows).
+    - warmup: int
+        Bars of history every window needs before it starts; the first train window starts there.
+    - anchored: bool
+        Keep every train window starting at the first bar (expanding window).
+
+    Returns:
+    - list of dict
+        fold, train_start, train_stop, test_start, test_stop (stop exclusive).
+    """
+    step = step or test
+    if train <= 0 or test <= 0 or step <= 0:
+        raise ValueError("train, test and step must be positive")
+
+    folds = []
+    start = warmup
+    while start + train + test <= n:
+        folds.append({
+            'fold': len(folds),
+            'train_start': warmup if anchored else start,
+            'train_stop': start + train,
+            'test_start': start + train,
+            'test_stop': start + train + test,
+        })
+        start += step
+    return folds
+
+
+def _window(strategy, data, indicators, start, stop):
+    # Rows start:stop of the traded frame with the matching slices of the precomputed indicators
+    fixed = _SLOW_INDICATORS.get(strategy, ())
+    sliced = {
+        name: values if name in fixed else {column: array[start:stop] for column, array in values.items()}
+        for name, values in indicators.items()
+    }
+    if strategy == 'double_timeframe':
+        data_fast, data_slow = data
+        return (data_fast.iloc[start:stop], data_slow), sliced
+    return data.iloc[start:stop], sliced
+
+
+def window_metrics(strategy, data, indicators, params, start, stop, warmup, fee=0.0):
+    """
+    Metrics of a strategy traded over bars start:stop only.
+
+    The strategy runs from start - warmup so its position state is formed when the window opens,
+    but it never sees a bar at or after stop, and only the bars from start on are scored.
+    Indicators computed over the full history only look backwards, so slicing them is safe.
+    """
+    spec = STRATEGIES[strategy]
+    first = max(start - warmup, 0)
+    window_data, window_indicators = _window(strategy, data, indicators, first, stop)
+    result = spec['strategy'](window_data, window_indicators, **params)
+
+    keep = result['rows'] >= start - first
+    rows = result['rows'][keep] + first
+    prices = price_frame(strategy, data)
+    close = np.asarray(prices['close'], dtype=np.float64)[rows]
+    datetime = np.asarray(prices['datetime'])[rows]
+    metrics = summary_metrics(close, result['trade_type'][keep], datetime, fee=fee)
+    metrics['bars'] = len(rows)
+    return metrics
+
+
+# -------WORKERS--------#
+_worker_state = None
+
+
+def _init_worker(state):
+    global _worker_state
+    _worker_state = state
+
+
+def _run_fold(state, fold):
+    strategy, data, cache = state['strategy'], state['data'], state['cache']
+    param_sets, warmup, fee = state['param_sets'], state['warmup'], state['fee']
+    rank_by, ascending = state['rank_by'], state['ascending']
+
+    def metrics(params, start, stop):
+        indicators = strategy_indicators(strategy, data, params, cache)
+        return window_metrics(strategy, data, indicators, params, start, stop, warmup, fee)
+
+    # Pick the parameter set on the train window only, then score it on the unseen test window
+    train = [metrics(params, fold['train_start'], fold['train_stop']) for params in param_sets]
+    scores = np.array([m[rank_by] for m in train], dtype=np.float64)
+    scores = np.where(np.isnan(scores), np.inf if ascending else -np.inf, scores)
+    best = int(np.argmin(scores) if ascending else np.argmax(scores))
+    test = metrics(param_sets[best], fold['test_start'], fold['test_stop'])
+
+    row = dict(fold)
+    if len(param_sets) > 1:
+        row.update(param_sets[best])
+    row.update({f"train_{name}": value for name, value in train[best].items()})
+    row.update({f"test_{name}": value for name, value in test.items()})
+    return row
+
+
+def _run_fold_in_worker(fold):
+    return _run_fold(_worker_state, fold)
+
+
+# -------WALK FORWARD--------#
+def walk_forward(strategy, data, train, test, step=None, param_sets=None, warmup=None, anchored=False,
+                 processes=None, fee=0.0, rank_by='sharpe', ascending=False):
+    """
+    Walk-forward validation: train / test windows rolled over the history, scored per fold.
+
+    The indicators of every parameter set are computed once over the full history and sliced per
+    window. Every window is traded with only `warmup` bars of history before it and nothing after
+    it, so no fold sees data from its own future.
+
+    Parameters:
+    - strategy: str
+        Key of strategies.STRATEGIES.
+    - data: DataFrame, or (data_fast, data_slow) for 'double_timeframe'
+    - train, test, step: int
+        Window lengths and fold spacing in bars of the traded frame, see walk_forward_folds().
+    - param_sets: list of dict
+        Candidates chosen from on every train window by rank_by. Defaults to the strategy defaults
+        alone, which turns the train columns into an in-sample reference for the test columns.
+    - warmup: int
+        History before each window, defaults to the longest lookback of the candidates
+        (warmup_bars()).
+    - anchored: bool
+        Expanding instead of rolling train windows.
+    - processes: int
+        Worker processes, 1 runs in this process. Defaults to the CPU count.
+    - fee: float
+    - rank_by, ascending:
+        Train metric used to choose the parameters, best first.
+
+    Returns:
+    - DataFrame
+        One row per fold: bar bounds, test period, the chosen parameters when there are several
+        candidates, and train_* / test_* metrics (see evaluate.summary_metrics(), plus bars).
+    """
+    data = _prepare(strategy, data)
+    param_sets = [full_params(strategy, params) for params in (param_sets or [{}])]
+    if warmup is None:
+        warmup = max(warmup_bars(strategy, params) for params in param_sets)
+
+    prices = price_frame(strategy, data)
+    folds = walk_forward_folds(len(prices), train, test, step, warmup, anchored)
+    if not folds:
+        raise ValueError(f"{len(prices)} bars are too few for warmup {warmup} + train {train} + test {test}")
+
+    cache = {}
+    for params in param_sets:
+        strategy_indicators(strategy, data, params, cache)
+    state = {'strategy': strategy, 'data': data, 'cache': cache, 'param_sets': param_sets, 'warmup': warmup,
+             'fee': fee, 'rank_by': rank_by, 'ascending': ascending}
+
+    processes = min(processes or os.cpu_count() or 1, len(folds))
+    if processes == 1:
+        rows = [_run_fold(state, fold) for fold in folds]
+    else:
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=(state,)) as pool:
+            rows = list(pool.map(_run_fold_in_worker, folds))
+
+    table = pd.DataFrame(rows)
+    datetime = np.asarray(prices['datetime'])
+    table.insert(5, 'test_from', datetime[table['test_start']])
+    table.insert(6, 'test_to', datetime[table['test_stop'] - 1])
+    return table
+
+
+# -------MAIN FUNCTION--------#
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward validation of a strategy.")
+    parser.add_argument("strategy", choices=sorted(STRATEGIES))
+    parser.add_argument("csv_file_paths", nargs="+", help="OHLCV CSV (fast, optionally then slow for double_timeframe)")
+    parser.add_argument("--train", type=int, required=True, help="train window in bars")
+    parser.add_argument("--test", type=int, required=True, help="test window in bars")
+    parser.add_argument("--step", type=int, default=None)
+    parser.add_argument("--warmup", type=int, default=None)
+    parser.add_argument("--anchored", action="store_true")
+    parser.add_argument("--optimize", action="store_true", help="choose from the sweep grid on every train window")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--fee", type=float, default=0.0)
+    args = parser.parse_args(argv)
+
+    frames = [load_ohlcv(path) for path in args.csv_file_paths]
+    data = frames[0]
+    if args.strategy == 'double_timeframe':
+        data = tuple(frames[:2]) if len(frames) > 1 else (data, resample_ohlcv(data, "1D")[0])
+    param_sets = grid_params(DEFAULT_SPACES[args.strategy]) if args.optimize else None
+
+    table = walk_forward(args.strategy, data, args.train, args.test, step=args.step, param_sets=param_sets,
+                         warmup=args.warmup, anchored=args.anchored, processes=args.processes, fee=args.fee)
+    print(table.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+# pytest-benchmark entry point for the stages of alphas.benchmark:
+#   pytest benchmarks --benchmark-only [--benchmark-save=NAME | --benchmark-compare]
+# ALPHAS_BENCH_BARS sets the synthetic data size (default 100000).
+
+import os
+
+import numpy as np
+import pytest
+
+from alphas import benchmark as pipelines
+from alphas import features
+
+pytest.importorskip("pytest_benchmark")
+
+BARS = int(os.environ.get("ALPHAS_BENCH_BARS", 100_000))
+CASES = [(name, stage_name) for name in pipelines.SCRIPTS
+         for stage_name, _ in pipelines.pipeline_stages(name, None)]
+
+
+@pytest.fixture(scope="module")
+def csv_path(tmp_path_factory):
+    path = tmp_path_factory.mktemp("ohlcv") / f"ohlcv_{BARS}.csv"
+    pipelines.synthetic_ohlcv(BARS).to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def stages(csv_path, tmp_path_factory):
+    # script -> {stage name: (stage, input state)}, each pipeline run once to get the inputs
+    output_dir = tmp_path_factory.mktemp("output")
+    inputs = {}
+    for name in pipelines.SCRIPTS:
+        state = {'csv': csv_path, 'output': str(output_dir / f"{name}_result.csv"), 'float_dtype': np.float64}
+        script = pipelines.load_script(name)
+        inputs[name] = {stage_name: (stage, state) for stage_name, stage, state in
+                        pipelines.stage_inputs(name, script, state)}
+    return inputs
+
+
+@pytest.mark.parametrize("name, stage_name", CASES)
+def test_stage(benchmark, stages, name, stage_name, monkeypatch):
+    stage, state = stages[name][stage_name]
+
+    def setup():
+        # Indicators are computed in every round, not read from the feature store
+        monkeypatch.setattr(features, "STORE", features.FeatureStore(max_items=0))
+        return (pipelines.fresh_state(state),), {}
+
+    benchmark.group = f"{name} ({BARS} bars)"
+    benchmark.pedantic(stage, setup=setup, rounds=3)
+
@@ -1,16 +1,27 @@
 # BTC : Double Timeframe Strategy Design
 
-import uuid
 import pandas as pd
-import os
-from untrade.client import Client
-import math
 import numpy as np
-from scipy.stats import genhyperbolic  
+
+from alphas.accounting import long_only_portfolio, trade_type_categorical
+from alphas.data import load_ohlcv
+from alphas.export import export_result
+from alphas.features import compute
+from alphas.ledger import TradeLedger
+from alphas.memory import downcast, peak_rss_mb
+from alphas.profiling import stage, timed, write_report
+from alphas.timeframe import double_timeframe_signals, resample_ohlcv
+from alphas.upload import perform_backtest_large_csv
+
+# float32 prices and indicators, int8 signals: for 1m data across many symbols
+LOW_MEMORY = False
 
 
 # -------INITIAL DATA PROCESSING--------#
+@timed()
 def process_data(data_fast, data_slow):
+    float_dtype = np.float32 if LOW_MEMORY else np.float64
+
     # Convert datetime columns to proper datetime format
     data_slow['datetime'] = pd.to_datetime(data_slow['datetime'])
     data_fast['datetime'] = pd.to_datetime(data_fast['datetime'])
@@ -26,18 +37,19 @@ def process_data(data_fast, data_slow):
     
     """
     # Calculate Simple Moving Averages (SMA) for a window of 26
-    data_slow['SMA_26'] = data_slow['close'].rolling(window=26).mean() 
-    data_fast['SMA_26'] = data_fast['close'].rolling(window=26).mean() 
+    data_slow['SMA_26'] = compute('sma', data_slow, window=26, float_dtype=float_dtype)['SMA']
+    data_fast['SMA_26'] = compute('sma', data_fast, window=26, float_dtype=float_dtype)['SMA']
 
     # Calculate Simple Moving Averages (SMA) for a window of 14
-    data_slow['SMA_14'] = data_slow['close'].rolling(window=14).mean() 
-    data_fast['SMA_14'] = data_fast['close'].rolling(window=14).mean() 
+    data_slow['SMA_14'] = compute('sma', data_slow, window=14, float_dtype=float_dtype)['SMA']
+    data_fast['SMA_14'] = compute('sma', data_fast, window=14, float_dtype=float_dtype)['SMA']
 
     return data_slow, data_fast
 
 
 
 # -------STRATEGY LOGIC--------#
+@timed()
 def strat(data_fast, data_slow):
     """
     Create a strategy based on indicators or other factors.
@@ -51,23 +63,9 @@ def strat(data_fast, data_slow):
         The modified input data with an additional 'signal' column representing the strategy signals.
     """
     initial_capital = 100  # Starting capital
-    capital = initial_capital  # Available capital
-    holding = False  # Not holding any asset initially
-    shares = 0  # Number of shares owned
-    entry_price = 0  # Price at which the asset was bought
-    highest_portfolio_value = 0  # Track the highest portfolio value since the entry
-    portfolio_entry_value = 0  # Track portfolio value at entry
+    float_dtype = np.float32 if LOW_MEMORY else np.float64
 
-    # Track portfolio values for each day
-    data_fast['capital'] = np.nan
-    data_fast['shares'] = np.nan
-    data_fast['portfolio_value'] = np.nan
-    data_fast['signals'] = 0
-    data_fast['trade_type'] = "hold"
-
-    data_fast['signal'] = 0
-    data_slow['Low_14D_Max'] = data_slow['low'].rolling(window=14).max()
-    data_fast['Low_14D_Max'] = data_fast['low'].rolling(window=14).max()
+    data_slow['Low_14D_Max'] = compute('low_max', data_slow, window=14, float_dtype=float_dtype)['Low_Max']
 
     '''
         The 'loss' column represents the 7-day rolling average of daily changes in the closing price,
@@ -76,155 +74,37 @@ def strat(data_fast, data_slow):
 
     data_slow['loss'] = (data_slow['close']- data_slow['close'].shift(1)).rolling(window=7).mean()
     
-    has_bought = 0
-    has_sold = 0
-    
-    for row_fast in range(1, len(data_fast)):
-        
-        row_slow = math.ceil(row_fast/96) 
-        # every 96 rows in 15_min dataset correspond to 1 day in the 1_day dataset (1 day = 24 hours = 24 * 4 (96) 15_min intervals)
-    
-        if row_slow in data_slow.index:
-            
-            sma_diff_26d = data_fast.loc[row_fast, 'SMA_26'] - data_slow.loc[row_slow, 'SMA_26']
-            sma_diff_14d = data_fast.loc[row_fast, 'SMA_14'] - data_slow.loc[row_slow, 'SMA_14']
-            
-            if row_fast > 7:
-
-                if sma_diff_26d > 0 and data_slow.loc[row_slow,'loss'] > 0:
-
-                    if has_bought == 0 and data_slow.loc[row_slow-1, 'close'] > data_slow.loc[row_slow-1,'Low_14D_Max'] :
-                        
-                        data_fast.loc[row_fast, 'signal'] = 1
-                        has_bought = 1
-
-
-                
-                elif(data_slow.loc[row_slow-1, 'close'] < data_slow.loc[row_slow-1,'Low_14D_Max']):
-                    
-                    if has_bought == 1:
-                        
-                        data_fast.loc[row_fast, 'signal'] = -1
-                        has_sold = 1
-                   
-    
-                elif sma_diff_14d < 0:
-                    
-                    if has_sold == 0 and has_bought == 1:
-                        
-                        data_fast.loc[row_fast, 'signal'] = -1
-                        has_sold = 1
-    
-                if has_bought == 1 and has_sold == 1:
-                    
-                    has_bought = 0
-                    has_sold = 0
-                
-                
-    
-    # Implementing trading logic
-    for index, row in data_fast.iterrows():
-        # When a buy signal occurs and not holding any shares
-        if row['signal'] == 1 and not holding:
-            data_fast.at[index, 'signals'] = 1
-            data_fast.at[index, 'trade_type'] = "long"
-            shares = capital / row['close']
-            capital -= shares * row['close']
-            holding = True
-            entry_price = row['close']
-            portfolio_entry_value = capital + (shares * entry_price)
-            highest_portfolio_value = portfolio_entry_value
-
-        # When a sell signal occurs and holding shares
-        elif row['signal'] == -1 and holding:
-            data_fast.at[index, 'signals'] = -1
-            data_fast.at[index, 'trade_type'] = "square_off"
-            capital += shares * row['close']
-            shares = 0
-            holding = False
-
-        # Track capital, shares, and portfolio value at each step
-        data_fast.at[index, 'capital'] = capital
-        data_fast.at[index, 'shares'] = shares
-        data_fast.at[index, 'portfolio_value'] = capital + (shares * row['close'])
-
-    return data_fast
-
-
-
-# -------BACK TESTING--------#
-def perform_backtest(csv_file_path):
-    client = Client()
-    result = client.backtest(
-        jupyter_id="team97_zelta_hpps",  # the one you use to login to jupyter.untrade.io
-        file_path=csv_file_path,
-        leverage=1,  # Adjust leverage as needed
-    )
-    return result
-
+    # Join the last closed daily bar onto every 15m bar by timestamp and evaluate every condition column-wise
+    signal = double_timeframe_signals(data_fast, data_slow)
 
+    # Implementing trading logic
+    signals, trade_type, capital, shares, portfolio_value = long_only_portfolio(
+        data_fast['close'].to_numpy(), signal, initial_capital)
 
-    
-# -------BACK TESTING FOR LARGE CSV--------#
-# Following function can be used for every size of file, specially for large files(time consuming, depends on upload speed and file size)
-def perform_backtest_large_csv(csv_file_path):
-    client = Client()
-    file_id = str(uuid.uuid4())
-    chunk_size = 90 * 1024 * 1024
-    total_size = os.path.getsize(csv_file_path)
-    total_chunks = (total_size + chunk_size - 1) // chunk_size
-    chunk_number = 0
-    if total_size <= chunk_size:
-        total_chunks = 1
-        # Normal Backtest
-        result = client.backtest(
-            file_path=csv_file_path,
-            leverage=1,
-            jupyter_id="team97_zelta_hpps",
-            # result_type="Q",
-        )
-        for value in result:
-            print(value)
-
-        return result
-
-    with open(csv_file_path, "rb") as f:
-        while True:
-            chunk_data = f.read(chunk_size)
-            if not chunk_data:
-                break
-            chunk_file_path = f"/tmp/{file_id}chunk{chunk_number}.csv"
-            with open(chunk_file_path, "wb") as chunk_file:
-                chunk_file.write(chunk_data)
-
-            # Large CSV Backtest
-            result = client.backtest(
-                file_path=chunk_file_path,
-                leverage=1,
-                jupyter_id="team97_zelta_hpps",
-                file_id=file_id,
-                chunk_number=chunk_number,
-                total_chunks=total_chunks,
-                # result_type="Q",
-            )
-
-            for value in result:
-                print(value)
-
-            os.remove(chunk_file_path)
-            chunk_number += 1
-
-    return result
+    # Track portfolio values for each day
+    data_fast['capital'] = downcast(capital, float_dtype)
+    data_fast['shares'] = downcast(shares, float_dtype)
+    data_fast['portfolio_value'] = downcast(portfolio_value, float_dtype)
+    data_fast['signals'] = signals.astype(np.int8)
+    data_fast['trade_type'] = trade_type_categorical(trade_type)
 
+    data_fast['signal'] = signal.astype(np.int8)
+    data_fast['Low_14D_Max'] = compute('low_max', data_fast, window=14, float_dtype=float_dtype)['Low_Max']
 
+    return data_fast
 
 
 # -------MAIN FUNCTION--------#
 def main():
     
     # Loading data
-    data_slow = pd.read_csv(r"./data/BTC/BTC_2019_2023_1d.csv")
-    data_fast = pd.read_csv(r"./data/BTC/BTC_2019_2023_15m.csv")
+    with stage("load") as record:
+        data_fast = load_ohlcv(r"./data/BTC/BTC_2019_2023_15m.csv", float_dtype=np.float32 if LOW_MEMORY else np.float64)
+        record.rows = len(data_fast)
+
+    # Building the daily bars from the 15m bars
+    with stage("resample", rows=len(data_fast)):
+        data_slow, _ = resample_ohlcv(data_fast, "1D")
 
     # Processing data
     processed_data_slow, processed_data_fast = process_data(data_fast, data_slow)
@@ -234,10 +114,21 @@ def main():
 
     # Saving results to csv
     csv_file_path = "btc_1_result.csv"
-    result_data.to_csv(csv_file_path, index=False)
+    with stage("export", rows=len(result_data)):
+        export_result(result_data, csv_file_path)
+
+    # Saving the trades for analysis
+    ledger = TradeLedger.from_trade_types(result_data['trade_type'], result_data['close'], result_data['datetime'],
+                                          initial_capital=100)
+    ledger.to_csv("btc_1_trades.csv")
+    print(f"Peak memory: {peak_rss_mb():.0f} MB")
 
     # Performing backtesting
-    backtest_result = perform_backtest_large_csv(csv_file_path)
+    for value in perform_backtest_large_csv(csv_file_path):
+        print(value)
+
+    # Writing the stage timings when ALPHAS_PROFILE is set
+    write_report()
 
 
 if __name__ == "__main__":
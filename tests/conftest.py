@@ -0,0 +1,23 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def synthetic_ohlcv(n, freq="15min", seed=0, start="2019-01-01"):
+    # n bars of a geometric random walk in the layout of the data CSVs ('datetime' as text)
+    rng = np.random.default_rng(seed)
+    close = 10000 * np.exp(np.cumsum(rng.normal(0, 0.004, n)))
+    open_ = np.concatenate((close[:1], close[:-1]))
+    return pd.DataFrame({
+        'datetime': pd.date_range(start, periods=n, freq=freq).strftime("%Y-%m-%d %H:%M:%S"),
+        'open': open_,
+        'high': np.maximum(open_, close) * (1 + rng.uniform(0, 0.003, n)),
+        'low': np.minimum(open_, close) * (1 - rng.uniform(0, 0.003, n)),
+        'close': close,
+        'volume': rng.uniform(1, 100, n),
+    })
+
+
+@pytest.fixture
+def make_ohlcv():
+    return synthetic_ohlcv
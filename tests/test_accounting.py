@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from alphas.accounting import ensemble_positions, long_only_portfolio, reversal_positions, trade_type_labels
+
+
+def reference_long_only(data, initial_capital):
+    # The original iterrows() accounting of the Double Timeframe Strategy
+    capital = initial_capital
+    holding = False
+    shares = 0
+    data['capital'] = np.nan
+    data['shares'] = np.nan
+    data['portfolio_value'] = np.nan
+    data['signals'] = 0
+    data['trade_type'] = "hold"
+    for index, row in data.iterrows():
+        if row['signal'] == 1 and not holding:
+            data.at[index, 'signals'] = 1
+            data.at[index, 'trade_type'] = "long"
+            shares = capital / row['close']
+            capital -= shares * row['close']
+            holding = True
+        elif row['signal'] == -1 and holding:
+            data.at[index, 'signals'] = -1
+            data.at[index, 'trade_type'] = "square_off"
+            capital += shares * row['close']
+            shares = 0
+            holding = False
+        data.at[index, 'capital'] = capital
+        data.at[index, 'shares'] = shares
+        data.at[index, 'portfolio_value'] = capital + (shares * row['close'])
+    return data
+
+
+def reference_ensemble(df, stop_loss_pct, take_profit_pct, sideways_filter_threshold):
+    # The original iterrows() position loop of the Ensemble Strategy, without its trade list, and
+    # with the sideways entries starting the rolling stop at the entry price
+    df['signals'] = 0
+    df['trade_type'] = "hold"
+    holding = False
+    highest_price = 0
+    for index, row in df.iterrows():
+        signal = row['signal']
+        price = row['close']
+        price_in_cloud = row['close'] > row['Senkou Span A'] and row['close'] < row['Senkou Span B']
+        is_cloud_flat = abs(row['Senkou Span A'] - row['Senkou Span B']) < sideways_filter_threshold
+
+        if price_in_cloud and is_cloud_flat:
+            if price <= row['Senkou Span B']:
+                df.at[index, 'signals'] = 1
+                df.at[index, 'trade_type'] = "long"
+                holding = True
+                buying_price = price
+                highest_price = price
+            elif price >= row['Senkou Span A']:
+                df.at[index, 'signals'] = -1
+                df.at[index, 'trade_type'] = "short"
+                holding = True
+                buying_price = price
+                highest_price = price
+        elif not holding and signal == 1:
+            df.at[index, 'signals'] = 1
+            df.at[index, 'trade_type'] = "long"
+            holding = True
+            buying_price = price
+            highest_price = price
+        elif holding:
+            if (signal == -1 or (price <= highest_price * (1 - stop_loss_pct))
+                    or (price >= buying_price * (1 + take_profit_pct))):
+                df.at[index, 'signals'] = -1
+                df.at[index, 'trade_type'] = "square_off"
+                holding = False
+            if price > highest_price:
+                highest_price = price
+            if price <= highest_price * (1 - stop_loss_pct):
+                df.at[index, 'signals'] = -1
+                df.at[index, 'trade_type'] = "square_off"
+                holding = False
+    return df
+
+
+def reference_reversal(df):
+    # The original iterrows() encoder of the SuperTrend strategy
+    df['signals'] = 0
+    first_signal = True
+    df['trade_type'] = "hold"
+    for index, row in df.iterrows():
+        if row['signal'] == 1:
+            df.at[index, 'signals'] = 1 if first_signal else 2
+            df.at[index, 'trade_type'] = "short_reversal"
+            first_signal = False
+        elif row['signal'] == -1:
+            df.at[index, 'signals'] = -1 if first_signal else -2
+            df.at[index, 'trade_type'] = "long_reversal"
+            first_signal = False
+        else:
+            df.at[index, 'trade_type'] = "hold"
+    return df
+
+
+@pytest.mark.parametrize("backend", ["numpy", "numba"])
+@pytest.mark.parametrize("seed", range(4))
+def test_long_only_portfolio_matches_the_loop(seed, backend):
+    if backend == "numba":
+        pytest.importorskip("numba")
+    rng = np.random.default_rng(seed)
+    n = 3000
+    data = pd.DataFrame({
+        'close': 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n))),
+        'signal': rng.choice([-1, 0, 0, 0, 0, 0, 1], n),
+    })
+    expected = reference_long_only(data.copy(), 100)
+
+    signals, trade_type, capital, shares, portfolio_value = long_only_portfolio(
+        data['close'], data['signal'], 100, backend=backend)
+    assert np.array_equal(signals, expected['signals'])
+    assert list(trade_type_labels(trade_type)) == list(expected['trade_type'])
+    np.testing.assert_allclose(capital, expected['capital'], rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(shares, expected['shares'], rtol=1e-12, atol=1e-12)
+    np.testing.assert_allclose(portfolio_value, expected['portfolio_value'], rtol=1e-12)
+
+
+@pytest.mark.parametrize("backend", ["numpy", "numba"])
+@pytest.mark.parametrize("seed", range(4))
+def test_ensemble_positions_match_the_loop(seed, backend):
+    if backend == "numba":
+        pytest.importorskip("numba")
+    rng = np.random.default_rng(seed)
+    n = 3000
+    close = np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    # A cloud around the price, flat (and containing it) on about a tenth of the bars
+    width = np.where(rng.random(n) < 0.1, rng.uniform(0, 0.002, n), rng.uniform(0, 0.05, n))
+    span_a = close - rng.uniform(-0.5, 1, n) * width
+    span_b = span_a + width
+    span_a[:52] = span_b[:52] = np.nan  # the Ichimoku warm-up
+    df = pd.DataFrame({'close': close, 'signal': rng.choice([-1, 0, 0, 0, 0, 0, 1], n),
+                       'Senkou Span A': span_a, 'Senkou Span B': span_b})
+    expected = reference_ensemble(df.copy(), 0.05, 0.1, 0.005)
+
+    signals, trade_type = ensemble_positions(close, df['signal'], span_a, span_b, stop_loss_pct=0.05,
+                                             take_profit_pct=0.1, sideways_filter_threshold=0.005,
+                                             backend=backend)
+    assert (expected['trade_type'] == "long").sum() > 20 and (expected['trade_type'] == "square_off").sum() > 20
+    assert np.array_equal(signals, expected['signals'])
+    assert list(trade_type_labels(trade_type)) == list(expected['trade_type'])
+
+
+@pytest.mark.parametrize("signal", [
+    [0, 0, 1, 0, -1, 0, 0],  # flat -> long -> short -> flat
+    [-1, -1, 0, 1, 1, 1, 0, -1, 0],  # repeated signals, a short first
+    [0, 0, 0],  # never trades
+    [1],
+])
+def test_reversal_positions_match_the_loop(signal):
+    expected = reference_reversal(pd.DataFrame({'signal': signal}))
+    signals, trade_type = reversal_positions(np.array(signal, dtype=np.int8))
+    assert list(signals) == list(expected['signals'])
+    assert list(trade_type_labels(trade_type)) == list(expected['trade_type'])
+
+
+@pytest.mark.parametrize("seed", range(4))
+def test_reversal_positions_match_the_loop_on_runs(seed):
+    # Runs of repeated signals with flat stretches between them
+    rng = np.random.default_rng(seed)
+    signal = np.repeat(rng.choice([-1, 0, 0, 1], 400), rng.integers(1, 6, 400))
+    expected = reference_reversal(pd.DataFrame({'signal': signal}))
+    signals, trade_type = reversal_positions(signal)
+    assert np.array_equal(signals, expected['signals'])
+    assert list(trade_type_labels(trade_type)) == list(expected['trade_type'])
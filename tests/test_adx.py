@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from alphas.adx import adx_features, wilder_mean
+
+
+def reference_adx(high, low, close, period):
+    # Wilder's ADX as a loop: running sums of TR and the directional moves from the second bar,
+    # seeded with the sum of the first `period` values, and the ADX seeded with the mean DX
+    n = len(close)
+    plus_di = np.full(n, np.nan)
+    minus_di = np.full(n, np.nan)
+    dx = np.full(n, np.nan)
+    adx = np.full(n, np.nan)
+    tr_sum = plus_sum = minus_sum = 0.0
+    dx_values = []
+    for i in range(1, n):
+        tr = max(high[i] - low[i], abs(high[i] - close[i - 1]), abs(low[i] - close[i - 1]))
+        up, down = high[i] - high[i - 1], low[i - 1] - low[i]
+        plus_dm = up if up > down and up > 0 else 0.0
+        minus_dm = down if down > up and down > 0 else 0.0
+        if i <= period:
+            tr_sum, plus_sum, minus_sum = tr_sum + tr, plus_sum + plus_dm, minus_sum + minus_dm
+            if i < period:
+                continue
+        else:
+            tr_sum += tr - tr_sum / period
+            plus_sum += plus_dm - plus_sum / period
+            minus_sum += minus_dm - minus_sum / period
+        plus_di[i] = 100 * plus_sum / tr_sum
+        minus_di[i] = 100 * minus_sum / tr_sum
+        dx[i] = 100 * abs(plus_di[i] - minus_di[i]) / (plus_di[i] + minus_di[i])
+        dx_values.append(dx[i])
+        if len(dx_values) == period:
+            adx[i] = np.mean(dx_values)
+        elif len(dx_values) > period:
+            adx[i] = (adx[i - 1] * (period - 1) + dx[i]) / period
+    return {'+DI': plus_di, '-DI': minus_di, 'DX': dx, 'ADX': adx}
+
+
+@pytest.mark.parametrize("period", [5, 14])
+def test_adx_matches_wilder(period, make_ohlcv):
+    df = make_ohlcv(600, seed=period)
+    high, low, close = (df[column].to_numpy() for column in ('high', 'low', 'close'))
+    result = adx_features(df, period=period)
+    expected = reference_adx(high, low, close, period)
+    for column in expected:
+        np.testing.assert_allclose(result[column], expected[column], rtol=1e-9, err_msg=column)
+    assert np.isnan(result['ADX'][:2 * period - 1]).all() and not np.isnan(result['ADX'][2 * period - 1])
+
+
+def test_wilder_mean_is_seeded_with_the_sma():
+    values = np.array([np.nan, 1.0, 2.0, 3.0, 4.0, 10.0])
+    np.testing.assert_allclose(wilder_mean(values, 3), [np.nan, np.nan, np.nan, 2.0, 8 / 3, 46 / 9])
+
+
+def test_adx_on_a_panel_matches_each_symbol(make_ohlcv):
+    frames = [make_ohlcv(300, seed=seed) for seed in range(3)]
+    panel = {column: np.column_stack([df[column].to_numpy() for df in frames]) for column in ('high', 'low', 'close')}
+    result = adx_features(panel)
+    for j, df in enumerate(frames):
+        single = adx_features(df)
+        for column in single:
+            np.testing.assert_allclose(result[column][:, j], single[column], rtol=1e-12)
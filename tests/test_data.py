@@ -0,0 +1,37 @@
+import warnings
+
+import pandas as pd
+import pytest
+
+from alphas.data import load_ohlcv
+
+
+def write_csv(path, datetimes):
+    frame = pd.DataFrame({'datetime': datetimes, 'open': 1.0, 'high': 2.0, 'low': 0.5, 'close': 1.5,
+                          'volume': 10.0})
+    frame.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.mark.parametrize("datetimes", [
+    ["2020-01-01 00:00:00", "2020-01-01 00:15:00"],
+    ["2020-01-01 00:00:00+05:30", "2020-01-01 00:15:00+05:30"],
+    ["2020-01-01 00:00:00+00:00", "2020-01-01 00:15:00+00:00"],
+])
+def test_cache_hit_equals_the_parsed_csv(tmp_path, datetimes):
+    path = write_csv(tmp_path / "ohlcv.csv", datetimes)
+    parsed = load_ohlcv(path)
+    cached = load_ohlcv(path)
+    pd.testing.assert_frame_equal(cached, parsed)
+    pd.testing.assert_frame_equal(cached, load_ohlcv(path, use_cache=False))
+
+
+def test_object_columns_are_not_cached(tmp_path):
+    # Mixed UTC offsets only parse to Timestamp objects, which cannot be stored without pickling
+    path = write_csv(tmp_path / "ohlcv.csv", ["2020-01-01 00:00:00+05:30", "2020-01-01 00:15:00+00:00"])
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", FutureWarning)
+        parsed = load_ohlcv(path)
+        cached = load_ohlcv(path)
+    assert not (tmp_path / ".cache").exists()
+    assert list(cached['datetime']) == list(parsed['datetime'])
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from alphas.accounting import LONG, SQUARE_OFF, ensemble_positions
+from alphas.exits import EXIT_REASONS, trade_exits
+
+
+def reference_exit(high, low, close, entry, direction, stop_loss_pct, take_profit_pct, trailing_stop_pct,
+                   exit_signal):
+    # One trade walked bar by bar with the rules of the trade_exits() docstring
+    entry_price = close[entry]
+    best = entry_price
+    for i in range(entry + 1, len(close)):
+        if direction > 0:
+            levels = []
+            if stop_loss_pct is not None:
+                levels.append((entry_price * (1 - stop_loss_pct), 'stop_loss'))
+            if trailing_stop_pct is not None:
+                levels.append((best * (1 - trailing_stop_pct), 'trailing_stop'))
+            if levels:
+                level, why = max(levels, key=lambda x: (x[0], x[1] == 'stop_loss'))
+                if low[i] <= level:
+                    return i, level, why
+            if take_profit_pct is not None and high[i] >= entry_price * (1 + take_profit_pct):
+                return i, entry_price * (1 + take_profit_pct), 'take_profit'
+            best = max(best, high[i])
+        else:
+            levels = []
+            if stop_loss_pct is not None:
+                levels.append((entry_price * (1 + stop_loss_pct), 'stop_loss'))
+            if trailing_stop_pct is not None:
+                levels.append((best * (1 + trailing_stop_pct), 'trailing_stop'))
+            if levels:
+                level, why = min(levels, key=lambda x: (x[0], x[1] != 'stop_loss'))
+                if high[i] >= level:
+                    return i, level, why
+            if take_profit_pct is not None and low[i] <= entry_price * (1 - take_profit_pct):
+                return i, entry_price * (1 - take_profit_pct), 'take_profit'
+            best = min(best, low[i])
+        if exit_signal is not None and exit_signal[i] == -direction:
+            return i, close[i], 'signal'
+    return len(close) - 1, close[-1], 'end'
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_trade_exits_match_bar_by_bar_reference(seed, make_ohlcv):
+    rng = np.random.default_rng(seed)
+    df = make_ohlcv(1500, seed=seed)
+    high, low, close = (df[column].to_numpy() for column in ('high', 'low', 'close'))
+    entries = np.sort(rng.choice(len(close), 30, replace=False))
+    direction = rng.choice([-1, 1], len(entries))
+    stop_loss_pct = rng.choice([None, 0.01, 0.03])
+    take_profit_pct = rng.choice([None, 0.02, 0.05])
+    trailing_stop_pct = rng.choice([None, 0.01, 0.02])
+    exit_signal = rng.choice([-1, 0, 0, 0, 0, 0, 0, 1], len(close)) if seed % 2 else None
+
+    exits = trade_exits(high, low, close, entries, direction, stop_loss_pct, take_profit_pct, trailing_stop_pct,
+                        exit_signal=exit_signal, block=int(rng.integers(1, 20)))
+
+    for i, entry in enumerate(entries):
+        bar, price, why = reference_exit(high, low, close, entry, direction[i], stop_loss_pct, take_profit_pct,
+                                         trailing_stop_pct, exit_signal)
+        assert exits['exit'][i] == bar
+        assert exits['exit_price'][i] == pytest.approx(price)
+        assert EXIT_REASONS[exits['reason'][i]] == why
+
+
+@pytest.mark.parametrize("backend", ["numpy", "numba"])
+@pytest.mark.parametrize("seed", range(4))
+def test_ensemble_exits_match_trade_exits(seed, backend, make_ohlcv):
+    # The Ensemble Strategy's rolling stop / take profit / sell signal (with intrabar prices and
+    # the sideways filter off) must close every long on the bar trade_exits() picks for it
+    if backend == "numba":
+        pytest.importorskip("numba")
+    rng = np.random.default_rng(seed)
+    df = make_ohlcv(3000, seed=seed)
+    high, low, close = (df[column].to_numpy() for column in ('high', 'low', 'close'))
+    signal = rng.choice([-1, 0, 0, 0, 0, 0, 0, 0, 1], len(close))
+    spans = np.full(len(close), np.nan)
+    stop_loss_pct, take_profit_pct = 0.02, 0.04
+
+    _, trade_type = ensemble_positions(close, signal, spans, spans, stop_loss_pct=stop_loss_pct,
+                                       take_profit_pct=take_profit_pct, sideways_filter_threshold=0.0,
+                                       high=high, low=low, backend=backend)
+    entries = np.flatnonzero(trade_type == LONG)
+    square_offs = np.flatnonzero(trade_type == SQUARE_OFF)
+    assert len(entries) > 10
+
+    exits = trade_exits(high, low, close, entries, 1, trailing_stop_pct=stop_loss_pct,
+                        take_profit_pct=take_profit_pct, exit_signal=signal)
+    closed = len(square_offs)
+    assert np.array_equal(exits['exit'][:closed], square_offs)
+    # A trade still open at the end is closed there by trade_exits()
+    if len(entries) > closed:
+        assert exits['exit'][-1] == len(close) - 1
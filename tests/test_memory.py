@@ -0,0 +1,45 @@
+import importlib
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from alphas import features
+from alphas.data import load_ohlcv
+from alphas.timeframe import resample_ohlcv
+
+
+def traced_peak(script, csv_path):
+    # Peak of the Python/numpy allocations of one run: load, process_data and strat
+    tracemalloc.start()
+    try:
+        data = load_ohlcv(csv_path, use_cache=False, float_dtype=np.float32 if script.LOW_MEMORY else np.float64)
+        if script.__name__.startswith("main_1"):
+            data_slow, data_fast = script.process_data(data, resample_ohlcv(data, "1D")[0])
+            result = script.strat(data_fast, data_slow)
+        else:
+            result = script.strat(script.process_data(data))
+        return tracemalloc.get_traced_memory()[1], result
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("name", ["main_1_btc", "main_2_btc", "main_2_eth"])
+def test_low_memory_lowers_the_peak(name, make_ohlcv, tmp_path, monkeypatch):
+    script = importlib.import_module(name)
+    csv_path = str(tmp_path / "ohlcv.csv")
+    make_ohlcv(50_000).to_csv(csv_path, index=False)
+
+    traced_peak(script, csv_path)  # imports and first-call setup outside the measured runs
+    peaks = {}
+    for low_memory in (False, True):
+        monkeypatch.setattr(script, "LOW_MEMORY", low_memory)
+        monkeypatch.setattr(features, "STORE", features.FeatureStore())  # results stay pinned, as in a run
+        peaks[low_memory], result = traced_peak(script, csv_path)
+        floats = [column for column in result.columns if result[column].dtype.kind == 'f']
+        assert {str(result[column].dtype) for column in floats} == {'float32' if low_memory else 'float64'}
+        # The shared store keeps the indicators in the same dtype, not a float64 copy of them
+        stored = {str(values.dtype) for output in features.STORE._memory.values() for values in output.values()
+                  if values.dtype.kind == 'f'}
+        assert stored == {'float32' if low_memory else 'float64'}
+    assert peaks[True] < peaks[False]
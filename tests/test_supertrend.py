@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from alphas.supertrend import SUPERTREND_COLUMNS, Supertrend
+
+
+def reference_supertrend(df, atr_period, multiplier):
+    # The DataFrame code the scripts used before alphas.supertrend
+    df = df.copy()
+    df['HL'] = df['high'] - df['low']
+    df['HC'] = abs(df['high'] - df['close'].shift(1))
+    df['LC'] = abs(df['low'] - df['close'].shift(1))
+    df['TR'] = df[['HL', 'HC', 'LC']].max(axis=1)
+    df['ATR'] = df['TR'].rolling(atr_period).mean()
+    df['Upper Band'] = (df['high'] + df['low']) / 2 + multiplier * df['ATR']
+    df['Lower Band'] = (df['high'] + df['low']) / 2 - multiplier * df['ATR']
+    df['Supertrend'] = np.nan
+    df['In Uptrend'] = True
+    for i in range(1, len(df)):
+        if df['close'][i] > df['Upper Band'][i - 1]:
+            df.at[i, 'In Uptrend'] = True
+        elif df['close'][i] < df['Lower Band'][i - 1]:
+            df.at[i, 'In Uptrend'] = False
+        else:
+            df.at[i, 'In Uptrend'] = df['In Uptrend'][i - 1]
+            if df['In Uptrend'][i] and df['Lower Band'][i] < df['Lower Band'][i - 1]:
+                df.at[i, 'Lower Band'] = df['Lower Band'][i - 1]
+            if not df['In Uptrend'][i] and df['Upper Band'][i] > df['Upper Band'][i - 1]:
+                df.at[i, 'Upper Band'] = df['Upper Band'][i - 1]
+        df.at[i, 'Supertrend'] = df['Lower Band'][i] if df['In Uptrend'][i] else df['Upper Band'][i]
+    return df
+
+
+@pytest.mark.parametrize("atr_period", [5, 15])
+def test_batch_is_identical_to_the_dataframe_code(atr_period, make_ohlcv):
+    df = make_ohlcv(2000, seed=atr_period)
+    expected = reference_supertrend(df, atr_period, 3)
+    result = Supertrend(atr_period, 3).batch(df)
+    for column in SUPERTREND_COLUMNS:
+        assert np.array_equal(result[column], expected[column].to_numpy(dtype=result[column].dtype),
+                              equal_nan=result[column].dtype.kind == 'f'), column
@@ -0,0 +1,16 @@
+import pytest
+
+from alphas.strategies import full_params
+from alphas.sweep import grid_params, sweep
+
+
+def test_signal_weights_sum_to_one(make_ohlcv):
+    param_sets = grid_params({'signal_1_weight': [0.4, 0.5, 0.6, 0.7]})
+    table = sweep('ensemble', make_ohlcv(3000, freq="1D"), param_sets, processes=1)
+    assert len(table) == 4
+    assert (table['signal_1_weight'] + table['signal_2_weight']).tolist() == pytest.approx([1.0] * 4)
+
+
+def test_given_weights_are_kept():
+    assert full_params('ensemble', {'signal_1_weight': 0.7, 'signal_2_weight': 0.5})['signal_2_weight'] == 0.5
+    assert full_params('ensemble')['signal_2_weight'] == 0.4
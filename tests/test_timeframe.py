@@ -0,0 +1,118 @@
+import math
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from alphas.timeframe import align_timeframes, double_timeframe_signals, resample_ohlcv
+
+
+def reference_signals(data_fast, data_slow, direction, warmup=7):
+    # The original strat() loop over the slow bars in time order. 'row' is its math.ceil(row_fast/96)
+    # lookup; 'forward' looks the slow bar up by timestamp: the first one stamped at or after the
+    # fast bar. The slow bar before it in time is the "previous" one.
+    slow = data_slow.sort_values('datetime', kind='stable')
+    slow = {column: slow[column].to_numpy() for column in slow.columns}
+    fast = {column: data_fast[column].to_numpy() for column in ('datetime', 'SMA_26', 'SMA_14')}
+    slow_times = slow['datetime']
+    signal = np.zeros(len(fast['datetime']), dtype=np.int64)
+    has_bought = 0
+    has_sold = 0
+
+    for row_fast in range(1, len(signal)):
+        if direction == "row":
+            row_slow = math.ceil(row_fast / 96)
+            if row_slow >= len(slow_times):
+                continue
+        else:
+            later = np.flatnonzero(slow_times >= fast['datetime'][row_fast])
+            if len(later) == 0:
+                continue
+            row_slow = later[0]
+
+        sma_diff_26d = fast['SMA_26'][row_fast] - slow['SMA_26'][row_slow]
+        sma_diff_14d = fast['SMA_14'][row_fast] - slow['SMA_14'][row_slow]
+        prev_close = slow['close'][row_slow - 1] if row_slow >= 1 else np.nan
+        prev_low_max = slow['Low_14D_Max'][row_slow - 1] if row_slow >= 1 else np.nan
+
+        if row_fast > warmup:
+            if sma_diff_26d > 0 and slow['loss'][row_slow] > 0:
+                if has_bought == 0 and prev_close > prev_low_max:
+                    signal[row_fast] = 1
+                    has_bought = 1
+            elif prev_close < prev_low_max:
+                if has_bought == 1:
+                    signal[row_fast] = -1
+                    has_sold = 1
+            elif sma_diff_14d < 0:
+                if has_sold == 0 and has_bought == 1:
+                    signal[row_fast] = -1
+                    has_sold = 1
+            if has_bought == 1 and has_sold == 1:
+                has_bought = 0
+                has_sold = 0
+    return signal
+
+
+def double_timeframe(make_ohlcv, seed, gaps=False, shuffle=False):
+    # 15m bars from midnight and the daily bars built from them, with the script's indicator columns
+    rng = np.random.default_rng(seed)
+    data_fast = make_ohlcv(96 * 200, seed=seed)
+    data_fast['datetime'] = pd.to_datetime(data_fast['datetime'])
+    if gaps:
+        keep = rng.random(len(data_fast)) > 0.05
+        keep[96 * 80:96 * 82] = False  # two missing days
+        data_fast = data_fast[keep].reset_index(drop=True)
+    data_fast['SMA_26'] = data_fast['close'].rolling(window=26).mean()
+    data_fast['SMA_14'] = data_fast['close'].rolling(window=14).mean()
+
+    data_slow = data_fast.groupby(data_fast['datetime'].dt.floor('D')).agg(
+        open=('open', 'first'), high=('high', 'max'), low=('low', 'min'), close=('close', 'last'))
+    data_slow = data_slow.rename_axis('datetime').reset_index()
+    data_slow['SMA_26'] = data_slow['close'].rolling(window=26).mean()
+    data_slow['SMA_14'] = data_slow['close'].rolling(window=14).mean()
+    data_slow['Low_14D_Max'] = data_slow['low'].rolling(window=14).max()
+    data_slow['loss'] = (data_slow['close'] - data_slow['close'].shift(1)).rolling(window=7).mean()
+    if shuffle:
+        data_slow = data_slow.iloc[rng.permutation(len(data_slow))].reset_index(drop=True)
+    return data_fast, data_slow
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_forward_matches_the_original_loop(make_ohlcv, seed):
+    data_fast, data_slow = double_timeframe(make_ohlcv, seed)
+    expected = reference_signals(data_fast, data_slow, "row")
+    assert np.count_nonzero(expected) > 4
+    assert np.array_equal(double_timeframe_signals(data_fast, data_slow, direction="forward"), expected)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_forward_with_gaps_and_unsorted_slow_bars(make_ohlcv, seed):
+    data_fast, data_slow = double_timeframe(make_ohlcv, seed, gaps=True, shuffle=True)
+    expected = reference_signals(data_fast, data_slow, "forward")
+    assert np.count_nonzero(expected) > 4
+    assert np.array_equal(double_timeframe_signals(data_fast, data_slow, direction="forward"), expected)
+
+
+def test_align_maps_back_to_the_unsorted_rows(make_ohlcv):
+    data_fast, data_slow = double_timeframe(make_ohlcv, 0, gaps=True, shuffle=True)
+    pos = align_timeframes(data_fast, data_slow, direction="forward")
+    slow_times = data_slow['datetime'].to_numpy()
+    for row_fast, time in enumerate(data_fast['datetime'].to_numpy()):
+        later = np.flatnonzero(slow_times >= time)
+        assert pos[row_fast] == (later[np.argmin(slow_times[later])] if len(later) else -1)
+
+
+def test_closed_pairs_the_last_finished_slow_bar(make_ohlcv):
+    data_fast, data_slow = double_timeframe(make_ohlcv, 1, gaps=True, shuffle=True)
+    pos = align_timeframes(data_fast, data_slow, direction="closed", slow_period="1D")
+    slow_ends = data_slow['datetime'].to_numpy() + np.timedelta64(1, 'D')
+    for row_fast, time in enumerate(data_fast['datetime'].to_numpy()):
+        closed = np.flatnonzero(slow_ends <= time)
+        assert pos[row_fast] == (closed[np.argmax(slow_ends[closed])] if len(closed) else -1)
+
+    # resample_ohlcv() hands back the same pairing for the bars it builds
+    built, built_pos = resample_ohlcv(data_fast, "1D")
+    assert np.array_equal(built_pos, align_timeframes(data_fast, built, direction="closed", slow_period="1D"))
+    # and the inferred bar length is the same with two days missing from the slow bars
+    assert np.array_equal(pos, align_timeframes(data_fast, data_slow, direction="closed"))
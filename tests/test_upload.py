@@ -0,0 +1,106 @@
+import os
+
+import pytest
+
+from alphas.upload import line_chunks, upload_backtest
+
+
+class StubClient:
+    """
+    Records every backtest request with the bytes it sent; fails the chunks in `fail` once.
+    """
+
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.requests = []
+
+    def backtest(self, file_path, chunk_number=None, **kwargs):
+        with open(file_path, "rb") as f:
+            data = f.read()
+        if chunk_number in self.fail:
+            self.fail.discard(chunk_number)
+            raise ConnectionError(f"chunk {chunk_number} dropped")
+        self.requests.append(dict(kwargs, chunk_number=chunk_number, data=data))
+        yield {'chunk_number': chunk_number}
+
+
+def write_csv(path, lines, newline="\n", trailing=True):
+    text = newline.join(lines) + (newline if trailing else "")
+    path.write_bytes(text.encode())
+    return str(path)
+
+
+def rows(count):
+    return ["datetime,close"] + [f"2020-01-01 00:{i:02d}:00,{1000 + i * 1.5}" for i in range(count)]
+
+
+# -------CHUNKING--------#
+@pytest.mark.parametrize("newline, trailing", [("\r\n", True), ("\n", False), ("\r\n", False)])
+def test_line_chunks_end_on_line_boundaries(newline, trailing):
+    buffer = (newline.join(rows(60)) + (newline if trailing else "")).encode()
+    ranges = line_chunks(buffer, chunk_size=100)
+
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(buffer)
+    for (_, end), (start, _) in zip(ranges, ranges[1:]):
+        assert end == start  # contiguous, nothing lost or repeated
+    for start, end in ranges[:-1]:
+        assert end - start <= 100
+        assert buffer[start:end].endswith(newline.encode())
+    assert b"".join(buffer[start:end] for start, end in ranges) == buffer
+
+
+def test_line_chunks_keeps_a_long_line_whole():
+    buffer = b"a" * 50 + b"\n" + b"b" * 300 + b"\n" + b"c" * 10
+    assert line_chunks(buffer, chunk_size=100) == [(0, 51), (51, 352), (352, 362)]
+
+
+# -------UPLOAD--------#
+def test_small_file_is_one_request(tmp_path):
+    path = write_csv(tmp_path / "small.csv", rows(3))
+    client = StubClient()
+    upload_backtest(path, client, chunk_size=1 << 20)
+    assert len(client.requests) == 1 and client.requests[0]['chunk_number'] is None
+
+
+def test_last_chunk_is_sent_last(tmp_path):
+    path = write_csv(tmp_path / "result.csv", rows(60), newline="\r\n", trailing=False)
+    client = StubClient()
+    result = upload_backtest(path, client, chunk_size=200, max_workers=4, backoff=0)
+
+    total = client.requests[0]['total_chunks']
+    assert total > 3
+    assert client.requests[-1]['chunk_number'] == total - 1
+    assert result == [{'chunk_number': total - 1}]
+    assert sorted(r['chunk_number'] for r in client.requests) == list(range(total))
+    assert len({r['file_id'] for r in client.requests}) == 1
+
+    sent = b"".join(r['data'] for r in sorted(client.requests, key=lambda r: r['chunk_number']))
+    with open(path, "rb") as f:
+        assert sent == f.read()
+
+
+def test_resume_sends_only_the_missing_chunks(tmp_path):
+    path = write_csv(tmp_path / "result.csv", rows(60))
+    progress_path = path + ".upload.json"
+
+    failing = StubClient(fail={2})
+    with pytest.raises(ConnectionError):
+        upload_backtest(path, failing, chunk_size=200, max_workers=2, retries=0, backoff=0)
+    total = failing.requests[0]['total_chunks']
+    first = {r['chunk_number'] for r in failing.requests}
+    assert 2 not in first and total - 1 not in first  # the last chunk waits for the others
+    assert os.path.exists(progress_path)
+
+    client = StubClient()
+    upload_backtest(path, client, chunk_size=200, max_workers=2, retries=0, backoff=0)
+    assert [r['chunk_number'] for r in client.requests] == [2, total - 1]
+    assert {r['file_id'] for r in client.requests} == {failing.requests[0]['file_id']}
+    assert not os.path.exists(progress_path)
+
+
+def test_retry_resends_a_failed_chunk(tmp_path):
+    path = write_csv(tmp_path / "result.csv", rows(60))
+    client = StubClient(fail={1})
+    upload_backtest(path, client, chunk_size=200, retries=1, backoff=0)
+    total = client.requests[0]['total_chunks']
+    assert sorted(r['chunk_number'] for r in client.requests) == list(range(total))